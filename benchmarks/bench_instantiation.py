@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+benchmarks for BaseCfg instantiation (per configuration source), logcfg, and item
+access across config classes with 10, 100 and 1000 options of mixed types
+
+usage:
+    PYTHONPATH=src python3 benchmarks/bench_instantiation.py --output before.json
+    PYTHONPATH=src python3 benchmarks/bench_instantiation.py --compare before.json
+
+results are written as json so runs from different releases can be compared
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from importlib.metadata import PackageNotFoundError, version
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Type,
+)
+
+from basecfg import BaseCfg, opt
+
+DEFAULT_SIZES = (10, 100, 1000)
+
+
+class OptionKind(NamedTuple):
+    """a type of option used in generated config classes, with sample values"""
+
+    label: str
+    option_type: Any
+    default: Any
+    text_value: str
+    json_value: Any
+    cli_args: Sequence[str]
+
+
+KINDS = (
+    OptionKind("str", str, "x", "hello", "hello", ("hello",)),
+    OptionKind("int", int, 0, "42", 42, ("42",)),
+    OptionKind("float", float, 0.0, "4.2", 4.2, ("4.2",)),
+    OptionKind("bool", bool, False, "true", True, ()),
+    OptionKind("optint", Optional[int], None, "7", 7, ("7",)),
+    OptionKind("strlist", List[str], [], "a,b,c", ["a", "b", "c"], ("a", "b")),
+    OptionKind("intlist", List[int], [], "1,2,3", [1, 2, 3], ("1", "2")),
+    OptionKind("floatlist", List[float], [], "1.5,2.5", [1.5, 2.5], ("1.5",)),
+)
+
+
+class Scenario(NamedTuple):
+    """a timed operation against a generated config class"""
+
+    name: str
+    func: Callable[[], Any]
+
+
+def option_kinds(size: int) -> Iterator[tuple]:
+    """yields (option name, kind) pairs for a generated config class"""
+    for i in range(size):
+        kind = KINDS[i % len(KINDS)]
+        yield f"opt_{i}_{kind.label}", kind
+
+
+def make_config_class(size: int) -> Type[BaseCfg]:
+    """generates a BaseCfg subclass with the given number of options"""
+    annotations: Dict[str, Any] = {}
+    namespace: Dict[str, Any] = {
+        "__annotations__": annotations,
+        "__doc__": f"generated config with {size} options",
+    }
+    for name, kind in option_kinds(size):
+        annotations[name] = kind.option_type
+        namespace[name] = opt(default=kind.default, doc=f"a {kind.label} option")
+    return type(f"BenchCfg{size}", (BaseCfg,), namespace)
+
+
+def write_sources(size: int, workdir: str) -> Dict[str, Any]:
+    """writes the file-backed sources for a config class of the given size"""
+    sources: Dict[str, Any] = {
+        "json_path": os.path.join(workdir, "config.json"),
+        "envfile_path": os.path.join(workdir, "config.env"),
+        "secrets_dir": os.path.join(workdir, "secrets"),
+        "envvars": {},
+        "cli_args": [],
+    }
+    os.mkdir(sources["secrets_dir"])
+
+    json_data: Dict[str, Any] = {}
+    for name, kind in option_kinds(size):
+        json_data[name] = kind.json_value
+        sources["envvars"][name.upper()] = kind.text_value
+        flag = "--" + name.replace("_", "-")
+        if kind.option_type is bool:
+            sources["cli_args"].append(flag)
+        for value in kind.cli_args:
+            sources["cli_args"].extend((flag, value))
+        secret_path = os.path.join(sources["secrets_dir"], name)
+        with open(secret_path, "wt", encoding="utf8") as secret:
+            secret.write(kind.text_value + "\n")
+
+    with open(sources["json_path"], "wt", encoding="utf8") as json_fp:
+        json.dump(json_data, json_fp)
+    with open(sources["envfile_path"], "wt", encoding="utf8") as envfile:
+        for name, value in sources["envvars"].items():
+            envfile.write(f"{name}={value}\n")
+    return sources
+
+
+@contextmanager
+def environment(envvars: Dict[str, str]) -> Iterator[None]:
+    """temporarily adds the given variables to the environment"""
+    saved = os.environ.copy()
+    os.environ.update(envvars)
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+def scenarios(cfg_class: Type[BaseCfg], sources: Dict[str, Any]) -> List[Scenario]:
+    """returns the timed operations for the given config class"""
+    no_secrets = os.path.join(os.path.dirname(sources["secrets_dir"]), "missing")
+    common: Dict[str, Any] = {"cli_args": [], "secrets_dir": no_secrets}
+
+    logger = logging.getLogger("basecfg.bench")
+    logger.propagate = False
+    logger.addHandler(logging.NullHandler())
+    logger.setLevel(logging.INFO)
+
+    loaded = cfg_class(sources["json_path"], **common)
+    keys = list(loaded)
+
+    def item_access() -> None:
+        for key in keys:
+            _ = loaded[key]
+
+    return [
+        Scenario("defaults", lambda: cfg_class(**common)),
+        Scenario("json", lambda: cfg_class(sources["json_path"], **common)),
+        Scenario(
+            "envfile",
+            lambda: cfg_class(envfile_path=sources["envfile_path"], **common),
+        ),
+        Scenario("envvars", lambda: cfg_class(**common)),
+        Scenario(
+            "secrets",
+            lambda: cfg_class(cli_args=[], secrets_dir=sources["secrets_dir"]),
+        ),
+        Scenario(
+            "cli",
+            lambda: cfg_class(cli_args=sources["cli_args"], secrets_dir=no_secrets),
+        ),
+        Scenario("logcfg", lambda: loaded.logcfg(logger)),
+        Scenario("item_access", item_access),
+    ]
+
+
+def time_scenario(scenario: Scenario, repeat: int, min_time: float) -> Dict[str, Any]:
+    """times a scenario, returning per-operation statistics in microseconds"""
+    # calibrate the number of calls per sample so each sample takes >= min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            scenario.func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            scenario.func()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_us": min(samples),
+        "median_us": statistics.median(samples),
+        "max_us": max(samples),
+    }
+
+
+def run(sizes: Sequence[int], repeat: int, min_time: float) -> Dict[str, Any]:
+    """runs every scenario for every size, returning the results document"""
+    try:
+        basecfg_version = version("basecfg")
+    except PackageNotFoundError:
+        basecfg_version = "unknown"
+    results = []
+    for size in sizes:
+        cfg_class = make_config_class(size)
+        with tempfile.TemporaryDirectory(prefix="basecfg-bench-") as workdir:
+            sources = write_sources(size, workdir)
+            for scenario in scenarios(cfg_class, sources):
+                if scenario.name == "envvars":
+                    with environment(sources["envvars"]):
+                        timing = time_scenario(scenario, repeat, min_time)
+                else:
+                    timing = time_scenario(scenario, repeat, min_time)
+                results.append({"scenario": scenario.name, "options": size, **timing})
+                print(
+                    f"{scenario.name:>12} {size:>5} options: "
+                    f"{timing['median_us']:>12.1f} us",
+                    file=sys.stderr,
+                )
+    return {
+        "basecfg_version": basecfg_version,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """prints the median timings of two result documents side by side"""
+    before = {
+        (result["scenario"], result["options"]): result["median_us"]
+        for result in baseline["results"]
+    }
+    print(
+        f"{'scenario':>12} {'options':>7} {'baseline us':>12} {'current us':>12} "
+        f"{'ratio':>7}"
+    )
+    for result in current["results"]:
+        key = (result["scenario"], result["options"])
+        if key not in before:
+            continue
+        ratio = result["median_us"] / before[key] if before[key] else float("nan")
+        print(
+            f"{key[0]:>12} {key[1]:>7} {before[key]:>12.1f} "
+            f"{result['median_us']:>12.1f} {ratio:>7.2f}"
+        )
+
+
+def main() -> None:
+    """entrypoint"""
+    argp = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argp.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=list(DEFAULT_SIZES),
+        help="comma-separated numbers of options (default: 10,100,1000)",
+    )
+    argp.add_argument(
+        "--repeat", type=int, default=5, help="samples per scenario (default: 5)"
+    )
+    argp.add_argument(
+        "--min-time",
+        type=float,
+        default=0.05,
+        help="minimum seconds per sample (default: 0.05)",
+    )
+    argp.add_argument("--output", help="write the json results to this path")
+    argp.add_argument("--compare", help="compare the results against this json file")
+    args = argp.parse_args()
+
+    results = run(args.sizes, args.repeat, args.min_time)
+    if args.output:
+        with open(args.output, "wt", encoding="utf8") as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare, "rt", encoding="utf8") as baseline:
+            compare(json.load(baseline), results)
+
+
+if __name__ == "__main__":
+    main()
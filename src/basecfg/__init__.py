@@ -1,5 +1,30 @@
 #!/usr/bin/env python3
 """ module """
 from .basecfg import BaseCfg, opt
+from .coercers import TypeCoercers, register_type, register_type_factory
+from .frozen import FrozenCfg
+from .sections import section
+from .shared import SharedCfgPublisher, SharedCfgReader
+from .sources import CachedSource, HttpKVSource, Source
+from .stats import LoadStats, StepStats
+from .validation import ValidationError
+from .watch import ConfigWatcher
 
-__all__ = ["BaseCfg", "opt"]
+__all__ = [
+    "BaseCfg",
+    "CachedSource",
+    "ConfigWatcher",
+    "FrozenCfg",
+    "HttpKVSource",
+    "LoadStats",
+    "SharedCfgPublisher",
+    "SharedCfgReader",
+    "Source",
+    "StepStats",
+    "TypeCoercers",
+    "ValidationError",
+    "opt",
+    "register_type",
+    "register_type_factory",
+    "section",
+]
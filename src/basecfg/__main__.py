@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+command-line tools for basecfg; currently this pre-builds the resolved-config
+cache used by BaseCfg.from_cache, e.g. at container build time:
+
+    python3 -m basecfg build-cache myapp.config:AppConfig \\
+        --cache-path /var/cache/myapp/config.json \\
+        --json-config-path /etc/myapp/config.json -- --verbose
+"""
+import argparse
+import importlib
+import sys
+from typing import List, Optional, Sequence, Type
+
+from .basecfg import BaseCfg
+from .cache import write_cache
+
+
+def load_class(spec: str) -> Type[BaseCfg]:
+    """imports the BaseCfg subclass named by a "module:QualName" spec"""
+    module_name, _, qualname = spec.partition(":")
+    if not module_name or not qualname:
+        raise ValueError(f'expected "module:ClassName", got "{spec}"')
+    obj = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    if not isinstance(obj, type) or not issubclass(obj, BaseCfg):
+        raise TypeError(f"{spec} is not a BaseCfg subclass")
+    return obj
+
+
+def build_cache(args: argparse.Namespace) -> int:
+    """loads the configuration and writes its cache file"""
+    cfg_class = load_class(args.config_class)
+    app_args: List[str] = args.app_args
+    cfg = cfg_class(
+        json_config_path=args.json_config_path,
+        json_required=args.json_required,
+        envfile_path=args.envfile_path,
+        envfile_required=args.envfile_required,
+        secrets_dir=args.secrets_dir,
+        cli_args=app_args,
+    )
+    if not write_cache(cfg, args.cache_path, app_args, args.allow_secrets):
+        print(
+            f"{args.config_class}: configuration can't be cached (it contains "
+            "sensitive values and --allow-secrets wasn't given, or values which "
+            "can't be stored as json)",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """entrypoint"""
+    argp = argparse.ArgumentParser(
+        prog="python3 -m basecfg",
+        epilog="the application's command-line arguments may be given after --",
+    )
+    commands = argp.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser(
+        "build-cache",
+        help="write the resolved-config cache file for a config class",
+    )
+    build.add_argument("config_class", help='the config class, as "module:ClassName"')
+    build.add_argument("--cache-path", required=True, help="the cache file to write")
+    build.add_argument("--json-config-path", help="the json config file to load")
+    build.add_argument("--json-required", action="store_true")
+    build.add_argument("--envfile-path", help="the envfile to load")
+    build.add_argument("--envfile-required", action="store_true")
+    build.add_argument("--secrets-dir", default="/run/secrets")
+    build.add_argument(
+        "--allow-secrets",
+        action="store_true",
+        help="allow sensitive values and docker secrets to be written to the cache",
+    )
+    build.set_defaults(func=build_cache)
+
+    # everything after "--" is the application's command-line arguments
+    argv = list(sys.argv[1:] if argv is None else argv)
+    app_args: List[str] = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, app_args = argv[:split], argv[split + 1 :]
+    args = argp.parse_args(argv)
+    args.app_args = app_args
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,11 +5,12 @@ loading the configuration values from json config files, environment variables,
 and command-line arguments
 """
 # pylint: disable=too-many-arguments
-import argparse
-import json
+import asyncio
 import logging
 import os
-import re
+import sys
+import time
+from functools import partial
 from typing import (
     Any,
     Callable,
@@ -18,34 +19,57 @@ from typing import (
     NamedTuple,
     Optional,
     Sequence,
+    Tuple,
+    Type,
     TypeVar,
     Union,
-    get_args,
-    get_origin,
+    cast,
 )
 
+from . import export, provenance
+from .cache import read_cache, write_cache
+from .cli import CfgArgumentParser, build_arg_parser
+from .dockersecrets import list_docker_secrets, read_docker_secret, read_docker_secrets
+from .envfile import EnvfilePaths, envfile_paths, read_envfiles
+from .frozen import FrozenCfg, freeze_value
+from .jsonconfig import JsonDecoder, decode_keys, get_decoder
+from .lazy import LazyDescriptor
+from .reload import apply_updates, read_changed_sources
+from .schema import (
+    SOURCE_ORDER,
+    CfgSchema,
+    OptionDeclaration,
+    OptionMetadata,
+    OptParserInput,
+    base_type,
+    parse_bool,
+    redaction_plan,
+    token_matcher,
+)
+from .sections import SectionDescriptor
+from .shared import SharedCfgPublisher, SharedCfgReader
+from .sources import Source, source_order
+from .stats import LoadStats
+from .validation import Constraints, check, validate
+from .watch import ChangeCallback, ConfigWatcher, ErrorCallback, watch_async
+
 # pylint: disable=invalid-name
 OptType = TypeVar("OptType")
-OptParserInput = Union[str, int, float, list]
-
-empty_line = re.compile(r"^\s*([#].*|$)")
+CfgType = TypeVar("CfgType", bound="BaseCfg")
 
 
-class OptionMetadata(NamedTuple):
+class SourceSettings(NamedTuple):
     """
-    OptionMetadata is a named tuple which encapsulates data captured by OptFunc
-    instances
+    SourceSettings records where a BaseCfg instance was told to load its
+    configuration from, so the sources can be read again by reload()
     """
 
-    name: Optional[str]
-    option_type: Optional[Any]
-    default: Any
-    doc: str
-    required: bool
-    parser: Optional[Callable[[OptParserInput], Any]]
-    choices: Optional[Any]
-    sep: str
-    redact: bool
+    json_config_path: Optional[str]
+    json_required: bool
+    envfile_path: Optional[EnvfilePaths]
+    envfile_required: bool
+    secrets_dir: str
+    sources: Tuple[Source, ...] = ()
 
 
 class BaseCfg:
@@ -57,13 +81,21 @@ class BaseCfg:
     them with basecfg.opt
     """
 
-    _optmeta: List[OptionMetadata] = []
-    _optmeta_reset: bool = True
-    _options: Dict[str, OptionMetadata]
+    # pylint: disable=too-many-instance-attributes
+
+    _schema: CfgSchema = CfgSchema(())
     _prog: Optional[str] = None
     _prog_description: Optional[str] = None
     _prog_epilog: Optional[str] = None
     _version: Optional[str] = None
+    _env_prefix: str = ""
+    _json_decoder: Union[str, JsonDecoder] = "json"
+    _json_declared_only: bool = False
+    _source_settings: SourceSettings
+    _source_order: Tuple[str, ...] = SOURCE_ORDER
+    _layers: Dict[str, Dict[str, Any]]
+    _fingerprints: Dict[str, Any]
+    load_stats: Optional[LoadStats] = None
     _autoredact_tokens: Sequence[str] = (
         "key",
         "pass",
@@ -76,7 +108,7 @@ class BaseCfg:
         self,
         json_config_path: Optional[str] = None,
         json_required=False,
-        envfile_path: Optional[str] = None,
+        envfile_path: Optional[EnvfilePaths] = None,
         envfile_required: bool = False,
         secrets_dir: str = "/run/secrets",
         cli_args: Optional[Sequence[str]] = None,
@@ -84,12 +116,19 @@ class BaseCfg:
         prog_description: Optional[str] = None,
         prog_epilog: Optional[str] = None,
         version: Optional[str] = None,
+        load_stats: bool = False,
+        stats_hook: Optional[Callable[[LoadStats], None]] = None,
+        sources: Sequence[Source] = (),
     ) -> None:
         """
         Creates a new instance of the configuration class; all arguments are optional
         json_config_path [str]: the path to a json config file to parse
         json_required [bool]: if True an exception will be raised if the given json
             config file is missing
+        envfile_path [str | List[str]]: the path to an envfile to parse, or a list
+            of envfile paths which are merged in order (later files take precedence)
+        envfile_required [bool]: if True an exception will be raised if any of the
+            given envfiles are missing
         cli_args List[str]: instead of using sys.argv, this list of arguments will be
             passed to the command-line argument processing routine
         prog [str]: sets the name of the program - used while printing usage
@@ -98,337 +137,716 @@ class BaseCfg:
             usage documentation when the program is invoked with -h or --help
         prog_epilog [str]: additional text appearing at the end of the usage
             documentation that is printed when the program is invoked with -h or --help
+        load_stats [bool]: if True, timings and counts for each step of loading the
+            configuration are recorded in the load_stats attribute (a LoadStats)
+        stats_hook [callable]: called with the LoadStats once loading is finished;
+            giving a hook implies load_stats=True
+        sources [List[Source]]: additional sources (see basecfg.sources), each
+            inserted into the precedence chain after the source named by its "after"
         """
-        self._prog = prog
-        self._prog_description = prog_description
-        self._prog_epilog = prog_epilog
-        self._version = version
-
-        # step 1: enrich our metadata about the configuration options and load
-        # default values. At this point we finally have the names of the fields
-        # and are aware of their resolved type annotations.
+        # pylint: disable=too-many-locals
+        self._init_state(
+            SourceSettings(
+                json_config_path,
+                json_required,
+                envfile_path,
+                envfile_required,
+                secrets_dir,
+                tuple(sources),
+            ),
+            prog,
+            prog_description,
+            prog_epilog,
+            version,
+        )
 
-        BaseCfg._optmeta_reset = True
-        # copying the _optmeta list from a BaseCfg class attr to an attr of this subclass
-        setattr(self.__class__, "_optmeta", BaseCfg._optmeta.copy())
-        option_metadata = iter(self.__class__._optmeta)
+        # load statistics are only collected when asked for
+        stats = LoadStats() if load_stats or stats_hook else None
+        self.load_stats = stats
+        mark = time.perf_counter() if stats else 0.0
 
-        self._options = {}
-        for key, val in self.__class__.__annotations__.items():
-            self._options[key] = next(option_metadata)._replace(
-                name=key,
-                option_type=val,
-            )
+        # step 1: default values are class attributes and the option metadata was
+        # compiled into self._schema when the class was defined (see
+        # __init_subclass__) so there is nothing to do here
+        if stats:
+            mark = stats.record("defaults", mark, keys_applied=len(self._schema))
 
         # step 2: load config data from json config file
         if json_config_path:
-            for key, val in self._parse_json_config(
-                json_config_path, json_required
-            ).items():
-                setattr(self, key, val)
+            fingerprint = self._file_fingerprint(json_config_path)
+            self._fingerprints["json"] = fingerprint
+            document = self._read_json_config(json_config_path, json_required)
+            self._apply_layer("json", self._coerce_json(document))
+            if stats:
+                mark = stats.record(
+                    "json",
+                    mark,
+                    **self._file_counts(fingerprint),
+                    keys_applied=len(self._layers["json"]),
+                    keys_skipped=len(document) - len(self._layers["json"]),
+                )
 
         # step 3: load config data from .env files
         if envfile_path:
+            envfile_fingerprints = self._envfile_fingerprints(envfile_path)
+            self._fingerprints["envfile"] = envfile_fingerprints
             envfile_values = self._read_envfile(envfile_path, envfile_required)
-            self._apply_dict(envfile_values)
+            self._apply_layer("envfile", self._coerce_dict(envfile_values))
+            if stats:
+                mark = stats.record(
+                    "envfile",
+                    mark,
+                    **self._file_counts(*envfile_fingerprints),
+                    keys_applied=len(self._layers["envfile"]),
+                )
 
         # step 4: load config data from environment variables
-        self._apply_dict(self._read_envvars())
+        self._apply_layer("envvars", self._coerce_dict(self._read_envvars()))
+        if stats:
+            mark = stats.record(
+                "envvars", mark, keys_applied=len(self._layers["envvars"])
+            )
 
         # step 5: load config data from docker secrets
-        self._apply_dict(
-            {
-                name: self._read_docker_secret(secret_path)
-                for name, secret_path in self._list_docker_secrets(secrets_dir).items()
-            }
-        )
+        self._apply_layer("secrets", self._load_docker_secrets(secrets_dir))
+        if stats:
+            # binary secrets aren't read until they are used, so they aren't counted
+            secret_fingerprints = [
+                fingerprint
+                for name, fingerprint in self._fingerprints["secrets"].items()
+                if name not in self._schema.binary
+            ]
+            mark = stats.record(
+                "secrets",
+                mark,
+                files_read=len(secret_fingerprints),
+                bytes_read=sum(fp[2] for fp in secret_fingerprints if fp),
+                keys_applied=len(self._layers["secrets"]),
+            )
 
         # step 6: load config data from command-line arguments
-        for key, val in self._parse_args(cli_args).items():
-            if val is not None:
-                setattr(self, key, val)
+        self._apply_layer("cli", self._cli_layer(cli_args))
+        if stats:
+            mark = stats.record("cli", mark, keys_applied=len(self._layers["cli"]))
+
+        # step 7: load config data from any additional sources
+        for source in sources:
+            self._insert_layer(source.name, self._read_source(source))
+            if stats:
+                mark = stats.record(
+                    source.name, mark, keys_applied=len(self._layers[source.name])
+                )
+
+        # step 8: check the required options, choices and constraints in one pass
+        check(self)
+        if stats and stats_hook:
+            stats_hook(stats)
+
+    @classmethod
+    async def aload(
+        cls: Type[CfgType],
+        json_config_path: Optional[str] = None,
+        json_required=False,
+        envfile_path: Optional[EnvfilePaths] = None,
+        envfile_required: bool = False,
+        secrets_dir: str = "/run/secrets",
+        cli_args: Optional[Sequence[str]] = None,
+        prog: Optional[str] = None,
+        prog_description: Optional[str] = None,
+        prog_epilog: Optional[str] = None,
+        version: Optional[str] = None,
+        sources: Sequence[Source] = (),
+    ) -> CfgType:
+        """
+        Creates a new instance of the configuration class without blocking the event
+        loop; takes the same arguments as the constructor (apart from the load
+        statistics ones) and applies the sources with the same precedence and
+        coercion. The json config file, envfile(s) and docker secrets are read
+        concurrently in worker threads, as are any additional sources. If reading
+        several sources fails, the error the constructor would have raised (the
+        first in precedence order) is raised
+        """
+        # pylint: disable=too-many-locals
+        cfg = cls.__new__(cls)
+        cfg._init_state(
+            SourceSettings(
+                json_config_path,
+                json_required,
+                envfile_path,
+                envfile_required,
+                secrets_dir,
+                tuple(sources),
+            ),
+            prog,
+            prog_description,
+            prog_epilog,
+            version,
+        )
+
+        readers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        if json_config_path:
+            readers["json"] = partial(
+                cfg._load_json_config, json_config_path, json_required
+            )
+        if envfile_path:
+            readers["envfile"] = partial(
+                cfg._load_envfile, envfile_path, envfile_required
+            )
+        readers["secrets"] = partial(cfg._load_docker_secrets, secrets_dir)
+        for additional in sources:
+            readers[additional.name] = partial(cfg._read_source, additional)
+        results: List[Union[Dict[str, Any], BaseException]] = await asyncio.gather(
+            *(asyncio.to_thread(reader) for reader in readers.values()),
+            return_exceptions=True,
+        )
+        layers = dict(zip(readers, results))
+
+        for source in SOURCE_ORDER:
+            if source == "envvars":
+                cfg._apply_layer(source, cfg._coerce_dict(cfg._read_envvars()))
+            elif source == "cli":
+                cfg._apply_layer(source, cfg._cli_layer(cli_args))
+            elif source in layers:
+                result = layers[source]
+                if isinstance(result, BaseException):
+                    raise result
+                cfg._apply_layer(source, result)
+        for additional in sources:
+            result = layers[additional.name]
+            if isinstance(result, BaseException):
+                raise result
+            cfg._insert_layer(additional.name, result)
+        check(cfg)
+        return cfg
+
+    @classmethod
+    def from_cache(
+        cls: Type[CfgType],
+        cache_path: str,
+        *,
+        allow_secrets: bool = False,
+        json_config_path: Optional[str] = None,
+        json_required: bool = False,
+        envfile_path: Optional[EnvfilePaths] = None,
+        envfile_required: bool = False,
+        secrets_dir: str = "/run/secrets",
+        cli_args: Optional[Sequence[str]] = None,
+        prog: Optional[str] = None,
+        prog_description: Optional[str] = None,
+        prog_epilog: Optional[str] = None,
+        version: Optional[str] = None,
+        sources: Sequence[Source] = (),
+    ) -> CfgType:
+        """
+        Creates a new instance of the configuration class like the constructor
+        (which takes the same arguments), but using the resolved-config cache file
+        at cache_path: if the cache matches the class schema, the json config and
+        envfile (path, inode, mtime and size) and the command-line arguments, the
+        values are loaded from it without parsing those sources. Otherwise the
+        configuration is loaded normally and the cache file is (re)written.
+        Environment variables and additional sources are always read directly, and
+        docker secrets are too unless allow_secrets is True; sensitive values (see
+        logcfg) are never written to the cache unless allow_secrets is True
+        """
+        # pylint: disable=too-many-locals
+        settings = SourceSettings(
+            json_config_path,
+            json_required,
+            envfile_path,
+            envfile_required,
+            secrets_dir,
+            tuple(sources),
+        )
+        argv = sys.argv[1:] if cli_args is None else list(cli_args)
+        cached = read_cache(cls, cache_path, settings, argv, allow_secrets)
+        if cached is None:
+            cfg = cls(
+                json_config_path,
+                json_required,
+                envfile_path,
+                envfile_required,
+                secrets_dir,
+                argv,
+                prog,
+                prog_description,
+                prog_epilog,
+                version,
+                sources=sources,
+            )
+            write_cache(cfg, cache_path, argv, allow_secrets)
+            return cfg
+
+        layers, fingerprints = cached
+        cfg = cls.__new__(cls)
+        cfg._init_state(settings, prog, prog_description, prog_epilog, version)
+        cfg._fingerprints.update(fingerprints)
+        for source in SOURCE_ORDER:
+            if source in layers:
+                cfg._apply_layer(source, layers[source])
+            elif source == "envvars":
+                cfg._apply_layer(source, cfg._coerce_dict(cfg._read_envvars()))
+            elif source == "secrets":
+                cfg._apply_layer(source, cfg._load_docker_secrets(secrets_dir))
+        for additional in sources:
+            cfg._insert_layer(additional.name, cfg._read_source(additional))
+        check(cfg)
+        return cfg
+
+    def _init_state(
+        self,
+        source_settings: SourceSettings,
+        prog: Optional[str] = None,
+        prog_description: Optional[str] = None,
+        prog_epilog: Optional[str] = None,
+        version: Optional[str] = None,
+    ) -> None:
+        """sets up the per-instance state used by every way of loading a config"""
+        self._prog = prog
+        self._prog_description = prog_description
+        self._prog_epilog = prog_epilog
+        self._version = version
+        self._source_settings = source_settings
+        self._source_order = source_order(source_settings.sources)
+        # the values contributed by each source (see _source_order) and the
+        # fingerprints of the files they came from; these are what allow reload()
+        # to re-read only the sources which have changed
+        self._layers = {}
+        self._fingerprints = {}
+        self.load_stats = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        """
+        compiles the options declared in the body of the new subclass (plus any
+        inherited from its parent) into a schema which is shared by every instance
+        """
+        super().__init_subclass__(**kwargs)
+        # the opt() calls in the class body left OptionDeclaration markers as the
+        # attribute values; collect their metadata and replace them with the defaults
+        declarations: Dict[str, OptionMetadata] = {}
+        for name, value in list(cls.__dict__.items()):
+            if isinstance(value, OptionDeclaration):
+                declarations[name] = value.meta
+        cls._schema = CfgSchema.build(
+            cls.__dict__.get("__annotations__", {}),
+            declarations,
+            inherited=cls._schema,
+            env_prefix=cls._env_prefix,
+        )
+        for name in declarations:
+            # the compiled default, e.g. an array for compact options
+            setattr(cls, name, cls._schema.metadata[name].default)
+        # sections and lazy options are resolved from the loaded inputs on first
+        # access
+        for name in cls._schema.lazy:
+            if name in declarations:
+                section = name in cls._schema.sections
+                setattr(
+                    cls, name, (SectionDescriptor if section else LazyDescriptor)(name)
+                )
+
+    @property
+    def _options(self) -> Dict[str, OptionMetadata]:
+        """
+        a per-instance copy of the option metadata; the copy is only made on first
+        access so that instantiation doesn't pay for it
+        """
+        try:
+            return self.__dict__["_options"]
+        except KeyError:
+            options = self.__dict__["_options"] = dict(self._schema.metadata)
+            return options
+
+    def _load_json_config(self, path: str, required: bool = False) -> Dict[str, Any]:
+        """
+        reads and coerces the json config file at the given path, recording its
+        fingerprint (for reload)
+        """
+        self._fingerprints["json"] = self._file_fingerprint(path)
+        return self._parse_json_config(path, required)
 
     def _parse_json_config(self, path: str, required: bool = False) -> Dict[str, Any]:
         """parses the configuration from the json file at the given path"""
-        result: Dict[str, Any] = {}
+        return self._coerce_json(self._read_json_config(path, required))
+
+    @classmethod
+    def _read_json_config(cls, path: str, required: bool = False) -> Dict[str, Any]:
+        """
+        returns the decoded (but not coerced) json config file at the given path,
+        using the decoder selected by _json_decoder; if _json_declared_only is set
+        only the keys of declared options are decoded, by the standard library's
+        scanner (see jsonconfig.decode_keys)
+        """
         if not os.path.isfile(path):
             if required:
                 raise RuntimeError(f"required json config file {path} was not found")
             # no file, not required
-            return result
-        with open(path, "rt", encoding="utf8") as json_fp:
-            for key, val in json.load(json_fp).items():
-                if key not in self._options:
-                    # in the future we may want to optionally raise an
-                    # exception here
-                    continue
-                option = self._options[key]
-                option_type = self._base_type(option.option_type)
-
-                # check json value types against the supported types
-                val_type = type(val).__name__
-
-                coercions: Dict[str, Callable[[Any], Any]] = {
-                    "bool": bool,
-                    "float": float,
-                    "int": int,
-                    "str": str,
-                    "List[bool]": self._bool_list,
-                    "List[float]": self._float_list,
-                    "List[int]": self._int_list,
-                    "List[str]": self._str_list,
-                }
-
-                coerced_value = val
-                if option.parser:
-                    coerced_value = option.parser(val)
-                elif val_type != option_type:
-                    if val_type == "list":
-                        if option_type not in coercions:
-                            raise TypeError(
-                                f"{key}: unsupported list type {option_type}"
-                            )
-                    if option_type not in coercions:
-                        raise TypeError(f"{key}: unsupported value type {option_type}")
-                    try:
-                        coerced_value = coercions[option_type](val)
-                    except ValueError:
-                        raise TypeError(
-                            f"{key}: unsupported value type {val_type}"
-                        ) from None
-
-                if option.choices:
-                    if coerced_value not in option.choices:
-                        raise ValueError(
-                            f'{key}: value "{coerced_value}" not in specified '
-                            f"option choices ({str(option.choices)})"
-                        )
-                result[key] = coerced_value
-
-        return result
-
-    def _bool_list(self, input_list: List[Any]) -> List[bool]:
-        """converts a list of unknown type into a list of bool values"""
-        return [bool(x) for x in input_list]
-
-    def _float_list(self, input_list: List[Any]) -> List[float]:
-        """converts a list of unknown type into a list of float values"""
-        return [float(x) for x in input_list]
-
-    def _int_list(self, input_list: List[Any]) -> List[int]:
-        """converts a list of unknown type into a list of int values"""
-        return [int(x) for x in input_list]
-
-    def _str_list(self, input_list: List[Any]) -> List[str]:
-        """converts a list of unknown type into a list of str values"""
-        return [str(x) for x in input_list]
+            return {}
+        with open(path, "rb") as json_fp:
+            data = json_fp.read()
+        if cls._json_declared_only:
+            return decode_keys(data.decode("utf8"), cls._schema.options)
+        return get_decoder(cls._json_decoder)(data)
+
+    def _coerce_json(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        given a decoded json config document, return a dict with the values of the
+        declared options converted to the selected type
+        """
+        options = self._schema.options
+        return {
+            key: options[key].coerce_json(val)
+            for key, val in document.items()
+            # in the future we may want to optionally raise an exception for
+            # unknown keys
+            if key in options
+        }
 
     def _keys(self) -> Sequence[str]:
         """return a list of keys in this configuration"""
-        return [key for key in self._options if not key.startswith("_")]
+        return [key for key in self._schema.names if not key.startswith("_")]
 
     def _parse_args(self, cli_args: Optional[Sequence[str]] = None) -> Dict[str, Any]:
-        """generate an args parser and call it"""
-        argp = argparse.ArgumentParser(
-            prog=self._prog,
-            description=self._prog_description,
-            epilog=self._prog_epilog,
+        """
+        parse the given command-line arguments (sys.argv[1:] if cli_args is None)
+        using the parser cached on the class schema
+        """
+        if cli_args is None:
+            cli_args = sys.argv[1:]
+        if not cli_args:
+            # fast path: with no arguments argparse would only return None for every
+            # option (which we'd ignore anyway), so skip it entirely
+            return {}
+        return self._arg_parser().parse_values(cli_args)
+
+    def _cli_layer(self, cli_args: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """returns the option values given as command-line arguments"""
+        return self._schema.group_sections(
+            {
+                key: val
+                for key, val in self._parse_args(cli_args).items()
+                if val is not None
+            }
         )
-        if self._version:
-            argp.add_argument("--version", action="version", version=self._version)
-        for optname, option in self._options.items():
-            arg_name = "--" + optname.replace("_", "-")
-            option_type = self._base_type(option.option_type)
-
-            # use this for as little as possible (because it doesn't get type checked)
-            # it could be good to switch to TypedDict for this
-            arg_config: Dict[str, Any] = {"action": "store"}
-
-            if option.parser:
-                arg_config["type"] = option.parser
-            elif option_type == "bool":
-                arg_config["action"] = argparse.BooleanOptionalAction
-            elif option_type == "int":
-                arg_config["type"] = int
-            elif option_type == "float":
-                arg_config["type"] = float
-            elif option_type == "List[str]":
-                arg_config["action"] = "append"
-            elif option_type == "List[int]":
-                arg_config["action"] = "append"
-                arg_config["type"] = int
-            elif option_type == "List[float]":
-                arg_config["action"] = "append"
-                arg_config["type"] = float
-            elif option_type == "List[bool]":
-                arg_config["action"] = "append"
-                arg_config["type"] = self._parse_bool
-
-            argp.add_argument(
-                arg_name,
-                dest=optname,
-                help=option.doc + f" (default: {repr(option.default)})",
-                required=False,
-                choices=option.choices,
-                **arg_config,
-            )
 
-        return vars(argp.parse_args(args=cli_args))
+    def _arg_parser(self) -> CfgArgumentParser:
+        """
+        return the argument parser for this class, building it on first use; parsers
+        are cached on the class schema, keyed by the program info given to __init__
+        """
+        parser_key = (
+            self._prog,
+            self._prog_description,
+            self._prog_epilog,
+            self._version,
+        )
+        parsers = self._schema.arg_parsers
+        if parser_key in parsers:
+            return parsers[parser_key]
+
+        argp = build_arg_parser(self._schema, *parser_key)
+        # if another thread built the same parser in the meantime, use theirs
+        return parsers.setdefault(parser_key, argp)
 
     def _read_envvars(self) -> Dict[str, str]:
         """read environment variables for configuration values"""
-        result: Dict[str, str] = {}
+        return self._schema.read_environ(os.environ)
 
-        for optname in self._options:
-            for envvar_name in (optname.upper(), optname):
-                if envvar_name in os.environ:
-                    result[optname] = os.environ[envvar_name]
-                    break
-        return result
+    def _coerce_dict(self, inputs: Dict[str, str]) -> Dict[str, Any]:
+        """
+        given a dict mapping option names to string input values, return a dict
+        with the values converted to the selected type; the inputs for sections are
+        grouped (see CfgSchema.group_sections) but not coerced
+        """
+        options = self._schema.options
+        return {
+            optname: options[optname].coerce_text(input_value)
+            for optname, input_value in self._schema.group_sections(inputs).items()
+        }
 
     def _apply_dict(self, inputs: Dict[str, str]) -> bool:
         """
         given a dict mapping option names to string input values, convert the values to
         the selected type
         """
-        # pylint: disable=too-many-branches
-        for optname, input_value in inputs.items():
-            option = self._options[optname]
-            option_type = self._base_type(option.option_type)
-
-            coerced_value: Any = input_value
-            if option.parser:
-                coerced_value = option.parser(input_value)
-            elif option_type == "str":
-                coerced_value = input_value
-            elif option_type == "bool":
-                coerced_value = self._parse_bool(input_value)
-            elif option_type == "int":
-                coerced_value = int(input_value)
-            elif option_type == "float":
-                coerced_value = float(input_value)
-            elif option_type == "List[str]":
-                coerced_value = input_value.split(option.sep)
-            elif option_type == "List[int]":
-                coerced_value = [int(n) for n in input_value.split(option.sep)]
-            elif option_type == "List[float]":
-                coerced_value = [float(f) for f in input_value.split(option.sep)]
-            elif option_type == "List[bool]":
-                coerced_value = [
-                    self._parse_bool(s) for s in input_value.split(option.sep)
-                ]
+        for optname, value in self._coerce_dict(inputs).items():
+            setattr(self, optname, value)
+        return True
+
+    def _apply_layer(self, source: str, values: Dict[str, Any]) -> None:
+        """record the values loaded from the given source and apply them"""
+        self._layers[source] = values
+        lazy = self._schema.lazy
+        for key, val in values.items():
+            if key in lazy:
+                # the option is resolved from the new inputs when next accessed
+                self.__dict__.pop(key, None)
             else:
-                raise ValueError(
-                    f"Don't know how to parse type {option.option_type} "
-                    f"({option_type})"
-                )
+                setattr(self, key, val)
 
-            if option.choices:
-                if coerced_value not in option.choices:
-                    raise ValueError(
-                        f"{optname} (envvar: {input_value}): "
-                        f'value "{coerced_value}" not in specified '
-                        f"choices list ({str(option.choices)})"
-                    )
+    def _insert_layer(self, source: str, values: Dict[str, Any]) -> None:
+        """
+        record the values loaded from the given source, which may have a lower
+        precedence than sources already applied, and apply the effective values
+        """
+        self._layers[source] = values
+        lazy = self._schema.lazy
+        for key in values:
+            if key in lazy:
+                self.__dict__.pop(key, None)
+            else:
+                setattr(self, key, self._effective_value(key))
 
-            setattr(self, optname, coerced_value)
+    def _read_source(self, source: Source) -> Dict[str, Any]:
+        """reads and coerces the values of an additional source"""
+        return self._coerce_dict(source.read(self._schema.leaves))
 
-        return True
+    def _effective_value(
+        self, key: str, layers: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Any:
+        """
+        returns the value of the option from the highest-precedence source in the
+        given layers (by default the loaded ones)
+        """
+        if layers is None:
+            layers = self._layers
+        for source in reversed(self._source_order):
+            layer = layers.get(source)
+            if layer and key in layer:
+                return layer[key]
+        return self._schema.metadata[key].default
+
+    def reload(self) -> Dict[str, Any]:
+        """
+        re-read the sources which have changed since the configuration was loaded
+        (json config file, envfile, environment variables and docker secrets) and
+        apply the options whose effective value changed; files are only re-read if
+        their inode, mtime or size differ. Returns a dict mapping the names of the
+        changed options to their new values. If reading any source fails, the
+        exception is raised and the configuration is left unchanged
+        """
+        return self._apply_updates(*self._read_changed_sources())
 
-    @staticmethod
-    def _read_envfile(path: str, required: bool = False) -> Dict[str, str]:
+    async def areload(self) -> Dict[str, Any]:
         """
-        parse entries in an environment file (aka .env) - the format supported
-        is described in the "docker run" (NOT compose) documentation. Notably
-        no quotation marks nor multi-line values are supported and comments are
-        only valid at the beginning of the line
+        like reload(), but the sources are read in a worker thread so the event loop
+        isn't blocked; the changes are applied on the calling (event loop) thread
         """
-        result: Dict[str, str] = {}
-        try:
-            dotenvfh = open(path, "rt", encoding="utf8")
-        except FileNotFoundError as fnf:
-            if not required:
-                return result
-            raise fnf from None
-        with dotenvfh as dotenv:
-            for i, line in enumerate(dotenv.readlines()):
-                if empty_line.match(line):
-                    continue
-                if "=" not in line:
-                    raise ValueError(
-                        f'envfile parsing error; file:"{path}" line:{i}; data line '
-                        f'contains no "=" character'
-                    )
-                key, value = line.split("=", 1)
-                result[key.lower().strip()] = value.strip()
-        return result
+        return self._apply_updates(*await asyncio.to_thread(self._read_changed_sources))
+
+    def _read_changed_sources(
+        self,
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        """
+        reads and coerces the sources which have changed since they were last read
+        (see reload); returns the updated layers and the new source fingerprints,
+        without modifying the configuration
+        """
+        return read_changed_sources(self)
+
+    def _apply_updates(
+        self, updates: Dict[str, Dict[str, Any]], fingerprints: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        replaces the given source layers and fingerprints and applies the options
+        whose effective value changed, returning them
+        """
+        return apply_updates(self, updates, fingerprints)
+
+    def freeze(self) -> FrozenCfg:
+        """
+        returns an immutable snapshot of the current configuration values; the
+        snapshot's class (generated once per config class) stores the values in
+        __slots__, so snapshots are small, hashable, and cheap to copy (copies are
+        the same object). List values are converted to tuples
+        """
+        names = self._schema.names
+        sections = self._schema.sections
+        return self._schema.frozen_class(type(self))(
+            (
+                getattr(self, name).freeze()
+                if name in sections
+                else freeze_value(getattr(self, name))
+            )
+            for name in names
+        )
+
+    def validate(self) -> None:
+        """
+        resolves every lazy option and section now (see opt's lazy argument), so
+        that invalid inputs raise here rather than where they are first used; the
+        violations found are reported together in a ValidationError
+        """
+        validate(self)
+
+    def source_of(self, key: str) -> str:
+        """
+        returns which source set the value of the option: "default", "json",
+        "envfile", "envvars", "secrets", "cli", or "assigned" (set after loading)
+        """
+        return provenance.source_of(self, key)
+
+    def source_detail(self, key: str) -> Optional[str]:
+        """
+        returns the file path, environment variable or flag the value of the option
+        came from, or None for defaults and assigned values
+        """
+        return provenance.source_detail(self, key)
+
+    def to_dict(self, redact: bool = False) -> Dict[str, Any]:
+        """
+        returns a dict mapping the option names (in declaration order) to their
+        values; if "redact" is true, sensitive values are replaced with the same
+        placeholders logcfg uses
+        """
+        return export.to_dict(self, redact)
+
+    def to_json(self, redact: bool = False, **dumps_kwargs: Any) -> str:
+        """returns the configuration as a json object (see to_dict)"""
+        return export.to_json(self, redact, **dumps_kwargs)
+
+    def to_env(self, redact: bool = False, skip_defaults: bool = False) -> str:
+        """
+        returns the configuration as the text of an envfile which this class can
+        load (see envfile_path); options which still have their default value are
+        left out if "skip_defaults" is true
+        """
+        return export.to_env(self, redact, skip_defaults)
+
+    def to_args(self, redact: bool = False, skip_defaults: bool = False) -> List[str]:
+        """
+        returns the configuration as a list of command-line arguments which this
+        class can parse (see cli_args); options which still have their default
+        value are left out if "skip_defaults" is true
+        """
+        return export.to_args(self, redact, skip_defaults)
+
+    def share(
+        self, name: Optional[str] = None, size: Optional[int] = None
+    ) -> SharedCfgPublisher:
+        """
+        publishes the current configuration in a new shared memory block (named
+        "name", or a generated name) so other processes, e.g. the workers of a
+        pre-fork server, can attach to it with attach_shared() instead of reading
+        the sources themselves; call publish() on the returned SharedCfgPublisher
+        to publish changes and close() to destroy the block. Option values must be
+        representable as json
+        """
+        return SharedCfgPublisher(self, name, size)
+
+    @classmethod
+    def attach_shared(cls, name: str) -> SharedCfgReader:
+        """
+        attaches to a shared memory block published with share(); the returned
+        SharedCfgReader's snapshot() method returns the configuration as a read-only
+        FrozenCfg, and its generation changes whenever a new snapshot is published
+        """
+        return SharedCfgReader(cls, name)
+
+    def watch(
+        self,
+        interval: float = 5.0,
+        on_change: Optional[ChangeCallback] = None,
+        on_error: Optional[ErrorCallback] = None,
+    ) -> ConfigWatcher:
+        """
+        start a background thread which calls reload() every "interval" seconds;
+        returns the (started) ConfigWatcher, call its stop() method to stop it
+        """
+        return ConfigWatcher(self, interval, on_change, on_error).start()
+
+    async def awatch(
+        self,
+        interval: float = 5.0,
+        on_change: Optional[ChangeCallback] = None,
+        on_error: Optional[ErrorCallback] = None,
+    ) -> None:
+        """
+        call areload() every "interval" seconds until cancelled; intended to be run
+        as a background task, e.g. asyncio.create_task(cfg.awatch()). The callbacks
+        are as for watch() and may also be coroutine functions
+        """
+        await watch_async(self, interval, on_change, on_error)
+
+    @staticmethod
+    def _file_counts(*fingerprints: Optional[Tuple[int, int, int]]) -> Dict[str, int]:
+        """returns the files_read and bytes_read load stats for file fingerprints"""
+        present = [fingerprint for fingerprint in fingerprints if fingerprint]
+        return {
+            "files_read": len(present),
+            "bytes_read": sum(fingerprint[2] for fingerprint in present),
+        }
 
     @staticmethod
-    def _list_docker_secrets(
-        secrets_dir: str = "/run/secrets/",
-    ) -> Dict[str, str]:
+    def _file_fingerprint(path: str) -> Optional[Tuple[int, int, int]]:
         """
-        return a dict mapping names to full paths for docker secrets found
-        on disk
+        returns a cheap fingerprint (inode, mtime, size) of the file at the given
+        path, or None if there is no such file
         """
-        result: Dict[str, str] = {}
         try:
-            dircontents = os.listdir(secrets_dir)
+            stat = os.stat(path)
         except FileNotFoundError:
-            return result
-        for name in dircontents:
-            if name.startswith("."):
-                continue
-            path = os.path.abspath(os.path.join(secrets_dir, name))
-            if not os.path.isfile(path):
-                continue
-            result[name] = path
-        return result
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @classmethod
+    def _envfile_fingerprints(
+        cls, envfile_path: EnvfilePaths
+    ) -> Tuple[Optional[Tuple[int, int, int]], ...]:
+        """returns the fingerprints of the given envfile, or sequence of envfiles"""
+        return tuple(
+            cls._file_fingerprint(path) for path in envfile_paths(envfile_path)
+        )
 
     @staticmethod
-    def _read_docker_secret(
-        path: str,
-        open_mode: str = "rt",
-        encoding: Optional[str] = "utf-8",
-        strip_whitespace: bool = True,
-    ) -> str:
-        """
-        open the secrets directory, look for a file with the given name; return its
-        contents, optionally stripping whitespace from the value
-        """
-        with open(path, open_mode, encoding=encoding) as secret:
-            contents = secret.read()
-        if strip_whitespace:
-            return contents.strip()
-        return contents
+    def _read_envfile(path: EnvfilePaths, required: bool = False) -> Dict[str, str]:
+        """
+        parse entries in an environment file (aka .env), or an ordered sequence of
+        them where entries in later files take precedence - see basecfg.envfile for
+        the supported format. Files are read a line at a time, and unchanged files
+        aren't parsed again
+        """
+        return read_envfiles(envfile_paths(path), required)
+
+    def _load_envfile(
+        self, path: EnvfilePaths, required: bool = False
+    ) -> Dict[str, Any]:
+        """
+        reads and coerces the given envfile(s), recording their fingerprints (for
+        reload)
+        """
+        self._fingerprints["envfile"] = self._envfile_fingerprints(path)
+        return self._coerce_dict(self._read_envfile(path, required))
+
+    def _load_docker_secrets(self, secrets_dir: str) -> Dict[str, Any]:
+        """
+        reads and coerces the docker secrets which correspond to options, recording
+        their fingerprints (for reload)
+        """
+        secret_paths = self._list_docker_secrets(secrets_dir, self._schema.leaves)
+        self._fingerprints["secrets"] = {
+            name: self._file_fingerprint(path) for name, path in secret_paths.items()
+        }
+        return self._coerce_dict(self._read_docker_secrets(secret_paths))
+
+    def _read_docker_secrets(self, paths: Dict[str, str]) -> Dict[str, str]:
+        """
+        given a dict mapping option names to docker secret paths (see
+        _list_docker_secrets) return a dict mapping the names to the contents of the
+        secrets; when there are many secrets they are read concurrently
+        """
+        return read_docker_secrets(paths, self._read_docker_secret, self._schema.binary)
+
+    _list_docker_secrets = staticmethod(list_docker_secrets)
+    _read_docker_secret = staticmethod(read_docker_secret)
 
     def _base_type(self, type_spec: Any) -> str:
         """returns a string representing the type of object"""
-        # print(
-        #     f"spec: {type_spec}; "
-        #     f"name: {type_spec.__name__}; "
-        #     f"origin: {get_origin(type_spec)}; "
-        #     f"args: {get_args(type_spec)}"
-        # )
-        result = (
-            type_spec.__name__ if hasattr(type_spec, "__name__") else repr(type_spec)
-        )
-        origin = get_origin(type_spec)
-        args = get_args(type_spec)
-        if origin == Union and len(args) == 2 and args[1] == type(None):  # noqa
-            # Optional[thing] where thing is in args[0]
-            return self._base_type(args[0])
-        if origin == list and len(args) == 1:
-            if args[0] in (str, int, float, bool):
-                result = f"List[{args[0].__name__}]"
-
-        # print(f"result is: {result}")
-        return result
+        return base_type(type_spec)
 
     @staticmethod
     def _parse_bool(value: str) -> bool:
         """evaluates the string value in a boolean context and returns the result"""
-        return value.lower().strip() in ("1", "enable", "on", "true", "t", "y", "yes")
+        return parse_bool(value)
 
     def __getitem__(self, key):
         """returns the value for the given configuration variable"""
@@ -439,22 +857,19 @@ class BaseCfg:
 
     def __len__(self):
         """returns the number of configuration options in the class"""
-        return len(self._options)
+        return len(self._schema)
 
     def __iter__(self):
         """returns keys iterator"""
-        return iter(self._options.keys())
+        return iter(self._schema.names)
 
     def _looks_sensitive(self, keyname: str) -> bool:
         """
         returns true of the given keyname appears to refer to a secret that should
         be redacted when logging the configuration
         """
-        keyname = keyname.lower()
-        for token in self._autoredact_tokens:
-            if token in keyname:
-                return True
-        return False
+        matches = token_matcher(tuple(self._autoredact_tokens))
+        return matches(keyname.lower()) is not None
 
     def logcfg(
         self,
@@ -462,23 +877,57 @@ class BaseCfg:
         autoredact: bool = True,
         heading: str = "running configuration:",
         item_prefix: str = "  ",
+        structured: bool = False,
+        sources: bool = False,
     ):
         """
         use the given logger to report the cfg info;
         if "autoredact" is true, values with names that resemble passwords are redacted;
         "heading" is logged before the configuration items are reported;
-        "item_prefix" is prepended to each configuration item in the output
+        "item_prefix" is prepended to each configuration item in the output;
+        if "structured" is true, a single record is logged instead, with "heading"
+        as the message and the configuration as a dict in the record's "config"
+        attribute (values are not repr()-ed), e.g. for json log handlers;
+        if "sources" is true, the source of each value (see source_of) is reported too
         """
+        plan = self._redaction_plan(autoredact)
+        origins = provenance.provenance(self) if sources else {}
+        if structured:
+            extra = {"config": export.redacted_dict(self, autoredact)}
+            if sources:
+                extra["config_sources"] = origins
+            cfglogger.info(heading, extra=extra)
+            return
         cfglogger.info(heading)
         for key in self:
-            if self._options[key].redact:
-                value = "--REDACTED--"
-            elif autoredact and self._looks_sensitive(key):
-                value = "--AUTO-REDACTED--"
-            else:
+            value = plan.get(key)
+            if value is None and key in self._schema.sections:
+                getattr(self, key).logcfg(
+                    cfglogger,
+                    autoredact,
+                    f"{item_prefix}{key}:",
+                    item_prefix + "  ",
+                    sources=sources,
+                )
+                continue
+            if value is None:
                 value = repr(getattr(self, key))
+            if sources:
+                value = f"{value} (from {origins[key]})"
             cfglogger.info("%s%s: %s", item_prefix, key, value)
 
+    def _redaction_plan(self, autoredact: bool) -> Dict[str, str]:
+        """
+        returns a dict mapping the names of options which must be redacted when
+        logged to their placeholder (see CfgSchema.redaction_plan)
+        """
+        tokens = tuple(self._autoredact_tokens) if autoredact else None
+        if "_options" not in self.__dict__:
+            return self._schema.redaction_plan(tokens)
+        # the per-instance _options copy only exists if something has modified it,
+        # so the plan compiled for the class may not apply
+        return redaction_plan(self._options, tokens)
+
 
 def opt(
     default: OptType,
@@ -488,17 +937,46 @@ def opt(
     choices: Optional[Sequence[OptType]] = None,
     sep: str = ",",
     redact: bool = False,
+    env_aliases: Sequence[str] = (),
+    lazy: bool = False,
+    compact: Union[bool, str] = False,
+    min_value: Any = None,
+    max_value: Any = None,
+    pattern: Optional[str] = None,
+    min_length: Optional[int] = None,
+    max_length: Optional[int] = None,
 ) -> OptType:
     """
-    opt captures data related to a BaseCfg option and returns the default
-    the annotated type of the return value is determined by the type of the
-    given default argument
+    opt captures data related to a BaseCfg option; the class attribute holds the
+    default once the class has been created. The annotated type of the return value
+    is determined by the type of the given default argument; env_aliases lists
+    additional environment variable names (used verbatim, without the class's
+    _env_prefix) for the option. If lazy is True, only the input from the
+    highest-precedence source is parsed (and checked against choices), when the
+    option is first accessed or validate() is called. If compact is True (or an
+    array typecode), List[int] and List[float] values are stored in an array.array.
+    Options declared with required=True must be set by a source; the values the
+    sources set are checked against choices, min_value, max_value and pattern (for
+    list options, every item) and min_length and max_length once loading is done
     """
-    # pylint: disable=protected-access
-    if BaseCfg._optmeta_reset:
-        BaseCfg._optmeta = []
-        BaseCfg._optmeta_reset = False
-    BaseCfg._optmeta.append(
-        OptionMetadata(None, None, default, doc, required, parser, choices, sep, redact)
+    # pylint: disable=too-many-locals
+    constraints = Constraints(min_value, max_value, pattern, min_length, max_length)
+    declaration = OptionDeclaration(
+        OptionMetadata(
+            None,
+            None,
+            default,
+            doc,
+            required,
+            parser,
+            choices,
+            sep,
+            redact,
+            tuple(env_aliases),
+            lazy,
+            compact,
+            constraints if constraints != Constraints() else None,
+        )
     )
-    return default
+    # the declaration stands in for the default until the class is created
+    return cast(OptType, declaration)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+module for caching a fully resolved BaseCfg configuration on disk, so short-lived
+processes can skip parsing their config files on startup
+
+the cache file is json; it holds the coerced values contributed by the json config
+file, the envfile and the command-line arguments (and, only if explicitly allowed,
+docker secrets) along with a key made from fingerprints of the schema and of those
+sources. Environment variables are always read directly since that is cheap and
+keeps their values (which are often secrets) out of the cache
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Sequence, Tuple, Type
+
+from .envfile import envfile_paths
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .basecfg import BaseCfg, SourceSettings
+    from .schema import CfgSchema
+
+CACHE_FORMAT = 1
+
+# the layers which may be stored in the cache
+CACHED_LAYERS = ("json", "envfile", "cli")
+SECRETS_LAYER = "secrets"
+
+
+def schema_fingerprint(schema: "CfgSchema") -> str:
+    """returns a digest of the parts of the schema which affect resolved values"""
+    digest = hashlib.sha256()
+    # the options of sections are included under their flattened names
+    options = [*schema.options.values()]
+    options.extend(
+        leaf for name, leaf in schema.leaves.items() if name not in schema.options
+    )
+    for option in options:
+        meta = option.meta
+        parser = meta.parser
+        digest.update(
+            repr(
+                (
+                    option.name,
+                    repr(meta.option_type),
+                    repr(meta.default),
+                    option.base_type,
+                    option.env_names,
+                    meta.sep,
+                    repr(meta.choices),
+                    getattr(parser, "__qualname__", repr(parser)) if parser else None,
+                )
+            ).encode("utf8")
+        )
+    return digest.hexdigest()
+
+
+def _fspath(path: Optional[str]) -> Optional[str]:
+    """returns the given path (which may be a path-like object) as a string"""
+    return os.fspath(path) if path else None
+
+
+def cache_key(
+    cfg_class: Type["BaseCfg"],
+    settings: "SourceSettings",
+    cli_args: Sequence[str],
+    fingerprints: Dict[str, Any],
+    allow_secrets: bool,
+) -> Dict[str, Any]:
+    """
+    returns the key identifying a resolved configuration: the class and its schema,
+    the paths and fingerprints of the file sources, and a digest of the arguments
+    """
+    # pylint: disable=protected-access
+    return {
+        "class": f"{cfg_class.__module__}.{cfg_class.__qualname__}",
+        "schema": schema_fingerprint(cfg_class._schema),
+        "json": [_fspath(settings.json_config_path), fingerprints.get("json")],
+        "envfile": [
+            list(envfile_paths(settings.envfile_path)),
+            fingerprints.get("envfile"),
+        ],
+        "secrets": (
+            [_fspath(settings.secrets_dir), fingerprints.get("secrets")]
+            if allow_secrets
+            else None
+        ),
+        "argv": hashlib.sha256(json.dumps(list(cli_args)).encode("utf8")).hexdigest(),
+    }
+
+
+def _current_fingerprints(
+    cfg_class: Type["BaseCfg"], settings: "SourceSettings", allow_secrets: bool
+) -> Dict[str, Any]:
+    """returns the current fingerprints of the file sources"""
+    # pylint: disable=protected-access
+    fingerprints: Dict[str, Any] = {}
+    if settings.json_config_path:
+        fingerprints["json"] = cfg_class._file_fingerprint(settings.json_config_path)
+    if settings.envfile_path:
+        fingerprints["envfile"] = cfg_class._envfile_fingerprints(settings.envfile_path)
+    if allow_secrets:
+        fingerprints["secrets"] = {
+            name: cfg_class._file_fingerprint(path)
+            for name, path in cfg_class._list_docker_secrets(
+                settings.secrets_dir, cfg_class._schema.leaves
+            ).items()
+        }
+    return fingerprints
+
+
+def _roundtrips(value: Any) -> bool:
+    """returns True if the value survives being stored as json unchanged"""
+    try:
+        decoded = json.loads(json.dumps(value))
+    except (TypeError, ValueError):
+        return False
+    return type(decoded) is type(value) and decoded == value
+
+
+def _normalize(fingerprints: Any) -> Any:
+    """returns the fingerprints as they will be after a json round trip"""
+    return json.loads(json.dumps(fingerprints))
+
+
+def _flat_names(schema: "CfgSchema", key: str, value: Any) -> Iterator[str]:
+    """
+    yields the flattened names (e.g. db__host, see CfgSchema.leaves) of the options
+    which a layer's value for the given key sets
+    """
+    # pylint: disable=protected-access
+    option = schema.sections.get(key)
+    if option is None or not isinstance(value, dict):
+        yield key
+        return
+    section_schema = option.section._schema  # type: ignore[union-attr]
+    for subkey, subvalue in value.items():
+        for name in _flat_names(section_schema, subkey, subvalue):
+            yield f"{key}__{name}"
+
+
+def _cacheable_layers(
+    cfg: "BaseCfg", allow_secrets: bool
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    returns the layers of the configuration which should be cached, or None if the
+    configuration can't be cached
+    """
+    # pylint: disable=protected-access
+    sources = CACHED_LAYERS + ((SECRETS_LAYER,) if allow_secrets else ())
+    schema = cfg._schema
+    cached: Dict[str, Dict[str, Any]] = {}
+    for source in sources:
+        layer = cfg._layers.get(source, {})
+        for key, value in layer.items():
+            for name in _flat_names(schema, key, value):
+                leaf = schema.leaves.get(name)
+                if not allow_secrets and (
+                    (leaf is not None and leaf.meta.redact)
+                    or cfg._looks_sensitive(name)
+                ):
+                    return None
+            if not _roundtrips(value):
+                return None
+        cached[source] = layer
+    return cached
+
+
+def write_cache(
+    cfg: "BaseCfg",
+    cache_path: str,
+    cli_args: Optional[Sequence[str]] = None,
+    allow_secrets: bool = False,
+) -> bool:
+    """
+    writes the resolved configuration to the cache file at cache_path (readable only
+    by the owner); returns False without writing anything if the configuration
+    can't be cached: if a value can't be stored as json, or if a sensitive value
+    (see BaseCfg.logcfg) came from a cached source and allow_secrets is False
+    """
+    # pylint: disable=protected-access
+    cached = _cacheable_layers(cfg, allow_secrets)
+    if cached is None:
+        return False
+    key = cache_key(
+        type(cfg),
+        cfg._source_settings,
+        sys.argv[1:] if cli_args is None else cli_args,
+        cfg._fingerprints,
+        allow_secrets,
+    )
+    document = {"format": CACHE_FORMAT, "key": _normalize(key), "layers": cached}
+
+    cache_dir = os.path.dirname(os.path.abspath(cache_path))
+    os.makedirs(cache_dir, exist_ok=True)
+    # write to a private (mode 0600) temp file and rename it into place so that
+    # readers never see a partial cache file
+    file_descriptor, temp_path = tempfile.mkstemp(
+        prefix=".basecfg-cache-", dir=cache_dir
+    )
+    try:
+        with os.fdopen(file_descriptor, "wt", encoding="utf8") as cache_fp:
+            json.dump(document, cache_fp)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return True
+
+
+def read_cache(
+    cfg_class: Type["BaseCfg"],
+    cache_path: str,
+    settings: "SourceSettings",
+    cli_args: Sequence[str],
+    allow_secrets: bool = False,
+) -> Optional[Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]]:
+    """
+    returns the cached layers and the current fingerprints of the file sources if
+    the cache file at cache_path exists and matches the current schema and sources,
+    otherwise None
+    """
+    try:
+        with open(cache_path, "rt", encoding="utf8") as cache_fp:
+            document = json.load(cache_fp)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(document, dict) or document.get("format") != CACHE_FORMAT:
+        return None
+    fingerprints = _current_fingerprints(cfg_class, settings, allow_secrets)
+    if (settings.json_required and fingerprints.get("json", 0) is None) or (
+        settings.envfile_required and None in fingerprints.get("envfile", ())
+    ):
+        # a required file is missing; let the normal loading raise the error
+        return None
+    key = cache_key(cfg_class, settings, cli_args, fingerprints, allow_secrets)
+    if document.get("key") != _normalize(key):
+        return None
+    return document["layers"], fingerprints
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+module for building the command-line argument parser for a BaseCfg schema
+"""
+import argparse
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Sequence, Tuple
+
+from .coercers import parse_bool
+from .lazy import Deferred
+from .validation import checked
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .schema import CfgSchema, CompiledOption
+
+Coercer = Callable[[Any], Any]
+
+
+class CfgArgumentParser(argparse.ArgumentParser):
+    """
+    CfgArgumentParser is the argument parser for a schema; the arguments of lazy
+    options are parsed with their usual actions (e.g. --flag/--no-flag, or one
+    argument per list item) but not converted, and parse_values wraps what was given
+    in a Deferred which converts it when the option is first used
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # the converters of the lazy options' parsed arguments, keyed by option name
+        self.lazy: Dict[str, Coercer] = {}
+
+    def parse_values(self, args: Sequence[str]) -> Dict[str, Any]:
+        """returns the option values given in args, keyed by (leaf) option name"""
+        values = vars(self.parse_args(args=args))
+        for name, convert in self.lazy.items():
+            raw = values.get(name)
+            if raw is not None:
+                # lists of arguments are kept as tuples so that Deferred can hash them
+                values[name] = Deferred(
+                    tuple(raw) if isinstance(raw, list) else raw, convert
+                )
+        return values
+
+
+def _argument(compiled: "CompiledOption") -> Tuple[Any, Optional[Coercer]]:
+    """returns the argparse action for the option and the type of its arguments"""
+    # pylint: disable=too-many-return-statements
+    option = compiled.meta
+    option_type = compiled.base_type
+    is_list = option_type.startswith("List[")
+    if option.parser:
+        return "store", option.parser
+    if compiled.parse_item:
+        return ("append" if is_list else "store"), compiled.parse_item
+    if option_type == "bool":
+        return argparse.BooleanOptionalAction, None
+    if option_type == "int":
+        return "store", int
+    if option_type == "float":
+        return "store", float
+    if option_type == "List[str]":
+        return "append", None
+    if option_type == "List[int]":
+        return "append", int
+    if option_type == "List[float]":
+        return "append", float
+    if option_type == "List[bool]":
+        return "append", parse_bool
+    return "store", None
+
+
+def _lazy_converter(
+    compiled: "CompiledOption", action: Any, convert: Optional[Coercer]
+) -> Coercer:
+    """
+    returns a callable which converts the parsed (but unconverted) arguments of a
+    lazy option, and checks the result (see basecfg.validation)
+    """
+
+    def convert_args(raw: Any) -> Any:
+        if convert is None:
+            return list(raw) if action == "append" else raw
+        if action == "append":
+            return [convert(item) for item in raw]
+        return convert(raw)
+
+    return checked(convert_args, compiled.check) if compiled.check else convert_args
+
+
+def build_arg_parser(
+    schema: "CfgSchema",
+    prog: Optional[str] = None,
+    description: Optional[str] = None,
+    epilog: Optional[str] = None,
+    version: Optional[str] = None,
+) -> CfgArgumentParser:
+    """
+    returns a new argument parser with an argument for every option of the schema
+    (including the options of its sections, e.g. --db-host for db.host); the parsed
+    values are stored under the option names (db__host for section options)
+    """
+    argp = CfgArgumentParser(prog=prog, description=description, epilog=epilog)
+    if version:
+        argp.add_argument("--version", action="version", version=version)
+    for optname, compiled in schema.leaves.items():
+        option = compiled.meta
+
+        # use this for as little as possible (because it doesn't get type checked)
+        # it could be good to switch to TypedDict for this
+        arg_config: Dict[str, Any] = {}
+
+        if option.compact:
+            # compact options are parsed in bulk as a single separated value (and
+            # coerce_text defers that too if they are lazy)
+            arg_config["action"] = "store"
+            arg_config["type"] = compiled.coerce_text
+        else:
+            action, convert = _argument(compiled)
+            arg_config["action"] = action
+            if option.lazy:
+                # the raw arguments are converted when the option is first used
+                argp.lazy[optname] = _lazy_converter(compiled, action, convert)
+            elif convert is not None:
+                arg_config["type"] = convert
+
+        argp.add_argument(
+            compiled.cli_flag,
+            dest=optname,
+            help=option.doc + f" (default: {repr(option.default)})",
+            required=False,
+            choices=None if option.lazy or option.compact else option.choices,
+            **arg_config,
+        )
+    return argp
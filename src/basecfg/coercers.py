@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+module for the registry of type coercers, which convert text and decoded json
+inputs into option values of types other than the basic str, int, float and bool
+(and lists of them), e.g. Path, Enum, Decimal, datetime, timedelta and Dict options
+
+the registry is keyed on type objects: plain types match their registered entry or
+that of their nearest registered base class (so every Enum subclass uses the Enum
+entry), generic types like Dict[str, int] match the entry of their origin (dict),
+whose factory builds the coercers from the registered coercers of the type
+arguments. Lookups happen once per option, when the config class is defined
+"""
+import datetime
+import json
+import re
+from decimal import Decimal, InvalidOperation
+from enum import Enum
+from functools import lru_cache
+from pathlib import PurePath
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    NamedTuple,
+    Optional,
+    Union,
+    get_args,
+    get_origin,
+)
+
+Coercer = Callable[[Any], Any]
+
+TRUE_STRINGS = frozenset(("1", "enable", "on", "true", "t", "y", "yes"))
+
+
+class TypeCoercers(NamedTuple):
+    """
+    TypeCoercers holds the callables for a type: parse converts text input (from
+    envfiles, environment variables, secrets and command-line arguments), from_json
+    converts decoded json values and format writes values as text which parse
+    accepts (see BaseCfg.to_env); parse and from_json raise ValueError for invalid
+    inputs
+    """
+
+    parse: Coercer
+    from_json: Coercer
+    format: Callable[[Any], str]
+
+
+CoercerFactory = Callable[[Any], TypeCoercers]
+
+# factories keyed on plain types (which also serve their subclasses) and on the
+# origins of generic types
+_FACTORIES: Dict[Any, CoercerFactory] = {}
+
+
+def register_type(
+    type_spec: Any,
+    parse: Coercer,
+    from_json: Optional[Coercer] = None,
+    format: Callable[[Any], str] = str,  # pylint: disable=redefined-builtin
+) -> None:
+    """
+    registers the coercers for options of the given type (and its subclasses, if
+    they aren't registered themselves); from_json defaults to parsing the text of
+    the json value. Config classes defined before the type was registered keep the
+    coercers they were compiled with
+    """
+    if from_json is None:
+        from_json = _json_via_text(parse)
+    coercers = TypeCoercers(parse, from_json, format)
+    register_type_factory(type_spec, lambda _type_spec: coercers)
+
+
+def register_type_factory(type_spec: Any, factory: CoercerFactory) -> None:
+    """
+    registers a factory which returns the coercers for the given type, for any of
+    its subclasses, or (if type_spec is the origin of generic types, e.g. dict) for
+    any parameterization of it; the factory is called with the option's type
+    """
+    _FACTORIES[type_spec] = factory
+    lookup.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def lookup(type_spec: Any) -> Optional[TypeCoercers]:
+    """
+    returns the coercers registered for the given type (Optional types are looked
+    up by the type they wrap), or None if there are none
+    """
+    args = get_args(type_spec)
+    origin = get_origin(type_spec)
+    if origin is Union and len(args) == 2 and args[1] is type(None):
+        return lookup(args[0])
+    if origin is not None:
+        factory = _FACTORIES.get(origin)
+        return factory(type_spec) if factory else None
+    for base in getattr(type_spec, "__mro__", (type_spec,)):
+        if base in _FACTORIES:
+            return _FACTORIES[base](type_spec)
+    return None
+
+
+def _json_via_text(parse: Coercer) -> Coercer:
+    """returns a json coercer which parses the text of string and number values"""
+
+    def from_json(value: Any) -> Any:
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ValueError(f"unsupported value {value!r}")
+        return parse(str(value))
+
+    return from_json
+
+
+def _exactly(value_type: type, convert: Coercer) -> Coercer:
+    """returns a json coercer which passes values of the given type through"""
+
+    def from_json(value: Any) -> Any:
+        if type(value) is value_type:  # pylint: disable=unidiomatic-typecheck
+            return value
+        return convert(value)
+
+    return from_json
+
+
+def parse_bool(value: str) -> bool:
+    """evaluates the string value in a boolean context and returns the result"""
+    return value.lower().strip() in TRUE_STRINGS
+
+
+def format_bool(value: Any) -> str:
+    """formats a boolean value as text which parse_bool accepts"""
+    return "true" if value else "false"
+
+
+register_type(str, str, _exactly(str, str))
+register_type(bool, parse_bool, _exactly(bool, bool), format_bool)
+register_type(int, int, _exactly(int, int))
+register_type(float, float, _exactly(float, float))
+
+
+def _encode_text(value: str) -> bytes:
+    """returns the utf-8 encoding of text input (not stripped)"""
+    return value.encode("utf8")
+
+
+def _decode_binary(value: Any) -> str:
+    """returns binary values, which must be utf-8 text, as text"""
+    return bytes(value).decode("utf8")
+
+
+# docker secrets don't use these: they are read as binary files (see dockersecrets)
+register_type(bytes, _encode_text, format=_decode_binary)
+register_type(
+    memoryview,
+    lambda value: memoryview(_encode_text(value)),
+    format=_decode_binary,
+)
+
+
+def _path_coercers(type_spec: Any) -> TypeCoercers:
+    """returns the coercers for a (pure) path type"""
+
+    def from_json(value: Any) -> Any:
+        if not isinstance(value, str):
+            raise ValueError(f"unsupported value {value!r}")
+        return type_spec(value)
+
+    return TypeCoercers(type_spec, from_json, str)
+
+
+register_type_factory(PurePath, _path_coercers)
+
+
+def _enum_coercers(type_spec: Any) -> TypeCoercers:
+    """
+    returns the coercers for an Enum type; members are given by name or by (the
+    text of) their value, and are written by name
+    """
+    by_text: Dict[str, Any] = {str(member.value): member for member in type_spec}
+    by_text.update(type_spec.__members__)
+
+    def parse(value: str) -> Any:
+        try:
+            return by_text[value.strip()]
+        except KeyError:
+            raise ValueError(
+                f"{value!r} is not a valid {type_spec.__name__} (one of "
+                f"{', '.join(type_spec.__members__)})"
+            ) from None
+
+    def from_json(value: Any) -> Any:
+        try:
+            return type_spec(value)
+        except ValueError:
+            if isinstance(value, str):
+                return parse(value)
+            raise
+
+    return TypeCoercers(parse, from_json, lambda member: member.name)
+
+
+register_type_factory(Enum, _enum_coercers)
+
+
+def parse_decimal(value: str) -> Decimal:
+    """parses a decimal number"""
+    try:
+        return Decimal(value.strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid decimal number {value!r}") from None
+
+
+def _decimal_from_json(value: Any) -> Decimal:
+    """converts a json number (or string) into a decimal without float rounding"""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f"unsupported value {value!r}")
+    # repr() is the shortest text which reads back as the same float
+    return parse_decimal(value if isinstance(value, str) else repr(value))
+
+
+register_type(Decimal, parse_decimal, _decimal_from_json)
+
+
+def _isoformat_coercers(type_spec: Any) -> TypeCoercers:
+    """returns the coercers for a date, datetime or time type (ISO 8601 text)"""
+
+    def parse(value: str) -> Any:
+        text = value.strip()
+        if text[-1:] in ("Z", "z"):
+            # fromisoformat only accepts the Z suffix from python 3.11
+            text = text[:-1] + "+00:00"
+        return type_spec.fromisoformat(text)
+
+    return TypeCoercers(parse, _json_via_text(parse), lambda value: value.isoformat())
+
+
+register_type_factory(datetime.date, _isoformat_coercers)
+register_type_factory(datetime.time, _isoformat_coercers)
+
+_DURATION_UNITS = {
+    "w": "weeks",
+    "d": "days",
+    "h": "hours",
+    "m": "minutes",
+    "s": "seconds",
+    "ms": "milliseconds",
+    "us": "microseconds",
+}
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_DURATION = re.compile(r"(?:\d+(?:\.\d+)?(?:ms|us|[wdhms]))+")
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|us|[wdhms])")
+_CLOCK = re.compile(r"(\d+):(\d{1,2}):(\d{1,2}(?:\.\d+)?)")
+
+
+def parse_duration(value: str) -> datetime.timedelta:
+    """
+    parses a duration given in seconds ("90", "1.5"), with units ("1h30m", "2d",
+    "500ms"; w, d, h, m, s, ms and us) or as hours:minutes:seconds ("01:30:00")
+    """
+    text = "".join(value.split()).lower()
+    sign = -1 if text.startswith("-") else 1
+    text = text.lstrip("+-")
+    if _NUMBER.fullmatch(text):
+        return sign * datetime.timedelta(seconds=float(text))
+    clock = _CLOCK.fullmatch(text)
+    if clock:
+        hours, minutes, seconds = clock.groups()
+        return sign * datetime.timedelta(
+            hours=int(hours), minutes=int(minutes), seconds=float(seconds)
+        )
+    if not _DURATION.fullmatch(text):
+        raise ValueError(f"invalid duration {value!r}")
+    total = datetime.timedelta()
+    for number, unit in _DURATION_PART.findall(text):
+        total += datetime.timedelta(**{_DURATION_UNITS[unit]: float(number)})
+    return sign * total
+
+
+def format_duration(value: datetime.timedelta) -> str:
+    """formats a duration as text which parse_duration reads back exactly"""
+    if value < datetime.timedelta():
+        return "-" + format_duration(-value)
+    hours, rest = divmod(value.seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    parts = [
+        f"{count}{unit}"
+        for count, unit in ((value.days, "d"), (hours, "h"), (minutes, "m"))
+        if count
+    ]
+    if value.microseconds:
+        parts.append(f"{seconds}.{value.microseconds:06d}".rstrip("0") + "s")
+    elif seconds or not parts:
+        parts.append(f"{seconds}s")
+    return "".join(parts)
+
+
+def _duration_from_json(value: Any) -> datetime.timedelta:
+    """converts a json number of seconds (or a duration string) into a timedelta"""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f"unsupported value {value!r}")
+    if isinstance(value, str):
+        return parse_duration(value)
+    return datetime.timedelta(seconds=value)
+
+
+register_type(datetime.timedelta, parse_duration, _duration_from_json, format_duration)
+
+
+def _dict_coercers(type_spec: Any) -> TypeCoercers:
+    """
+    returns the coercers for a Dict[K, V] type (or a plain dict, of strings) from
+    the registered coercers of K and V; text input is either a json object or
+    comma-separated key=value pairs, and values are written as json objects
+    """
+    key_type, value_type = get_args(type_spec) or (str, str)
+    keys = lookup(key_type)
+    values = lookup(value_type)
+    if keys is None or values is None:
+        raise TypeError(f"no coercers are registered for the arguments of {type_spec}")
+    plain_json = value_type in (str, int, float, bool)
+
+    def from_json(value: Any) -> Any:
+        if not isinstance(value, dict):
+            raise ValueError(f"expected a json object, not {value!r}")
+        # json object keys are always text
+        return {keys.parse(key): values.from_json(val) for key, val in value.items()}
+
+    def parse(value: str) -> Any:
+        text = value.strip()
+        if text.startswith("{"):
+            return from_json(json.loads(text))
+        result = {}
+        for pair in filter(None, (item.strip() for item in text.split(","))):
+            key, sep, val = pair.partition("=")
+            if not sep:
+                raise ValueError(f"expected key=value, not {pair!r}")
+            result[keys.parse(key.strip())] = values.parse(val.strip())
+        return result
+
+    def format_dict(value: Dict[Any, Any]) -> str:
+        return json.dumps(
+            {
+                keys.format(key): val if plain_json else values.format(val)
+                for key, val in value.items()
+            },
+            separators=(",", ":"),
+        )
+
+    return TypeCoercers(parse, from_json, format_dict)
+
+
+register_type_factory(dict, _dict_coercers)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+module for options declared with opt(compact=True), whose List[int] or List[float]
+values are stored in an array.array (8 bytes per item, or fewer with an explicit
+typecode) rather than a list of boxed numbers
+
+text inputs which are plain json numbers joined by the option's separator are
+parsed in bulk by the json decoder, without splitting them into a list of strings
+first; other text falls back to converting the items one by one. Json array inputs
+are checked and converted in a single pass by the array constructor
+"""
+import json
+import re
+from array import array
+from typing import Any, Callable, Union
+
+Coercer = Callable[[Any], Any]
+
+INT_TYPECODES = "bBhHiIlLqQ"
+FLOAT_TYPECODES = "fd"
+
+# json's number syntax, which is stricter than int() and float()
+_JSON_INT = r"-?(?:0|[1-9]\d*)"
+_JSON_FLOAT = r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?"
+
+
+def compact_typecode(name: str, compact: Union[bool, str], option_type: str) -> str:
+    """
+    returns the array typecode for a compact option: "q" for List[int] and "d" for
+    List[float] when compact is True, otherwise the given typecode, which must suit
+    the item type
+    """
+    if option_type not in ("List[int]", "List[float]"):
+        raise TypeError(
+            f"{name}: only List[int] and List[float] options can be compact"
+        )
+    is_int = option_type == "List[int]"
+    if compact is True:
+        return "q" if is_int else "d"
+    typecodes = INT_TYPECODES if is_int else FLOAT_TYPECODES
+    if not isinstance(compact, str) or compact not in typecodes:
+        raise TypeError(
+            f"{name}: compact must be True or one of the array typecodes "
+            f'"{typecodes}" for {option_type} options'
+        )
+    return compact
+
+
+def compact_default(default: Any, typecode: str) -> Any:
+    """returns the default of a compact option as an array (None stays None)"""
+    return None if default is None else array(typecode, default)
+
+
+def compact_text_coercer(name: str, typecode: str, sep: str) -> Coercer:
+    """returns a callable which parses separated numbers into an array"""
+    is_int = typecode in INT_TYPECODES
+    item = _JSON_INT if is_int else _JSON_FLOAT
+    separator = rf"\s*{re.escape(sep)}\s*"
+    bulk = re.compile(rf"\s*{item}(?:{separator}{item})*\s*")
+    convert = int if is_int else float
+
+    def coerce(value: str) -> array:
+        try:
+            if bulk.fullmatch(value):
+                text = value if sep == "," else value.replace(sep, ",")
+                return array(typecode, json.loads(f"[{text}]"))
+            return array(typecode, map(convert, value.split(sep)))
+        except OverflowError as exc:
+            raise ValueError(f"{name}: {exc}") from None
+
+    return coerce
+
+
+def compact_json_coercer(name: str, typecode: str) -> Coercer:
+    """returns a callable which converts a decoded json array into an array"""
+
+    def coerce(value: Any) -> array:
+        if isinstance(value, array) and value.typecode == typecode:
+            return value
+        if not isinstance(value, list):
+            raise TypeError(
+                f"{name}: expected a json array, not {type(value).__name__}"
+            )
+        try:
+            return array(typecode, value)
+        except (TypeError, OverflowError) as exc:
+            raise TypeError(f"{name}: {exc}") from None
+
+    return coerce
+
+
+def json_default(value: Any) -> list:
+    """converts compact (array) values for json.dumps"""
+    if isinstance(value, array):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+module for reading docker secrets - one file per secret in the secrets directory,
+named after the option it sets
+
+secrets for options of type bytes or memoryview aren't read while loading: their
+value is a Deferred read of the file (see basecfg.lazy), which happens on first
+access, without decoding or stripping the contents; large memoryview secrets are
+memory-mapped rather than copied
+"""
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Container, Dict, Mapping, Optional
+
+from .lazy import Deferred
+
+# docker secrets are read on a thread pool when at least this many are present; on
+# local disks sequential reads are faster, the pool only pays off on slow
+# (network-backed) secret volumes with many files
+SECRETS_POOL_THRESHOLD = 64
+SECRETS_POOL_WORKERS = 4
+
+# memoryview secrets at least this large are memory-mapped instead of read
+SECRETS_MMAP_THRESHOLD = 64 * 1024
+
+
+def list_docker_secrets(
+    secrets_dir: str = "/run/secrets/",
+    names: Optional[Container[str]] = None,
+) -> Dict[str, str]:
+    """
+    return a dict mapping names to full paths for docker secrets found
+    on disk; if names is given, only secrets with those names are included
+    """
+    result: Dict[str, str] = {}
+    try:
+        dircontents = os.scandir(secrets_dir)
+    except FileNotFoundError:
+        return result
+    with dircontents:
+        for entry in dircontents:
+            if entry.name.startswith("."):
+                continue
+            if names is not None and entry.name not in names:
+                continue
+            # note: is_file follows symlinks (e.g. kubernetes secret volumes)
+            if not entry.is_file():
+                continue
+            result[entry.name] = os.path.abspath(entry.path)
+    return result
+
+
+def read_docker_secret(
+    path: str,
+    open_mode: str = "rt",
+    encoding: Optional[str] = "utf-8",
+    strip_whitespace: bool = True,
+) -> str:
+    """
+    open the secrets directory, look for a file with the given name; return its
+    contents, optionally stripping whitespace from the value
+    """
+    with open(path, open_mode, encoding=encoding) as secret:
+        contents = secret.read()
+    if strip_whitespace:
+        return contents.strip()
+    return contents
+
+
+def read_binary_secret(path: str) -> bytes:
+    """returns the contents of the secret at the given path, as they are"""
+    with open(path, "rb") as secret:
+        return secret.read()
+
+
+def map_binary_secret(path: str) -> memoryview:
+    """
+    returns a read-only view of the contents of the secret at the given path; large
+    secrets are memory-mapped, so their pages are shared between processes
+    """
+    with open(path, "rb") as secret:
+        size = os.fstat(secret.fileno()).st_size
+        if size < SECRETS_MMAP_THRESHOLD:
+            return memoryview(secret.read())
+        # the mapping stays valid after the file is closed (or replaced, as
+        # kubernetes does when it updates a secret)
+        return memoryview(mmap.mmap(secret.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def read_docker_secrets(
+    paths: Dict[str, str],
+    read: Callable[[str], str] = read_docker_secret,
+    binary: Optional[Mapping[str, Callable[[str], Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    given a dict mapping option names to docker secret paths (see
+    list_docker_secrets) return a dict mapping the names to the contents of the
+    secrets, as returned by "read"; when there are many secrets they are read
+    concurrently. The secrets named in "binary" (which maps their names to binary
+    readers) aren't read, their values are Deferred reads instead
+    """
+    deferred: Dict[str, Any] = {}
+    if binary:
+        deferred = {
+            name: Deferred(path, binary[name])
+            for name, path in paths.items()
+            if name in binary
+        }
+        paths = {name: path for name, path in paths.items() if name not in binary}
+    if not deferred:
+        return _read_text_secrets(paths, read)
+    return {**_read_text_secrets(paths, read), **deferred}
+
+
+def _read_text_secrets(
+    paths: Dict[str, str], read: Callable[[str], str]
+) -> Dict[str, str]:
+    """reads the given secrets, concurrently if there are many"""
+    if len(paths) < SECRETS_POOL_THRESHOLD:
+        return {name: read(path) for name, path in paths.items()}
+    with ThreadPoolExecutor(
+        max_workers=SECRETS_POOL_WORKERS, thread_name_prefix="basecfg-secrets"
+    ) as pool:
+        return dict(zip(paths, pool.map(read, paths.values())))
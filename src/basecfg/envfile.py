@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+module for reading environment files (aka .env) - the format supported is described
+in the "docker run" (NOT compose) documentation. Notably no quotation marks nor
+multi-line values are supported and comments are only valid at the beginning of the
+line
+
+files are parsed a line at a time, and the parsed contents are memoized by path
+and fingerprint (inode, mtime and size) so unchanged files aren't parsed again
+"""
+import os
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple, Union
+
+Fingerprint = Tuple[int, int, int]
+EnvfilePaths = Union[str, "os.PathLike[str]", Sequence[Union[str, "os.PathLike[str]"]]]
+
+# path -> (fingerprint, parsed contents) of the envfiles read so far
+_parsed: Dict[str, Tuple[Fingerprint, Dict[str, str]]] = {}
+_parsed_lock = threading.Lock()
+
+
+def envfile_paths(envfile_path: Optional[EnvfilePaths]) -> Tuple[str, ...]:
+    """returns the given envfile path, or sequence of paths, as a tuple of paths"""
+    if not envfile_path:
+        return ()
+    if isinstance(envfile_path, (str, os.PathLike)):
+        return (os.fspath(envfile_path),)
+    return tuple(os.fspath(path) for path in envfile_path)
+
+
+def parse_envfile(lines: Iterable[str], path: str = "<envfile>") -> Dict[str, str]:
+    """
+    parse the entries in the given lines of an environment file; keys are lowercased
+    and later entries replace earlier ones
+    """
+    result: Dict[str, str] = {}
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line or line[0] == "#":
+            continue
+        key, sep, value = line.partition("=")
+        if not sep:
+            raise ValueError(
+                f'envfile parsing error; file:"{path}" line:{i}; data line '
+                f'contains no "=" character'
+            )
+        result[key.lower().strip()] = value.strip()
+    return result
+
+
+def read_envfile(path: str, required: bool = False) -> Dict[str, str]:
+    """
+    parse the entries in the environment file at the given path, or return the
+    memoized result if the file hasn't changed since it was last parsed. Missing
+    files are treated as empty unless required is True
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError as fnf:
+        if not required:
+            return {}
+        raise fnf from None
+    fingerprint = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    memoized = _parsed.get(path)
+    if memoized is not None and memoized[0] == fingerprint:
+        return dict(memoized[1])
+
+    with open(path, "rt", encoding="utf8") as dotenv:
+        # fingerprint the file which was actually opened, in case it was replaced
+        stat = os.fstat(dotenv.fileno())
+        result = parse_envfile(dotenv, path)
+    with _parsed_lock:
+        _parsed[path] = ((stat.st_ino, stat.st_mtime_ns, stat.st_size), result)
+    return dict(result)
+
+
+def read_envfiles(paths: Iterable[str], required: bool = False) -> Dict[str, str]:
+    """
+    parse the entries in each of the given environment files in turn, with entries
+    in later files replacing those in earlier ones
+    """
+    result: Dict[str, str] = {}
+    for path in paths:
+        result.update(read_envfile(path, required))
+    return result
+
+
+def clear_envfile_cache() -> None:
+    """forget the memoized contents of all environment files"""
+    with _parsed_lock:
+        _parsed.clear()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+module for exporting resolved BaseCfg configurations as a dict, json, an envfile or
+command-line arguments, e.g. to pass them on to subprocesses and sidecars
+
+the values of all the options are fetched at once with the schema's values_getter
+and redaction uses the schema's precomputed redaction plan (see BaseCfg.logcfg);
+redacted exports are meant for display, their placeholders can't be loaded back
+"""
+import json
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .basecfg import BaseCfg
+    from .schema import CompiledOption
+
+
+def to_dict(cfg: "BaseCfg", redact: bool = False) -> Dict[str, Any]:
+    """
+    returns a dict mapping the option names (in declaration order) to their
+    values, with sections as nested dicts; the values are not copied
+    """
+    if redact:
+        return redacted_dict(cfg, True)
+    # pylint: disable=protected-access
+    schema = cfg._schema
+    values = dict(zip(schema.names, schema.values_getter(cfg)))
+    for name in schema.sections:
+        values[name] = to_dict(values[name])
+    return values
+
+
+def redacted_dict(cfg: "BaseCfg", autoredact: bool = True) -> Dict[str, Any]:
+    """
+    returns the configuration as a dict (see to_dict) with the values logcfg would
+    redact replaced by their placeholders
+    """
+    # pylint: disable=protected-access
+    schema = cfg._schema
+    plan = cfg._redaction_plan(autoredact)
+    values = dict(zip(schema.names, schema.values_getter(cfg)))
+    for name in schema.sections:
+        if name not in plan:
+            values[name] = redacted_dict(values[name], autoredact)
+    values.update(plan)
+    return values
+
+
+def _json_value(option: "CompiledOption", value: Any) -> Any:
+    """
+    returns the value (or list item) as json can encode it: values of other types
+    are written by the option's format_item, as text which coerces back to them
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple, array)):
+        return [_json_value(option, item) for item in value]
+    if isinstance(value, dict):
+        # the registered coercers format Dict values as json objects
+        return json.loads(option.format_item(value)) if option.parse_item else value
+    return option.format_item(value)
+
+
+def _json_dict(cfg: "BaseCfg", redact: bool) -> Dict[str, Any]:
+    """returns the configuration as a dict (see to_dict) which json can encode"""
+    # pylint: disable=protected-access
+    schema = cfg._schema
+    plan = cfg._redaction_plan(True) if redact else {}
+    values: Dict[str, Any] = {}
+    for option, value in zip(schema.options.values(), schema.values_getter(cfg)):
+        if option.name in plan:
+            values[option.name] = plan[option.name]
+        elif option.section is not None:
+            values[option.name] = _json_dict(value, redact)
+        else:
+            values[option.name] = _json_value(option, value)
+    return values
+
+
+def to_json(cfg: "BaseCfg", redact: bool = False, **dumps_kwargs: Any) -> str:
+    """
+    returns the configuration as a json object (see to_dict); values of types json
+    can't encode (e.g. Path, Decimal or datetime) are written as text
+    """
+    return json.dumps(_json_dict(cfg, redact), **dumps_kwargs)
+
+
+def _exported(
+    cfg: "BaseCfg", redact: bool, skip_defaults: bool
+) -> Iterator[Tuple["CompiledOption", Any, bool]]:
+    """
+    yields (compiled option, value, redacted) for each option which should be
+    exported as text; None values and empty lists (which can't be written as text)
+    are skipped if they are the option's default, otherwise they raise ValueError;
+    the options of sections are yielded under their flattened names (e.g. db__host)
+    """
+    # pylint: disable=protected-access
+    schema = cfg._schema
+    plan = cfg._redaction_plan(True) if redact else {}
+    for option, value in zip(schema.options.values(), schema.values_getter(cfg)):
+        if option.name in plan and option.section is not None:
+            # every option of a redacted section is redacted
+            prefix = option.name + "__"
+            for name, leaf in schema.leaves.items():
+                if name.startswith(prefix):
+                    yield leaf, plan[option.name], True
+            continue
+        if option.name in plan:
+            yield option, plan[option.name], True
+            continue
+        if option.section is not None:
+            for leaf, leaf_value, redacted in _exported(value, redact, skip_defaults):
+                yield schema.leaves[f"{option.name}__{leaf.name}"], leaf_value, redacted
+            continue
+        default = option.meta.default
+        if value is None or (isinstance(value, (list, array)) and not value):
+            if value == default:
+                continue
+            raise ValueError(f"{option.name}: {value!r} can't be exported as text")
+        if skip_defaults and value == default:
+            continue
+        yield option, value, False
+
+
+def _text(option: "CompiledOption", item: Any) -> str:
+    """formats a single value (or list item) as text which coerces back to it"""
+    text = option.format_item(item)
+    if "\n" in text or "\r" in text or text != text.strip():
+        raise ValueError(
+            f"{option.name}: {item!r} can't be exported as text (it contains line "
+            "breaks or leading or trailing whitespace)"
+        )
+    return text
+
+
+def _joined(option: "CompiledOption", value: Any) -> str:
+    """formats a list value as text: its items joined by the option's separator"""
+    sep = option.meta.sep
+    items = [_text(option, item) for item in value]
+    if any(sep in item for item in items):
+        raise ValueError(
+            f'{option.name}: list items containing the separator "{sep}" '
+            "can't be exported as text"
+        )
+    return sep.join(items)
+
+
+def _value_text(option: "CompiledOption", value: Any) -> str:
+    """
+    formats a value as the text of one envfile line (or one argument for a custom
+    parser); the custom parser of an option is run on the text, so that values
+    which it doesn't read back as they are raise ValueError rather than loading as
+    something else
+    """
+    if isinstance(value, (list, array)):
+        text = _joined(option, value)
+    else:
+        text = _text(option, value)
+    parser = option.meta.parser
+    if parser is not None:
+        try:
+            loaded = parser(text)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(
+                f"{option.name}: {value!r} can't be exported as text ({exc})"
+            ) from None
+        if loaded != value:
+            raise ValueError(
+                f"{option.name}: {value!r} can't be exported as text (its parser "
+                f"reads {text!r} back as {loaded!r})"
+            )
+    return text
+
+
+def to_env(cfg: "BaseCfg", redact: bool = False, skip_defaults: bool = False) -> str:
+    """
+    returns the configuration in the envfile format read by BaseCfg (one NAME=value
+    line per option, list items joined by the option's separator); options with
+    their default value are left out if skip_defaults is True. Raises ValueError for
+    values which can't be written as text that loads back as them
+    """
+    lines: List[str] = []
+    for option, value, redacted in _exported(cfg, redact, skip_defaults):
+        text = value if redacted else _value_text(option, value)
+        lines.append(f"{option.name.upper()}={text}\n")
+    return "".join(lines)
+
+
+def to_args(
+    cfg: "BaseCfg", redact: bool = False, skip_defaults: bool = False
+) -> List[str]:
+    """
+    returns the configuration as command-line arguments for the config class
+    (--option=value, --flag / --no-flag for booleans, and the option repeated for
+    each list item); options with their default value are left out if
+    skip_defaults is True. Raises ValueError like to_env
+    """
+    args: List[str] = []
+    for option, value, redacted in _exported(cfg, redact, skip_defaults):
+        flag = option.cli_flag
+        if redacted:
+            args.append(f"{flag}={value}")
+        elif option.meta.parser or option.meta.compact:
+            # custom parsers and compact options take the whole value as a single
+            # argument
+            args.append(f"{flag}={_value_text(option, value)}")
+        elif option.base_type == "bool":
+            args.append(flag if value else "--no-" + flag[2:])
+        elif isinstance(value, (list, array)):
+            args.extend(f"{flag}={option.format_item(item)}" for item in value)
+        else:
+            args.append(f"{flag}={option.format_item(value)}")
+    return args
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+module for immutable, __slots__-backed snapshots of resolved BaseCfg configurations
+"""
+from array import array
+from operator import attrgetter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    Tuple,
+    Type,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .basecfg import BaseCfg
+
+
+class FrozenDict(Mapping):
+    """
+    FrozenDict is the read-only mapping which dict values are frozen into; unlike
+    a MappingProxyType it can be hashed and pickled
+    """
+
+    __slots__ = ("_items", "_hash")
+
+    def __init__(self, items: Mapping[Any, Any]) -> None:
+        self._items: Dict[Any, Any] = dict(items)
+        self._hash: Any = None
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._items[key]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._items)
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(frozenset(self._items.items()))
+        return self._hash
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (FrozenDict, (self._items,))
+
+    def __repr__(self) -> str:
+        return f"FrozenDict({self._items!r})"
+
+
+def freeze_value(value: Any) -> Any:
+    """returns an immutable equivalent of the given (option) value"""
+    if isinstance(value, (list, array)):
+        return tuple(value)
+    if isinstance(value, set):
+        return frozenset(value)
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze_value(item) for key, item in value.items()})
+    return value
+
+
+class FrozenCfg:
+    """
+    FrozenCfg is the base class of the snapshot classes generated for each BaseCfg
+    subclass (see BaseCfg.freeze); a class is generated per schema, with one slot
+    per option, so instances have no __dict__ and can't be modified. List values
+    are stored as tuples (and dicts as FrozenDicts) so that snapshots can be hashed
+    """
+
+    __slots__ = ()
+    _cfg_class: "Type[BaseCfg]"
+    _fields: Tuple[str, ...] = ()
+    _values_getter: Callable[[Any], Tuple[Any, ...]]
+
+    def __init__(self, values: Iterable[Any]) -> None:
+        """
+        creates a snapshot from the values of the options, in declaration order; the
+        values should already be immutable (see freeze_value)
+        """
+        setter = object.__setattr__
+        for name, value in zip(self._fields, values, strict=True):
+            setter(self, name, value)
+
+    def _values(self) -> Tuple[Any, ...]:
+        """returns the values of the options as a tuple, in declaration order"""
+        return self._values_getter(self)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is frozen; can't set {name}")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is frozen; can't delete {name}")
+
+    def __getitem__(self, key: str) -> Any:
+        """returns the value for the given configuration variable"""
+        if key not in self._fields:
+            raise KeyError(f'key "{key}" not found')
+        return getattr(self, key)
+
+    def __len__(self) -> int:
+        """returns the number of configuration options"""
+        return len(self._fields)
+
+    def __iter__(self) -> Iterator[str]:
+        """returns keys iterator"""
+        return iter(self._fields)
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):  # pylint: disable=unidiomatic-typecheck
+            return NotImplemented
+        return self._values() == other._values()  # type: ignore[attr-defined]
+
+    def __hash__(self) -> int:
+        return hash((type(self), self._values()))
+
+    def __copy__(self) -> "FrozenCfg":
+        return self
+
+    def __deepcopy__(self, _memo: Any) -> "FrozenCfg":
+        return self
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # the generated classes can't be found by pickle, but the config classes
+        # they are generated from can
+        return (_restore_frozen, (self._cfg_class, self._values()))
+
+    def __repr__(self) -> str:
+        items = ", ".join(
+            f"{name}={value!r}" for name, value in zip(self._fields, self._values())
+        )
+        return f"{type(self).__name__}({items})"
+
+
+def _restore_frozen(cfg_class: "Type[BaseCfg]", values: Tuple[Any, ...]) -> FrozenCfg:
+    """unpickles a snapshot of the given config class"""
+    # pylint: disable=protected-access
+    return cfg_class._schema.frozen_class(cfg_class)(values)
+
+
+def tuple_getter(fields: Tuple[str, ...]) -> Callable[[Any], Tuple[Any, ...]]:
+    """returns a callable which returns the named attributes of an object as a tuple"""
+    if len(fields) > 1:
+        return attrgetter(*fields)
+    # attrgetter only returns a tuple when given more than one name
+    getters = [attrgetter(name) for name in fields]
+
+    def values_getter(obj: Any) -> Tuple[Any, ...]:
+        return tuple(getter(obj) for getter in getters)
+
+    return values_getter
+
+
+def make_frozen_class(cfg_class: "Type[BaseCfg]", fields: Tuple[str, ...]) -> type:
+    """generates the snapshot class for the given config class and option names"""
+    return type(
+        f"{cfg_class.__name__}Frozen",
+        (FrozenCfg,),
+        {
+            "__slots__": fields,
+            "__module__": cfg_class.__module__,
+            "__doc__": f"immutable snapshot of a {cfg_class.__name__} configuration",
+            "_cfg_class": cfg_class,
+            "_fields": fields,
+            "_values_getter": staticmethod(tuple_getter(fields)),
+        },
+    )
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+module for decoding json config files, with a pluggable decoder and an optional
+mode which only decodes the top-level keys a schema declares
+
+the key-filtered mode walks the top-level object one value at a time with the
+standard library's (C accelerated) scanner, whichever decoder is configured: the
+values it scans are kept for declared keys and discarded at once for the others, so
+peak memory is bounded by the largest single value rather than the whole document
+"""
+import json
+from json.decoder import WHITESPACE, scanstring  # type: ignore[attr-defined]
+from typing import Any, Callable, Container, Dict, Union
+
+try:
+    import orjson  # type: ignore[import-not-found,unused-ignore]
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+JsonDecoder = Callable[[Union[str, bytes]], Any]
+
+# the (C accelerated, where available) scanner json.loads uses for each value
+_scan_once = json.JSONDecoder().scan_once  # type: ignore[attr-defined]
+
+
+def stdlib_decoder(data: Union[str, bytes]) -> Any:
+    """decodes json with the standard library json module"""
+    return json.loads(data)
+
+
+def get_decoder(name: Union[str, JsonDecoder]) -> JsonDecoder:
+    """
+    returns the json decoder with the given name: "json" (the standard library),
+    "orjson" (which must be installed) or "auto" (orjson if it is installed,
+    otherwise the standard library); callables are returned as-is
+    """
+    if callable(name):
+        return name
+    if name == "json":
+        return stdlib_decoder
+    if name in ("orjson", "auto"):
+        if orjson is not None:
+            return orjson.loads  # pylint: disable=no-member
+        if name == "auto":
+            return stdlib_decoder
+        raise RuntimeError('the "orjson" json decoder requires the orjson package')
+    raise ValueError(f'unknown json decoder "{name}"')
+
+
+def _at_end(text: str, idx: int, result: Dict[str, Any]) -> Dict[str, Any]:
+    """returns result if only whitespace follows idx in text, as json.loads requires"""
+    end = WHITESPACE.match(text, idx).end()
+    if end != len(text):
+        raise json.JSONDecodeError("Extra data", text, end)
+    return result
+
+
+def decode_keys(text: str, keys: Container[str]) -> Dict[str, Any]:
+    """
+    decodes only the given keys of the json object in text; later duplicate keys
+    replace earlier ones, as with json.loads
+    """
+    result: Dict[str, Any] = {}
+    idx = WHITESPACE.match(text, 0).end()
+    if text[idx : idx + 1] != "{":
+        raise ValueError("the json config file must contain an object")
+    idx = WHITESPACE.match(text, idx + 1).end()
+    if text[idx : idx + 1] == "}":
+        return _at_end(text, idx + 1, result)
+    while True:
+        if text[idx : idx + 1] != '"':
+            raise json.JSONDecodeError("Expecting property name", text, idx)
+        key, idx = scanstring(text, idx + 1)
+        idx = WHITESPACE.match(text, idx).end()
+        if text[idx : idx + 1] != ":":
+            raise json.JSONDecodeError("Expecting ':' delimiter", text, idx)
+        idx = WHITESPACE.match(text, idx + 1).end()
+        try:
+            value, end = _scan_once(text, idx)
+        except StopIteration as stop:
+            raise json.JSONDecodeError("Expecting value", text, stop.value) from None
+        if key in keys:
+            result[key] = value
+        # the values of other keys are dropped as soon as they are scanned
+        idx = WHITESPACE.match(text, end).end()
+        char = text[idx : idx + 1]
+        if char == "}":
+            return _at_end(text, idx + 1, result)
+        if char != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", text, idx)
+        idx = WHITESPACE.match(text, idx + 1).end()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+module for options declared with opt(lazy=True), whose values are only coerced
+(e.g. by an expensive custom parser) when they are first used
+
+while loading, the sources record the raw input they hold for a lazy option wrapped
+in a Deferred, without coercing it; the option's class attribute is a
+LazyDescriptor, which coerces the input from the highest-precedence source on first
+access and caches the result in the instance's __dict__. Inputs which are overridden
+by a later source are never coerced at all
+"""
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .basecfg import BaseCfg
+
+Coercer = Callable[[Any], Any]
+
+_UNSET = object()
+
+
+class Deferred:
+    """
+    Deferred holds the raw input for a lazy option and the callable which coerces
+    it; the input is coerced at most once
+    """
+
+    __slots__ = ("raw", "coerce", "_value")
+
+    def __init__(self, raw: Any, coerce: Coercer) -> None:
+        self.raw = raw
+        self.coerce = coerce
+        self._value: Any = _UNSET
+
+    def resolve(self) -> Any:
+        """returns the coerced value, coercing the raw input on first use"""
+        if self._value is _UNSET:
+            self._value = self.coerce(self.raw)
+        return self._value
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Deferred):
+            return NotImplemented
+        return self.raw == other.raw and self.coerce == other.coerce
+
+    def __hash__(self) -> int:
+        return hash(self.raw)
+
+    def __repr__(self) -> str:
+        return f"Deferred({self.raw!r})"
+
+
+def deferring(coerce: Coercer) -> Coercer:
+    """returns a callable which wraps raw inputs in a Deferred instead of coercing"""
+    return lambda raw: Deferred(raw, coerce)
+
+
+class LazyDescriptor:
+    """
+    LazyDescriptor is the class attribute of a lazy option; on first access it
+    resolves the option's value and stores it in the instance's __dict__, which takes
+    precedence over this (non-data) descriptor from then on
+    """
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Optional["BaseCfg"], owner: Any = None) -> Any:
+        if instance is None:
+            return self
+        # pylint: disable=protected-access
+        value = instance._effective_value(self.name)
+        if isinstance(value, Deferred):
+            value = value.resolve()
+        instance.__dict__[self.name] = value
+        return value
+
+    def __repr__(self) -> str:
+        return f"<lazy option {self.name}>"
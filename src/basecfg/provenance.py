@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+module for working out which source set each option of a BaseCfg instance
+
+nothing extra is recorded while loading: every instance already keeps the values
+each source contributed (its layers, see BaseCfg.reload), so provenance is derived
+from those only when it is asked for
+"""
+import os
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from .envfile import envfile_paths, read_envfile
+from .lazy import Deferred
+from .schema import SOURCE_ORDER
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .basecfg import BaseCfg
+
+# the source codes (of a configuration without additional sources), in order of
+# precedence; "assigned" means the attribute was set directly (after loading) to a
+# value which no source provided
+SOURCES = ("default", *SOURCE_ORDER, "assigned")
+
+
+def source_names(cfg: "BaseCfg") -> Tuple[str, ...]:
+    """
+    returns the names of the sources of the given configuration, indexed by source
+    code: SOURCES, with any additional sources (see basecfg.sources) in their place
+    """
+    # pylint: disable=protected-access
+    order = cfg._source_order
+    return SOURCES if order is SOURCE_ORDER else ("default", *order, "assigned")
+
+
+def _source_code(cfg: "BaseCfg", key: str, names: Tuple[str, ...]) -> int:
+    """returns the code (index into names) of the source of the given option"""
+    # pylint: disable=protected-access
+    layers = cfg._layers
+    value: Any = cfg._schema.metadata[key].default
+    code = 0
+    assigned = len(names) - 1
+    for index in range(assigned - 1, 0, -1):
+        layer = layers.get(names[index])
+        if layer and key in layer:
+            value = layer[key]
+            code = index
+            break
+    if key in cfg._schema.sections:
+        # sections can't be assigned; they are (lazily) built from their layers
+        return code
+    if isinstance(value, Deferred):
+        if key not in cfg.__dict__:
+            # not used (nor assigned) yet
+            return code
+        value = value.resolve()
+    current = getattr(cfg, key)
+    if current is not value and current != value:
+        return assigned
+    return code
+
+
+def source_codes(cfg: "BaseCfg") -> array:
+    """
+    returns the source code (index into source_names) of every option, in
+    declaration order, as a compact array of bytes
+    """
+    # pylint: disable=protected-access
+    names = source_names(cfg)
+    return array("B", (_source_code(cfg, key, names) for key in cfg._schema.names))
+
+
+def source_of(cfg: "BaseCfg", key: str) -> str:
+    """returns the name of the source (see source_names) which set the given option"""
+    # pylint: disable=protected-access
+    if key not in cfg._schema:
+        raise KeyError(f'key "{key}" not found')
+    names = source_names(cfg)
+    return names[_source_code(cfg, key, names)]
+
+
+def source_detail(cfg: "BaseCfg", key: str) -> Optional[str]:
+    """
+    returns where the value of the given option came from: the path of the json
+    config file, envfile or docker secret, the name of the environment variable or
+    the command-line flag; None for defaults and assigned values. Environment
+    variables and layered envfiles are looked up again when this is called
+    """
+    # pylint: disable=protected-access,too-many-return-statements
+    source = source_of(cfg, key)
+    settings = cfg._source_settings
+    if source == "json":
+        return os.fspath(settings.json_config_path or "")
+    if source == "envfile":
+        for path in reversed(envfile_paths(settings.envfile_path)):
+            if key in read_envfile(path):
+                return path
+        return None
+    if source == "envvars":
+        for name in cfg._schema.options[key].env_names:
+            if name in os.environ:
+                return name
+        return None
+    if source == "secrets":
+        return cfg._list_docker_secrets(settings.secrets_dir, (key,)).get(key)
+    if source == "cli":
+        return cfg._schema.options[key].cli_flag
+    for additional in settings.sources:
+        if additional.name == source:
+            return additional.detail(key)
+    return None
+
+
+def provenance(cfg: "BaseCfg") -> Dict[str, str]:
+    """returns a dict mapping each option name to the name of its source"""
+    # pylint: disable=protected-access
+    names = source_names(cfg)
+    return {key: names[code] for key, code in zip(cfg._schema.names, source_codes(cfg))}
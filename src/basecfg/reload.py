@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+module for re-reading the sources of a BaseCfg configuration which have changed
+since they were last read (see BaseCfg.reload); files are only read again if their
+fingerprint (inode, mtime and size) differs
+"""
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .lazy import Deferred
+from .sections import section_layers
+from .validation import ValidationError, violations
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .basecfg import BaseCfg
+
+
+def read_changed_sources(
+    cfg: "BaseCfg",
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+    """
+    reads and coerces the sources which have changed since they were last read
+    (see BaseCfg.reload); returns the updated layers and the new source fingerprints,
+    without modifying the configuration
+    """
+    # pylint: disable=protected-access
+    settings = cfg._source_settings
+    fingerprints = dict(cfg._fingerprints)
+    updates: Dict[str, Dict[str, Any]] = {}
+
+    if settings.json_config_path:
+        fingerprint = cfg._file_fingerprint(settings.json_config_path)
+        if fingerprint != fingerprints.get("json"):
+            updates["json"] = cfg._parse_json_config(
+                settings.json_config_path, settings.json_required
+            )
+            fingerprints["json"] = fingerprint
+
+    if settings.envfile_path:
+        envfile_fingerprints = cfg._envfile_fingerprints(settings.envfile_path)
+        if envfile_fingerprints != fingerprints.get("envfile"):
+            updates["envfile"] = cfg._coerce_dict(
+                cfg._read_envfile(settings.envfile_path, settings.envfile_required)
+            )
+            fingerprints["envfile"] = envfile_fingerprints
+
+    envvars = cfg._coerce_dict(cfg._read_envvars())
+    if envvars != cfg._layers.get("envvars"):
+        updates["envvars"] = envvars
+
+    secrets = changed_docker_secrets(cfg, fingerprints)
+    if secrets is not None:
+        updates["secrets"] = secrets
+
+    for source in settings.sources:
+        values = cfg._read_source(source)
+        if values != cfg._layers.get(source.name):
+            updates[source.name] = values
+    return updates, fingerprints
+
+
+def changed_docker_secrets(
+    cfg: "BaseCfg", fingerprints: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    returns the new values from the docker secrets source if any secret was
+    added, removed or changed (updating the given fingerprints), or None if
+    nothing changed; only new and changed secrets are read
+    """
+    # pylint: disable=protected-access
+    secret_paths = cfg._list_docker_secrets(
+        cfg._source_settings.secrets_dir, cfg._schema.leaves
+    )
+    secret_fingerprints = {
+        name: cfg._file_fingerprint(path) for name, path in secret_paths.items()
+    }
+    old_fingerprints = fingerprints.get("secrets", {})
+    if secret_fingerprints == old_fingerprints:
+        return None
+    secrets = {
+        key: val
+        for key, val in cfg._layers.get("secrets", {}).items()
+        if key in secret_fingerprints
+        and secret_fingerprints[key] == old_fingerprints.get(key)
+    }
+    changed_paths = {
+        name: path for name, path in secret_paths.items() if name not in secrets
+    }
+    secrets.update(cfg._coerce_dict(cfg._read_docker_secrets(changed_paths)))
+    fingerprints["secrets"] = secret_fingerprints
+    return secrets
+
+
+class PlannedUpdate(NamedTuple):
+    """
+    PlannedUpdate holds the new state of a configuration (or of one of its built
+    sections) after a reload, worked out without modifying it (see plan_updates)
+    """
+
+    cfg: "BaseCfg"
+    updates: Dict[str, Dict[str, Any]]
+    fingerprints: Dict[str, Any]
+    # the new values of the (non-section) options whose value changed
+    values: Dict[str, Any]
+    sections: List["PlannedUpdate"]
+    # the changed options, as returned by reload (sections as their instances)
+    changes: Dict[str, Any]
+
+
+def plan_updates(
+    cfg: "BaseCfg", updates: Dict[str, Dict[str, Any]], fingerprints: Dict[str, Any]
+) -> PlannedUpdate:
+    """
+    works out the effective values of the configuration with the given source
+    layers replaced: lazy options which have been used are resolved and sections
+    which have been built are planned (recursively) from the new inputs. Raises a
+    ValidationError listing every violation if the result is invalid; nothing is
+    modified either way
+    """
+    # pylint: disable=protected-access
+    plan = PlannedUpdate(cfg, updates, fingerprints, {}, [], {})
+    if not updates:
+        return plan
+    keys: Set[str] = set()
+    for source, layer in updates.items():
+        keys.update(layer)
+        keys.update(cfg._layers.get(source, ()))
+    layers = {**cfg._layers, **updates}
+    errors = violations(cfg, layers, keys)
+
+    sections = cfg._schema.sections
+    for key in cfg._schema.names:
+        if key not in keys:
+            continue
+        try:
+            if key in sections:
+                child_plan = _plan_section(cfg, key, layers)
+                if child_plan is not None:
+                    plan.sections.append(child_plan)
+                    if child_plan.changes:
+                        plan.changes[key] = child_plan.cfg
+                continue
+            value = cfg._effective_value(key, layers)
+            if isinstance(value, Deferred):
+                if key not in cfg.__dict__:
+                    # not used yet; it will be resolved from the new inputs
+                    continue
+                value = value.resolve()
+        except ValidationError as exc:
+            errors.extend(exc.errors)
+            continue
+        current = getattr(cfg, key)
+        if value is current or value == current:
+            continue
+        plan.values[key] = value
+        plan.changes[key] = value
+    if errors:
+        raise ValidationError(errors)
+    return plan
+
+
+def _plan_section(
+    parent: "BaseCfg", name: str, layers: Dict[str, Dict[str, Any]]
+) -> Optional[PlannedUpdate]:
+    """
+    plans the update of the given section of the parent from the parent's new
+    layers, or returns None if the section hasn't been built (it will be built from
+    the new inputs when it is first accessed)
+    """
+    # pylint: disable=protected-access
+    child = parent.__dict__.get(name)
+    if child is None:
+        return None
+    inputs = section_layers(parent, name, child, layers)
+    return plan_updates(
+        child,
+        {source: inputs.get(source, {}) for source in parent._source_order},
+        child._fingerprints,
+    )
+
+
+def commit_updates(plan: PlannedUpdate) -> Dict[str, Any]:
+    """applies a planned update (see plan_updates), returning the changed options"""
+    # pylint: disable=protected-access
+    cfg = plan.cfg
+    if plan.updates:
+        cfg._layers.update(plan.updates)
+        cfg._fingerprints = plan.fingerprints
+    for section_plan in plan.sections:
+        commit_updates(section_plan)
+    for key, value in plan.values.items():
+        setattr(cfg, key, value)
+    return plan.changes
+
+
+def apply_updates(
+    cfg: "BaseCfg", updates: Dict[str, Dict[str, Any]], fingerprints: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    replaces the given source layers and fingerprints of the configuration and
+    applies the options whose effective value changed, returning them; if the
+    updated configuration (including its used lazy options and built sections) is
+    invalid, a ValidationError is raised and nothing is changed
+    """
+    return commit_updates(plan_updates(cfg, updates, fingerprints))
@@ -0,0 +1,648 @@
+#!/usr/bin/env python3
+"""
+module which compiles the options declared on a BaseCfg subclass into a schema that
+is shared by every instance of that class
+"""
+import re
+import threading
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from .cli import CfgArgumentParser
+from .coercers import TypeCoercers, format_bool, lookup, parse_bool
+from .compact import (
+    compact_default,
+    compact_json_coercer,
+    compact_text_coercer,
+    compact_typecode,
+)
+from .dockersecrets import map_binary_secret, read_binary_secret
+from .frozen import make_frozen_class, tuple_getter
+from .lazy import Deferred, deferring
+from .validation import Checker, Constraints, checked, compile_checker
+
+# pylint: disable=invalid-name
+OptParserInput = Union[str, int, float, list]
+Coercer = Callable[[Any], Any]
+
+# the sources of configuration values, from lowest to highest precedence (the
+# defaults declared on the class have the lowest precedence of all)
+SOURCE_ORDER = ("json", "envfile", "envvars", "secrets", "cli")
+
+# how the docker secrets of binary options are read, keyed by base type
+BINARY_READERS: Dict[str, Coercer] = {
+    "bytes": read_binary_secret,
+    "memoryview": map_binary_secret,
+}
+
+REDACTED = "--REDACTED--"
+AUTO_REDACTED = "--AUTO-REDACTED--"
+
+
+class OptionMetadata(NamedTuple):
+    """
+    OptionMetadata is a named tuple which encapsulates data captured by OptFunc
+    instances
+    """
+
+    name: Optional[str]
+    option_type: Optional[Any]
+    default: Any
+    doc: str
+    required: bool
+    parser: Optional[Callable[[OptParserInput], Any]]
+    choices: Optional[Any]
+    sep: str
+    redact: bool
+    env_aliases: Tuple[str, ...] = ()
+    lazy: bool = False
+    compact: Union[bool, str] = False
+    constraints: Optional[Constraints] = None
+
+
+class OptionDeclaration:
+    """
+    OptionDeclaration is what opt() returns: it holds the option's metadata as the
+    value of the class attribute until the class is created, when
+    BaseCfg.__init_subclass__ collects it and puts the default value in its place
+    """
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("meta",)
+
+    def __init__(self, meta: OptionMetadata) -> None:
+        self.meta = meta
+
+    def __repr__(self) -> str:
+        return f"opt(default={self.meta.default!r}, doc={self.meta.doc!r})"
+
+
+class CompiledOption(NamedTuple):
+    """
+    CompiledOption holds everything about a single option which can be worked out
+    once, when the configuration class is defined
+    """
+
+    name: str
+    meta: OptionMetadata
+    base_type: str
+    env_names: Tuple[str, ...]
+    cli_flag: str
+    coerce_text: Coercer
+    coerce_json: Coercer
+    format_item: Callable[[Any], str]
+    # the BaseCfg subclass of a section option (see basecfg.section), otherwise None
+    section: Optional[type] = None
+    # for options whose type (or list item type) comes from the type registry (see
+    # basecfg.coercers), the text coercer for a single command-line argument
+    parse_item: Optional[Coercer] = None
+    # returns the violations of a value (see basecfg.validation), if there are checks
+    check: Optional[Checker] = None
+
+
+@lru_cache(maxsize=None)
+def _cached_base_type(type_spec: Any) -> str:
+    """memoized implementation of base_type for hashable type specs"""
+    return _resolve_base_type(type_spec)
+
+
+def _resolve_base_type(type_spec: Any) -> str:
+    """returns a string representing the type of object"""
+    result = type_spec.__name__ if hasattr(type_spec, "__name__") else repr(type_spec)
+    origin = get_origin(type_spec)
+    args = get_args(type_spec)
+    if origin == Union and len(args) == 2 and args[1] == type(None):  # noqa
+        # Optional[thing] where thing is in args[0]
+        return base_type(args[0])
+    if origin == list and len(args) == 1:
+        if hasattr(args[0], "__name__"):
+            result = f"List[{args[0].__name__}]"
+    return result
+
+
+def base_type(type_spec: Any) -> str:
+    """
+    returns a string representing the type of object, e.g. "int" for Optional[int]
+    or "List[str]" for List[str]
+    """
+    try:
+        return _cached_base_type(type_spec)
+    except TypeError:
+        # unhashable type specs can't be memoized
+        return _resolve_base_type(type_spec)
+
+
+# converters for (scalar) text input, keyed by base type
+TEXT_CONVERTERS: Dict[str, Coercer] = {
+    "str": str,
+    "bool": parse_bool,
+    "int": int,
+    "float": float,
+}
+
+
+# how values (or list items) are written as text; other types use str()
+TEXT_FORMATTERS: Dict[str, Callable[[Any], str]] = {
+    "bool": format_bool,
+}
+# converters for json values which don't already have the option's type; note that
+# unlike the text converters these use plain bool() for bool values
+JSON_CONVERTERS: Dict[str, Coercer] = {
+    "bool": bool,
+    "float": float,
+    "int": int,
+    "str": str,
+}
+
+
+def _is_builtin(option_type: str) -> bool:
+    """returns True for the (list) types handled without the type registry"""
+    if option_type.startswith("List["):
+        return option_type[5:-1] in TEXT_CONVERTERS
+    return option_type in TEXT_CONVERTERS
+
+
+def _registered(meta: OptionMetadata, option_type: str) -> Optional[TypeCoercers]:
+    """
+    returns the coercers registered (see basecfg.coercers) for the option's type,
+    or for its item type if it's a list, or None if the option doesn't need them
+    """
+    if meta.parser or _is_builtin(option_type):
+        return None
+    type_spec = meta.option_type
+    args = get_args(type_spec)
+    if get_origin(type_spec) is Union and len(args) == 2 and args[1] is type(None):
+        type_spec = args[0]
+    if get_origin(type_spec) is list:
+        type_spec = get_args(type_spec)[0] if get_args(type_spec) else str
+    try:
+        return lookup(type_spec)
+    except TypeError:
+        # unhashable type specs can't be registered
+        return None
+
+
+def _text_coercer(
+    name: str,
+    meta: OptionMetadata,
+    option_type: str,
+    registered: Optional[TypeCoercers] = None,
+) -> Coercer:
+    """returns a callable which converts text input into a value for the option"""
+    # pylint: disable=too-many-return-statements
+    if meta.parser:
+        return meta.parser
+    if option_type == "str":
+        return _identity
+    if option_type in TEXT_CONVERTERS:
+        return TEXT_CONVERTERS[option_type]
+    if option_type.startswith("List[") and option_type[5:-1] in TEXT_CONVERTERS:
+        sep = meta.sep
+        if option_type == "List[str]":
+            return lambda value: value.split(sep)
+        convert = TEXT_CONVERTERS[option_type[5:-1]]
+        return lambda value: [convert(item) for item in value.split(sep)]
+    if registered is not None:
+        parse = registered.parse
+        if option_type.startswith("List["):
+            sep = meta.sep
+            return lambda value: [parse(item) for item in value.split(sep)]
+        return parse
+
+    def unsupported(_value: Any) -> Any:
+        raise ValueError(
+            f"Don't know how to parse type {meta.option_type} ({option_type}) "
+            f"for option {name}"
+        )
+
+    return unsupported
+
+
+def _json_coercer(
+    name: str,
+    meta: OptionMetadata,
+    option_type: str,
+    registered: Optional[TypeCoercers] = None,
+) -> Coercer:
+    """returns a callable which converts decoded json values into option values"""
+    if meta.parser:
+        return meta.parser
+    if registered is not None:
+        return _registered_json_coercer(
+            name, registered.from_json, option_type.startswith("List[")
+        )
+    convert: Optional[Coercer] = None
+    if option_type in JSON_CONVERTERS:
+        convert = JSON_CONVERTERS[option_type]
+    elif option_type.startswith("List[") and option_type[5:-1] in JSON_CONVERTERS:
+        convert = _list_converter(JSON_CONVERTERS[option_type[5:-1]])
+
+    def coerce(value: Any) -> Any:
+        val_type = type(value).__name__
+        if val_type == option_type:
+            return value
+        if convert is None:
+            raise TypeError(f"{name}: unsupported value type {option_type}")
+        try:
+            return convert(value)
+        except ValueError:
+            raise TypeError(f"{name}: unsupported value type {val_type}") from None
+
+    return coerce
+
+
+def _registered_json_coercer(name: str, from_json: Coercer, is_list: bool) -> Coercer:
+    """returns a json coercer for an option whose type comes from the registry"""
+
+    def coerce(value: Any) -> Any:
+        try:
+            if not is_list:
+                return from_json(value)
+            if not isinstance(value, list):
+                raise ValueError(f"expected a list, not {value!r}")
+            return [from_json(item) for item in value]
+        except ValueError as exc:
+            raise TypeError(f"{name}: {exc}") from None
+
+    return coerce
+
+
+def _passing_deferred(coerce: Coercer) -> Coercer:
+    """wraps the given coercer so that Deferred inputs are passed through"""
+    return lambda value: value if isinstance(value, Deferred) else coerce(value)
+
+
+def _list_converter(item_convert: Coercer) -> Coercer:
+    """returns a callable which converts every item of a list"""
+
+    def convert(value: Any) -> Any:
+        return [item_convert(item) for item in value]
+
+    return convert
+
+
+def _identity(value: Any) -> Any:
+    """returns the given value unchanged"""
+    return value
+
+
+@lru_cache(maxsize=32)
+def token_matcher(tokens: Tuple[str, ...]) -> Callable[[str], Any]:
+    """
+    returns a function which finds any of the given tokens in a (lowercased) name,
+    compiled into a single regular expression
+    """
+    if not tokens:
+        return re.compile(r"(?!)").search
+    return re.compile("|".join(re.escape(token) for token in tokens)).search
+
+
+def redaction_plan(
+    metadata: Dict[str, OptionMetadata],
+    autoredact_tokens: Optional[Tuple[str, ...]] = None,
+) -> Dict[str, str]:
+    """
+    returns a dict mapping the names of the options whose values must not be logged
+    to the placeholder to log instead: REDACTED for options declared with
+    redact=True and, if autoredact_tokens are given, AUTO_REDACTED for options whose
+    names contain one of the tokens
+    """
+    matches = token_matcher(autoredact_tokens or ())
+    plan: Dict[str, str] = {}
+    for name, meta in metadata.items():
+        if meta.redact:
+            plan[name] = REDACTED
+        elif autoredact_tokens and matches(name.lower()):
+            plan[name] = AUTO_REDACTED
+    return plan
+
+
+def is_section_type(option_type: Any) -> bool:
+    """returns True if the given option type is a BaseCfg subclass (a section)"""
+    return isinstance(option_type, type) and isinstance(
+        getattr(option_type, "_schema", None), CfgSchema
+    )
+
+
+def _section_coercer(name: str) -> Coercer:
+    """
+    returns a callable which checks the inputs for a section option: a dict of the
+    section's own inputs, which are only coerced when the section is first used
+    """
+
+    def coerce(value: Any) -> Any:
+        if not isinstance(value, dict):
+            raise TypeError(
+                f"{name}: is a section, its options must be given individually (or "
+                "as a json object)"
+            )
+        return value
+
+    return coerce
+
+
+def env_names_for(
+    name: str, meta: OptionMetadata, env_prefix: str = ""
+) -> Tuple[str, ...]:
+    """
+    returns the environment variable names accepted for the option, in order of
+    preference: the upper-cased (prefixed) name, the (prefixed) name as written, then
+    any aliases
+    """
+    names = [(env_prefix + name).upper(), env_prefix + name, *meta.env_aliases]
+    return tuple(dict.fromkeys(names))
+
+
+def compile_option(
+    name: str, meta: OptionMetadata, env_prefix: str = ""
+) -> CompiledOption:
+    """resolves the per-option data which doesn't change between instances"""
+    if is_section_type(meta.option_type):
+        coerce = _section_coercer(name)
+        return CompiledOption(
+            name=name,
+            meta=meta,
+            base_type="section",
+            env_names=(),
+            cli_flag="--" + name.replace("_", "-"),
+            coerce_text=coerce,
+            coerce_json=coerce,
+            format_item=str,
+            section=meta.option_type,
+        )
+    env_names = env_names_for(name, meta, env_prefix)
+    option_type = base_type(meta.option_type)
+    registered = _registered(meta, option_type)
+    coerce_text = _text_coercer(name, meta, option_type, registered)
+    coerce_json = _json_coercer(name, meta, option_type, registered)
+    if meta.compact and not meta.parser:
+        typecode = compact_typecode(name, meta.compact, option_type)
+        meta = meta._replace(default=compact_default(meta.default, typecode))
+        coerce_text = compact_text_coercer(name, typecode, meta.sep)
+        coerce_json = compact_json_coercer(name, typecode)
+    check = compile_checker(
+        name,
+        meta.choices,
+        meta.constraints,
+        option_type.startswith("List["),
+        meta.redact,
+    )
+    if meta.lazy:
+        # lazy inputs are checked when they are resolved
+        if check is not None:
+            coerce_text = checked(coerce_text, check)
+            coerce_json = checked(coerce_json, check)
+        coerce_text = deferring(coerce_text)
+        coerce_json = deferring(coerce_json)
+    if option_type in BINARY_READERS and not meta.parser:
+        # docker secrets are already Deferred reads (see basecfg.dockersecrets)
+        coerce_text = _passing_deferred(coerce_text)
+    return CompiledOption(
+        name=name,
+        meta=meta,
+        base_type=option_type,
+        env_names=env_names,
+        cli_flag="--" + name.replace("_", "-"),
+        coerce_text=coerce_text,
+        coerce_json=coerce_json,
+        format_item=(
+            registered.format
+            if registered is not None
+            else TEXT_FORMATTERS.get(
+                option_type[5:-1] if option_type.startswith("List[") else option_type,
+                str,
+            )
+        ),
+        parse_item=registered.parse if registered is not None else None,
+        check=check,
+    )
+
+
+class CfgSchema:
+    """
+    CfgSchema is the compiled form of the options declared on a BaseCfg subclass; it
+    is built once per class and shared (read-only) by every instance of the class
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, options: Iterable[CompiledOption], env_prefix: str = "") -> None:
+        self.options: Dict[str, CompiledOption] = {opt.name: opt for opt in options}
+        self.sections: Dict[str, CompiledOption] = {
+            name: option
+            for name, option in self.options.items()
+            if option.section is not None
+        }
+        # every option which text sources and command-line arguments can set, keyed
+        # by name; the options of sections are included (recursively) as e.g.
+        # db__host, with the environment variable DB__HOST and the flag --db-host
+        self.leaves: Dict[str, CompiledOption] = {}
+        for option in self.options.values():
+            if option.section is None:
+                self.leaves[option.name] = option
+                continue
+            section_schema: CfgSchema = option.section._schema  # type: ignore
+            for key, leaf in section_schema.leaves.items():
+                flat = f"{option.name}__{key}"
+                self.leaves[flat] = leaf._replace(
+                    name=flat,
+                    env_names=((env_prefix + flat).upper(),),
+                    cli_flag=f"{option.cli_flag}-{leaf.cli_flag[2:]}",
+                )
+        # the binary leaves (bytes or memoryview options, see basecfg.dockersecrets)
+        # mapped to the reader for their docker secrets
+        self.binary: Dict[str, Coercer] = {
+            name: (
+                checked(BINARY_READERS[option.base_type], option.check)
+                if option.check
+                else BINARY_READERS[option.base_type]
+            )
+            for name, option in self.leaves.items()
+            if option.base_type in BINARY_READERS and not option.meta.parser
+        }
+        # the options checked by the validation pass (see basecfg.validation), and
+        # the paths (e.g. ("db", "host")) of the required options and section options
+        self.checkers: Dict[str, Checker] = {
+            name: option.check
+            for name, option in self.options.items()
+            if option.check is not None
+        }
+        required: List[Tuple[str, ...]] = []
+        for option in self.options.values():
+            if option.section is not None:
+                inner: CfgSchema = option.section._schema  # type: ignore
+                required.extend((option.name, *path) for path in inner.required)
+            elif option.meta.required:
+                required.append((option.name,))
+        self.required: Tuple[Tuple[str, ...], ...] = tuple(required)
+        # the options which are resolved when first accessed (see basecfg.lazy)
+        self.lazy: Tuple[str, ...] = tuple(
+            name
+            for name, option in self.options.items()
+            if option.meta.lazy or option.section is not None or name in self.binary
+        )
+        cli_flags: Dict[str, str] = {}
+        for leaf in self.leaves.values():
+            if leaf.cli_flag in cli_flags:
+                raise TypeError(
+                    f'command-line flag "{leaf.cli_flag}" would set both '
+                    f"{cli_flags[leaf.cli_flag]} and {leaf.name}"
+                )
+            cli_flags[leaf.cli_flag] = leaf.name
+        self.metadata: Dict[str, OptionMetadata] = {
+            name: option.meta for name, option in self.options.items()
+        }
+        self.names: Tuple[str, ...] = tuple(self.options)
+        # returns the values of all the options of an instance, in declaration order
+        self.values_getter = tuple_getter(self.names)
+        # maps every accepted environment variable name to (option name, rank) where
+        # rank orders the names of a single option by preference
+        self.env_index: Dict[str, Tuple[str, int]] = {}
+        for option in self.leaves.values():
+            for rank, envvar_name in enumerate(option.env_names):
+                if envvar_name in self.env_index:
+                    raise TypeError(
+                        f'environment variable "{envvar_name}" would set both '
+                        f"{self.env_index[envvar_name][0]} and {option.name}"
+                    )
+                self.env_index[envvar_name] = (option.name, rank)
+        # argparse parsers are built lazily (on the first instantiation which has
+        # command-line arguments) and keyed by the program info they were built with
+        self.arg_parsers: Dict[Tuple[Optional[str], ...], CfgArgumentParser] = {}
+        self._frozen_class: Optional[type] = None
+        self._frozen_class_lock = threading.Lock()
+        self._redaction_plans: Dict[Optional[Tuple[str, ...]], Dict[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.options)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.options
+
+    def read_environ(self, environ: Mapping[str, str]) -> Dict[str, str]:
+        """
+        returns the values of the options set in the given environment, keyed by
+        leaf name; this walks whichever is smaller: the option env var names in the
+        schema or the environment itself
+        """
+        env_index = self.env_index
+        result: Dict[str, str] = {}
+
+        if len(env_index) <= len(environ):
+            for optname, compiled in self.leaves.items():
+                for envvar_name in compiled.env_names:
+                    if envvar_name in environ:
+                        result[optname] = environ[envvar_name]
+                        break
+            return result
+
+        # the environment is the smaller set; when an option is given under more
+        # than one of its names the highest-ranked (lowest numbered) name wins
+        ranks: Dict[str, int] = {}
+        for envvar_name, value in environ.items():
+            if envvar_name not in env_index:
+                continue
+            optname, rank = env_index[envvar_name]
+            if rank < ranks.get(optname, len(env_index)):
+                ranks[optname] = rank
+                result[optname] = value
+        return result
+
+    def group_sections(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        returns the given values (keyed by leaf name, see leaves) with the values
+        for the options of sections grouped into one dict per section, e.g.
+        {"db__host": ...} becomes {"db": {"host": ...}}
+        """
+        if not self.sections:
+            return values
+        grouped: Dict[str, Any] = {}
+        sections: Dict[str, Dict[str, Any]] = {}
+        for key, value in values.items():
+            name, sep, rest = key.partition("__")
+            if sep and name in self.sections and key not in self.options:
+                sections.setdefault(name, {})[rest] = value
+            else:
+                grouped[key] = value
+        grouped.update(sections)
+        return grouped
+
+    def frozen_class(self, cfg_class: type) -> type:
+        """
+        returns the FrozenCfg subclass for snapshots of the given config class (which
+        must be the class this schema was compiled for), generating it on first use
+        """
+        frozen_class = self._frozen_class
+        if frozen_class is None:
+            # only lock the first time, so that concurrent first uses can't generate
+            # two different classes
+            with self._frozen_class_lock:
+                if self._frozen_class is None:
+                    self._frozen_class = make_frozen_class(cfg_class, self.names)
+                frozen_class = self._frozen_class
+        return frozen_class
+
+    def redaction_plan(
+        self, autoredact_tokens: Optional[Tuple[str, ...]] = None
+    ) -> Dict[str, str]:
+        """
+        returns the redaction plan (see redaction_plan) for the options of this
+        schema; plans are computed once per token list
+        """
+        try:
+            return self._redaction_plans[autoredact_tokens]
+        except KeyError:
+            plan = redaction_plan(self.metadata, autoredact_tokens)
+            self._redaction_plans[autoredact_tokens] = plan
+            return plan
+
+    @classmethod
+    def build(
+        cls,
+        annotations: Dict[str, Any],
+        declarations: Dict[str, OptionMetadata],
+        inherited: Optional["CfgSchema"] = None,
+        env_prefix: str = "",
+    ) -> "CfgSchema":
+        """
+        pairs the type annotations of a class body with the option metadata
+        declared with opt() for the same names, appending the results (in
+        annotation order) to the options inherited from a parent schema; every
+        option is (re)compiled with the given environment variable prefix
+        """
+        undeclared = [name for name in annotations if name not in declarations]
+        if undeclared:
+            raise TypeError(
+                f"annotated attributes {', '.join(undeclared)} aren't declared with "
+                "opt(); every annotated attribute must be declared with opt()"
+            )
+        unannotated = [name for name in declarations if name not in annotations]
+        if unannotated:
+            raise TypeError(
+                f"attributes {', '.join(unannotated)} are declared with opt() but "
+                "have no type annotation"
+            )
+        metas: Dict[str, OptionMetadata] = (
+            dict(inherited.metadata) if inherited is not None else {}
+        )
+        for name, option_type in annotations.items():
+            metas[name] = declarations[name]._replace(
+                name=name, option_type=option_type
+            )
+        return cls(
+            (compile_option(name, meta, env_prefix) for name, meta in metas.items()),
+            env_prefix,
+        )
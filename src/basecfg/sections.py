@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+module for nested configuration sections: options whose type is another BaseCfg
+subclass, e.g.
+
+    class DbCfg(BaseCfg):
+        host: str = opt("localhost", "database host")
+
+    class AppCfg(BaseCfg):
+        db: DbCfg = section(DbCfg, "database settings")
+
+the options of a section are set by nested json objects ({"db": {"host": ...}}),
+DB__HOST environment variables, envfile entries and docker secrets (db__host) and
+--db-host command-line flags. While loading, the parent only records the inputs each
+source gave for the section; the section is coerced and instantiated the first time
+it is accessed, so sections which are never used cost next to nothing
+"""
+from typing import TYPE_CHECKING, Any, Dict, Optional, Type, TypeVar, cast
+
+from .schema import OptionDeclaration, OptionMetadata
+from .validation import check
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .basecfg import BaseCfg
+
+# pylint: disable=invalid-name
+SectionType = TypeVar("SectionType", bound="BaseCfg")
+
+
+class SectionDescriptor:
+    """
+    SectionDescriptor is the class attribute of a section option; on first access it
+    builds the section from the instance's inputs and stores it in the instance's
+    __dict__, which takes precedence over this (non-data) descriptor from then on
+    """
+
+    # pylint: disable=too-few-public-methods
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Optional["BaseCfg"], owner: Any = None) -> Any:
+        if instance is None:
+            return self
+        value = instance.__dict__[self.name] = build_section(instance, self.name)
+        return value
+
+    def __repr__(self) -> str:
+        return f"<section {self.name}>"
+
+
+def section_layers(
+    parent: "BaseCfg",
+    name: str,
+    child: "BaseCfg",
+    parent_layers: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    returns the values each source gave the parent (in the given layers, by default
+    its own) for the given section, coerced by child (an instance of the section's
+    class)
+    """
+    # pylint: disable=protected-access
+    if parent_layers is None:
+        parent_layers = parent._layers
+    layers: Dict[str, Dict[str, Any]] = {}
+    for source in parent._source_order:
+        inputs = parent_layers.get(source, {}).get(name)
+        if inputs is None:
+            continue
+        if source == "json":
+            layers[source] = child._coerce_json(inputs)
+        elif source == "cli":
+            # argparse has already coerced the command-line arguments
+            layers[source] = child._schema.group_sections(inputs)
+        else:
+            layers[source] = child._coerce_dict(inputs)
+    return layers
+
+
+def build_section(parent: "BaseCfg", name: str) -> "BaseCfg":
+    """builds the given section of the parent from the inputs its sources gave"""
+    # pylint: disable=protected-access
+    section_class = cast("Type[BaseCfg]", parent._schema.sections[name].section)
+    child = section_class.__new__(section_class)
+    child._init_state(parent._source_settings)
+    for source, values in section_layers(parent, name, child).items():
+        child._apply_layer(source, values)
+    check(child)
+    return child
+
+
+def section(cfg_class: Type[SectionType], doc: str = "") -> SectionType:
+    """
+    declares a section option: a nested configuration of the given BaseCfg subclass
+    (which should also be the option's type annotation)
+    """
+    declaration = OptionDeclaration(
+        OptionMetadata(None, cfg_class, None, doc, False, None, None, ",", False)
+    )
+    # the declaration stands in for the section until the class is created
+    return cast(SectionType, declaration)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+module for sharing a resolved BaseCfg configuration between processes through a
+multiprocessing.shared_memory block, e.g. from a pre-fork server's parent to its
+workers, so the workers don't each read the configuration sources
+
+the block holds a small header followed by the option values encoded as json:
+
+    magic (4 bytes) | format (uint32) | generation (uint64) | length (uint64) | json
+
+the generation works like a sequence lock: it is odd while the publisher is writing
+and is advanced by two for each published snapshot, so readers can notice a
+republished configuration and retry reads which overlapped a write
+"""
+import json
+import struct
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple, Type
+
+from .cache import schema_fingerprint
+from .compact import json_default
+from .frozen import FrozenCfg, freeze_value
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .basecfg import BaseCfg
+
+SHARED_MAGIC = b"BCFG"
+SHARED_FORMAT = 1
+MIN_SHARED_SIZE = 4096
+
+_HEADER = struct.Struct("<4sIQQ")
+_GENERATION = struct.Struct("<Q")
+_GENERATION_OFFSET = 8
+_READ_ATTEMPTS = 1000
+
+
+def _json_values(cfg: "BaseCfg") -> List[Any]:
+    """returns the values of the options, with sections as nested lists"""
+    # pylint: disable=protected-access
+    sections = cfg._schema.sections
+    return [
+        _json_values(getattr(cfg, name)) if name in sections else getattr(cfg, name)
+        for name in cfg._schema.names
+    ]
+
+
+def _snapshot(cfg_class: "Type[BaseCfg]", values: List[Any]) -> FrozenCfg:
+    """returns a snapshot of the given class built from values (see _json_values)"""
+    # pylint: disable=protected-access
+    schema = cfg_class._schema
+    return schema.frozen_class(cfg_class)(
+        (
+            _snapshot(schema.sections[name].section, value)  # type: ignore[arg-type]
+            if name in schema.sections
+            else freeze_value(value)
+        )
+        for name, value in zip(schema.names, values)
+    )
+
+
+def _encode(cfg: "BaseCfg") -> bytes:
+    """returns the json payload for the current values of the given configuration"""
+    # pylint: disable=protected-access
+    names = cfg._schema.names
+    values = _json_values(cfg)
+    payload = json.dumps(
+        {
+            "class": f"{type(cfg).__module__}.{type(cfg).__qualname__}",
+            "schema": schema_fingerprint(cfg._schema),
+            "values": values,
+        },
+        separators=(",", ":"),
+        default=json_default,
+    ).encode("utf8")
+    expected = cfg.freeze()
+    shared = _snapshot(type(cfg), json.loads(payload)["values"])
+    for name in names:
+        if getattr(shared, name) != getattr(expected, name):
+            raise TypeError(f'the value of "{name}" can\'t be shared as json')
+    return payload
+
+
+def _buffer(shm: SharedMemory) -> memoryview:
+    """returns the memory of the given shared memory block"""
+    buf = shm.buf
+    if buf is None:
+        raise ValueError("the shared memory block has been closed")
+    return buf
+
+
+def _attach(name: str) -> SharedMemory:
+    """
+    attaches to an existing shared memory block without registering it with the
+    resource tracker, which would otherwise destroy the block when the attaching
+    (worker) process exits
+    """
+    try:
+        # pylint: disable-next=unexpected-keyword-arg
+        return SharedMemory(name, track=False)  # type: ignore[call-arg,unused-ignore]
+    except TypeError:  # python < 3.13
+        shm = SharedMemory(name)
+        # pylint: disable=protected-access
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore
+        return shm
+
+
+class SharedCfgPublisher:
+    """
+    SharedCfgPublisher creates a shared memory block and publishes snapshots of a
+    configuration into it; the block is sized for the first snapshot (with room to
+    grow) unless a size is given, and later snapshots must fit in it. Closing the
+    publisher (or leaving its context) also destroys the block
+    """
+
+    def __init__(
+        self, cfg: "BaseCfg", name: Optional[str] = None, size: Optional[int] = None
+    ) -> None:
+        payload = _encode(cfg)
+        if size is None:
+            size = max(MIN_SHARED_SIZE, _HEADER.size + 2 * len(payload))
+        self._shm = SharedMemory(name, create=True, size=size)
+        self.generation = 0
+        _HEADER.pack_into(_buffer(self._shm), 0, SHARED_MAGIC, SHARED_FORMAT, 0, 0)
+        self._write(payload)
+
+    @property
+    def name(self) -> str:
+        """the name of the shared memory block, for SharedCfgReader"""
+        return self._shm.name
+
+    def publish(self, cfg: "BaseCfg") -> int:
+        """publishes a new snapshot of the configuration; returns its generation"""
+        self._write(_encode(cfg))
+        return self.generation
+
+    def _write(self, payload: bytes) -> None:
+        """writes the payload, advancing the generation around the write"""
+        buf = _buffer(self._shm)
+        end = _HEADER.size + len(payload)
+        if end > len(buf):
+            raise ValueError(
+                f"the configuration ({len(payload)} bytes) doesn't fit in the shared "
+                f"memory block ({len(buf) - _HEADER.size} bytes available)"
+            )
+        _GENERATION.pack_into(buf, _GENERATION_OFFSET, self.generation + 1)
+        buf[_HEADER.size : end] = payload
+        _HEADER.pack_into(
+            buf, 0, SHARED_MAGIC, SHARED_FORMAT, self.generation + 1, len(payload)
+        )
+        self.generation += 2
+        _GENERATION.pack_into(buf, _GENERATION_OFFSET, self.generation)
+
+    def close(self) -> None:
+        """closes and destroys the shared memory block"""
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> "SharedCfgPublisher":
+        return self
+
+    def __exit__(self, *_exc_info: Any) -> None:
+        self.close()
+
+
+class SharedCfgReader:
+    """
+    SharedCfgReader attaches to a shared memory block created by a
+    SharedCfgPublisher and returns read-only snapshots (see FrozenCfg) of the
+    configuration published in it; the snapshot is only decoded again when the
+    publisher has published a new generation
+    """
+
+    def __init__(self, cfg_class: "Type[BaseCfg]", name: str) -> None:
+        self.cfg_class = cfg_class
+        self._shm = _attach(name)
+        self._snapshot: Optional[FrozenCfg] = None
+        self._snapshot_generation = -1
+        magic, version, _, _ = _HEADER.unpack_from(_buffer(self._shm), 0)
+        if magic != SHARED_MAGIC or version != SHARED_FORMAT:
+            self._shm.close()
+            raise ValueError(f"{name} isn't a shared configuration block")
+
+    @property
+    def generation(self) -> int:
+        """the generation most recently published"""
+        return _GENERATION.unpack_from(_buffer(self._shm), _GENERATION_OFFSET)[0]
+
+    @property
+    def changed(self) -> bool:
+        """True if a snapshot newer than the last one returned has been published"""
+        return self.generation != self._snapshot_generation
+
+    def _read(self) -> Tuple[int, bytes]:
+        """returns a consistent copy of the published generation and payload"""
+        buf = _buffer(self._shm)
+        for _ in range(_READ_ATTEMPTS):
+            _, _, generation, length = _HEADER.unpack_from(buf, 0)
+            # generation 0 means the first snapshot hasn't been written yet
+            if generation and generation % 2 == 0:
+                payload = bytes(buf[_HEADER.size : _HEADER.size + length])
+                if self.generation == generation:
+                    return generation, payload
+            time.sleep(0)
+        raise TimeoutError("the shared configuration is being rewritten constantly")
+
+    def snapshot(self) -> FrozenCfg:
+        """returns a snapshot of the most recently published configuration"""
+        # pylint: disable=protected-access
+        if self._snapshot is not None and not self.changed:
+            return self._snapshot
+        generation, payload = self._read()
+        document = json.loads(payload)
+        schema = self.cfg_class._schema
+        if document["schema"] != schema_fingerprint(schema):
+            raise TypeError(
+                f"the shared configuration was published by {document['class']}, "
+                f"which has a different schema than {self.cfg_class.__qualname__}"
+            )
+        self._snapshot = _snapshot(self.cfg_class, document["values"])
+        self._snapshot_generation = generation
+        return self._snapshot
+
+    def close(self) -> None:
+        """detaches from the shared memory block"""
+        self._shm.close()
+
+    def __enter__(self) -> "SharedCfgReader":
+        return self
+
+    def __exit__(self, *_exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+module for additional configuration sources, e.g. remote key-value stores, which
+plug into the precedence chain of the built-in sources (json config file, envfile,
+environment variables, docker secrets and command-line arguments)
+
+a Source returns text values for the options it knows about, keyed by option name
+(db__host for the options of sections), which are coerced like environment
+variables; it is inserted in the chain right after the source named by its "after"
+attribute. All the declared keys are asked for in a single read() call, so remote
+sources can fetch them in one request
+"""
+import http.client
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Collection, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from .schema import SOURCE_ORDER
+
+
+class Source(ABC):
+    """
+    Source is the base class for additional configuration sources; subclasses set
+    "name" (which must be unique, and is what source_of reports) and "after" (the
+    name of the source they take precedence over: "defaults", one of the built-in
+    sources or another additional source) and implement read()
+    """
+
+    name: str = "source"
+    after: str = "envfile"
+
+    @abstractmethod
+    def read(self, keys: Collection[str]) -> Dict[str, str]:
+        """returns the text values this source holds for any of the given keys"""
+
+    def detail(self, key: str) -> Optional[str]:
+        """returns where the value of the given key came from (see source_detail)"""
+        # pylint: disable=unused-argument
+        return None
+
+
+def source_order(sources: Sequence[Source]) -> Tuple[str, ...]:
+    """
+    returns the names of the built-in and the given additional sources, from lowest
+    to highest precedence; additional sources with the same "after" take precedence
+    in the order they are given
+    """
+    if not sources:
+        return SOURCE_ORDER
+    order: List[str] = list(SOURCE_ORDER)
+    added = set()
+    for source in sources:
+        if source.name in order or source.name in ("defaults", "default", "assigned"):
+            raise ValueError(f'there is already a source named "{source.name}"')
+        if source.after != "defaults" and source.after not in order:
+            raise ValueError(f'{source.name}: unknown source "{source.after}"')
+        index = 0 if source.after == "defaults" else order.index(source.after) + 1
+        while index < len(order) and order[index] in added:
+            index += 1
+        order.insert(index, source.name)
+        added.add(source.name)
+    return tuple(order)
+
+
+class CachedSource(Source):
+    """
+    CachedSource wraps another source and caches what it read for "ttl" seconds;
+    for a further "stale_ttl" seconds the cached values are still returned while a
+    background thread reads the source again (stale-while-revalidate), after that
+    reads wait for the source. If a background read fails, the stale values are
+    kept and the exception is recorded in last_error
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        source: Source,
+        ttl: float = 30.0,
+        stale_ttl: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.source = source
+        self.name = source.name
+        self.after = source.after
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self.last_error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._values: Dict[str, str] = {}
+        self._keys: frozenset = frozenset()
+        self._read_at: Optional[float] = None
+        self._refresh: Optional[threading.Thread] = None
+
+    def read(self, keys: Collection[str]) -> Dict[str, str]:
+        with self._lock:
+            if self._read_at is not None and self._keys.issuperset(keys):
+                age = self.clock() - self._read_at
+                if age < self.ttl:
+                    return self._cached(keys)
+                if age < self.ttl + self.stale_ttl:
+                    if self._refresh is None:
+                        self._refresh = threading.Thread(
+                            target=self._background_read, args=(keys,), daemon=True
+                        )
+                        self._refresh.start()
+                    return self._cached(keys)
+            # nothing usable is cached; concurrent readers wait for this read
+            self._store(keys, self.source.read(keys))
+            return self._cached(keys)
+
+    def _cached(self, keys: Collection[str]) -> Dict[str, str]:
+        """returns the cached values for the given keys"""
+        values = self._values
+        return {key: values[key] for key in keys if key in values}
+
+    def _store(self, keys: Collection[str], values: Dict[str, str]) -> None:
+        """caches the values read for the given keys (the lock must be held)"""
+        self._values = values
+        self._keys = frozenset(keys)
+        self._read_at = self.clock()
+
+    def _background_read(self, keys: Collection[str]) -> None:
+        """reads the source again, keeping the stale values if that fails"""
+        try:
+            values = self.source.read(keys)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.last_error = exc
+        else:
+            with self._lock:
+                self._store(keys, values)
+            self.last_error = None
+        finally:
+            self._refresh = None
+
+    def invalidate(self) -> None:
+        """discards the cached values, so the next read waits for the source"""
+        with self._lock:
+            self._read_at = None
+
+    def detail(self, key: str) -> Optional[str]:
+        return self.source.detail(key)
+
+
+class HttpKVSource(Source):
+    """
+    HttpKVSource reads options from an HTTP key-value service: all the keys are
+    fetched with a single GET request to "url" with a "keys" query parameter (the
+    comma-separated key names), which must return a json object mapping keys to
+    string values (a 404 response means no values). The connection is kept open and
+    reused for later reads
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        url: str,
+        name: str = "http",
+        after: str = "envfile",
+        timeout: float = 5.0,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"{name}: unsupported url {url}")
+        self.url = url
+        self.name = name
+        self.after = after
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self._parts = parts
+        self._lock = threading.Lock()
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        """returns the pooled connection, opening it if needed"""
+        if self._conn is None:
+            conn_class = (
+                http.client.HTTPSConnection
+                if self._parts.scheme == "https"
+                else http.client.HTTPConnection
+            )
+            self._conn = conn_class(
+                self._parts.hostname or "", self._parts.port, timeout=self.timeout
+            )
+        return self._conn
+
+    def _get(self, target: str) -> Tuple[int, bytes]:
+        """sends a GET request on the pooled connection; returns status and body"""
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.request("GET", target, headers=self.headers)
+                response = conn.getresponse()
+                return response.status, response.read()
+            except (http.client.RemoteDisconnected, ConnectionError):
+                # the server closed the idle connection; retry once on a new one
+                self.close()
+                if attempt == 2:
+                    raise
+            except (OSError, http.client.HTTPException):
+                # e.g. a timeout, which leaves the connection mid-request; the next
+                # read opens a new one
+                self.close()
+                raise
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def read(self, keys: Collection[str]) -> Dict[str, str]:
+        query = urlencode({"keys": ",".join(sorted(keys))})
+        path = self._parts.path or "/"
+        target = f"{path}?{self._parts.query + '&' if self._parts.query else ''}{query}"
+        with self._lock:
+            status, body = self._get(target)
+        if status == 404:
+            return {}
+        if status != 200:
+            raise RuntimeError(f"{self.name}: {self.url} returned HTTP {status}")
+        document = json.loads(body)
+        if not isinstance(document, dict):
+            raise ValueError(f"{self.name}: {self.url} didn't return a json object")
+        values: Dict[str, str] = {}
+        for key in keys:
+            if key in document:
+                value = document[key]
+                if not isinstance(value, str):
+                    raise TypeError(f"{self.name}: the value of {key} isn't a string")
+                values[key] = value
+        return values
+
+    def detail(self, key: str) -> Optional[str]:
+        return self.url
+
+    def close(self) -> None:
+        """closes the pooled connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
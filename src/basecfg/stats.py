@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+module for recording how long each step of loading a BaseCfg took, and how much
+data each step read and applied
+"""
+import time
+from typing import Any, Dict, List, NamedTuple
+
+
+class StepStats(NamedTuple):
+    """
+    StepStats describes one step of loading a configuration: "files_read" and
+    "bytes_read" count the files the step read, "keys_applied" counts the option
+    values the step provided and "keys_skipped" counts the values the source held
+    which don't correspond to any option (for example unknown json keys)
+    """
+
+    step: str
+    seconds: float
+    files_read: int = 0
+    bytes_read: int = 0
+    keys_applied: int = 0
+    keys_skipped: int = 0
+
+
+class LoadStats:
+    """
+    LoadStats collects a StepStats entry for each step of loading a configuration,
+    in the order the steps ran
+    """
+
+    def __init__(self) -> None:
+        self.steps: List[StepStats] = []
+
+    def record(self, step: str, started: float, **counts: int) -> float:
+        """
+        records a step which started at the given time.perf_counter() value and
+        ended now; returns the current time.perf_counter() value so it can be used
+        as the start of the next step
+        """
+        now = time.perf_counter()
+        self.steps.append(StepStats(step, now - started, **counts))
+        return now
+
+    @property
+    def total_seconds(self) -> float:
+        """the total time spent in all of the steps"""
+        return sum(step.seconds for step in self.steps)
+
+    def __getitem__(self, step: str) -> StepStats:
+        """returns the stats for the named step"""
+        for stats in self.steps:
+            if stats.step == step:
+                return stats
+        raise KeyError(f'step "{step}" not found')
+
+    def as_dict(self) -> Dict[str, Any]:
+        """returns the stats as a dict, e.g. for forwarding to a metrics system"""
+        return {
+            "total_seconds": self.total_seconds,
+            "steps": [step._asdict() for step in self.steps],
+        }
+
+    def __repr__(self) -> str:
+        steps = ", ".join(
+            f"{step.step}={step.seconds * 1000:.3f}ms" for step in self.steps
+        )
+        return f"LoadStats({steps})"
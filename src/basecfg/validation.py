@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+module for validating a BaseCfg configuration once all of its sources have been
+applied: options declared with required=True must be set by a source, and the
+values the sources set must satisfy the option's choices and constraints
+(min_value, max_value, pattern, min_length and max_length, see opt)
+
+the checks for each option are compiled once, when the config class is defined
+(choices into a frozenset where possible, patterns into regular expressions), and
+a single pass over the effective values reports every violation together in one
+ValidationError. Defaults aren't checked, and lazy options (and binary secrets) are
+checked when they are resolved
+"""
+import re
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .lazy import Deferred
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .basecfg import BaseCfg
+
+Checker = Callable[[Any], List[str]]
+ItemCheck = Callable[[Any], Optional[str]]
+
+
+class ValidationError(ValueError):
+    """ValidationError reports every violation found in a configuration at once"""
+
+    def __init__(self, errors: Sequence[str]) -> None:
+        self.errors: List[str] = list(errors)
+        super().__init__("; ".join(self.errors))
+
+
+class Constraints(NamedTuple):
+    """
+    Constraints holds the declarative constraints of an option; for list options
+    min_value, max_value and pattern apply to every item, while min_length and
+    max_length apply to the number of items
+    """
+
+    min_value: Any = None
+    max_value: Any = None
+    # the whole value (or item) must match; non-str values are matched as str()
+    pattern: Optional[str] = None
+    min_length: Optional[int] = None
+    max_length: Optional[int] = None
+
+
+def _choices_check(name: str, choices: Sequence[Any], show: Callable) -> ItemCheck:
+    """returns a check against the option's choices, as a frozenset if possible"""
+    try:
+        allowed: Collection[Any] = frozenset(choices)
+    except TypeError:
+        # unhashable choices are scanned
+        allowed = tuple(choices)
+
+    def check_choice(item: Any) -> Optional[str]:
+        try:
+            if item in allowed:
+                return None
+        except TypeError:
+            if item in tuple(choices):
+                return None
+        return (
+            f'{name}: value "{show(item)}" not in specified option choices '
+            f"({str(choices)})"
+        )
+
+    return check_choice
+
+
+def _range_check(name: str, limits: Constraints, show: Callable) -> ItemCheck:
+    """returns a check against the option's min_value and max_value"""
+    minimum, maximum = limits.min_value, limits.max_value
+
+    def check_range(item: Any) -> Optional[str]:
+        try:
+            if minimum is not None and item < minimum:
+                return f"{name}: value {show(item)} is less than {minimum!r}"
+            if maximum is not None and item > maximum:
+                return f"{name}: value {show(item)} is greater than {maximum!r}"
+        except TypeError:
+            return f"{name}: value {show(item)} can't be compared with its limits"
+        return None
+
+    return check_range
+
+
+def _pattern_check(name: str, pattern: str, show: Callable) -> ItemCheck:
+    """returns a check that values match the option's pattern"""
+    fullmatch = re.compile(pattern).fullmatch
+
+    def check_pattern(item: Any) -> Optional[str]:
+        if fullmatch(item if isinstance(item, str) else str(item)):
+            return None
+        return f'{name}: value {show(item)} doesn\'t match the pattern "{pattern}"'
+
+    return check_pattern
+
+
+def compile_checker(
+    name: str,
+    choices: Optional[Sequence[Any]],
+    constraints: Optional[Constraints],
+    is_list: bool,
+    redact: bool = False,
+) -> Optional[Checker]:
+    """
+    returns a callable which returns the violations of a value of the option (an
+    empty list if there are none), or None if the option has nothing to check;
+    the values of redacted options are left out of the messages
+    """
+    show: Callable[[Any], str] = (lambda _item: "--REDACTED--") if redact else repr
+    limits = constraints or Constraints()
+    item_checks: List[ItemCheck] = []
+    if choices:
+        item_checks.append(_choices_check(name, choices, str if not redact else show))
+    if limits.min_value is not None or limits.max_value is not None:
+        item_checks.append(_range_check(name, limits, show))
+    if limits.pattern is not None:
+        item_checks.append(_pattern_check(name, limits.pattern, show))
+    lengths = (limits.min_length, limits.max_length)
+    if not item_checks and lengths == (None, None):
+        return None
+    min_length, max_length = lengths
+
+    def check_value(value: Any) -> List[str]:
+        if value is None:
+            return []
+        errors: List[str] = []
+        if min_length is not None and len(value) < min_length:
+            errors.append(f"{name}: length {len(value)} is less than {min_length}")
+        if max_length is not None and len(value) > max_length:
+            errors.append(f"{name}: length {len(value)} is greater than {max_length}")
+        items = value if is_list else (value,)
+        for item_check in item_checks:
+            # report the first offending item of each check
+            for item in items:
+                message = item_check(item)
+                if message is not None:
+                    errors.append(message)
+                    break
+        return errors
+
+    return check_value
+
+
+def checked(coerce: Callable[[Any], Any], checker: Checker) -> Callable[[Any], Any]:
+    """wraps the given coercer so that its results are checked"""
+
+    def coerce_and_check(value: Any) -> Any:
+        result = coerce(value)
+        errors = checker(result)
+        if errors:
+            raise ValidationError(errors)
+        return result
+
+    return coerce_and_check
+
+
+def _provides(inputs: Dict[str, Any], path: Tuple[str, ...]) -> bool:
+    """
+    returns True if the given layer (or section inputs) sets the option at path,
+    which is either nested ({"db": {"host": ...}}) or flattened ({"db__host": ...})
+    """
+    if len(path) == 1:
+        return path[0] in inputs
+    if "__".join(path) in inputs:
+        return True
+    nested = inputs.get(path[0])
+    return isinstance(nested, dict) and _provides(nested, path[1:])
+
+
+def violations(
+    cfg: "BaseCfg",
+    layers: Optional[Dict[str, Dict[str, Any]]] = None,
+    names: Optional[Collection[str]] = None,
+) -> List[str]:
+    """
+    returns every violation in the given source layers (by default those of the
+    configuration): required options which no source sets, and effective values
+    which fail their checks (only those of the given option names, if any)
+    """
+    # pylint: disable=protected-access
+    schema = cfg._schema
+    if layers is None:
+        layers = cfg._layers
+    # the layers which set anything, highest precedence first
+    ordered = [
+        layers[source] for source in reversed(cfg._source_order) if layers.get(source)
+    ]
+    errors = [
+        f"{'.'.join(path)}: is required but wasn't set by any source"
+        for path in schema.required
+        if not any(_provides(layer, path) for layer in ordered)
+    ]
+    for name, checker in schema.checkers.items():
+        if names is not None and name not in names:
+            continue
+        for layer in ordered:
+            if name in layer:
+                value = layer[name]
+                # Deferred values are checked when they are resolved
+                if not isinstance(value, Deferred):
+                    errors.extend(checker(value))
+                break
+    return errors
+
+
+def check(
+    cfg: "BaseCfg",
+    layers: Optional[Dict[str, Dict[str, Any]]] = None,
+    names: Optional[Collection[str]] = None,
+) -> None:
+    """raises a ValidationError listing the violations (see violations), if any"""
+    errors = violations(cfg, layers, names)
+    if errors:
+        raise ValidationError(errors)
+
+
+def validate(cfg: "BaseCfg") -> None:
+    """
+    resolves every lazy option and section of the configuration (recursively), so
+    that invalid inputs raise now rather than on first use; the violations found
+    in all of them are reported together
+    """
+    # pylint: disable=protected-access
+    schema = cfg._schema
+    errors: List[str] = []
+    for name in schema.lazy:
+        try:
+            value = getattr(cfg, name)
+            if name in schema.sections:
+                validate(value)
+        except ValidationError as exc:
+            errors.extend(exc.errors)
+    if errors:
+        raise ValidationError(errors)
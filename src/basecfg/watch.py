@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+module which watches the sources of a BaseCfg instance in a background thread (or
+an asyncio task) and applies changes (e.g. rotated docker secrets) as they appear
+"""
+import asyncio
+import inspect
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .basecfg import BaseCfg
+
+logger = logging.getLogger(__name__)
+
+ChangeCallback = Callable[["BaseCfg", Dict[str, Any]], None]
+ErrorCallback = Callable[["BaseCfg", Exception], None]
+
+
+class ConfigWatcher:
+    """
+    ConfigWatcher polls the sources of a configuration instance every "interval"
+    seconds by calling its reload() method. Since reload() only stats the config
+    files between changes, polling is cheap. When options change, "on_change" is
+    called with the configuration and a dict of the changed values; when reloading
+    fails (e.g. a file was replaced with invalid data) the configuration is left
+    as-is and "on_error" is called (or the error is logged)
+    """
+
+    def __init__(
+        self,
+        cfg: "BaseCfg",
+        interval: float = 5.0,
+        on_change: Optional[ChangeCallback] = None,
+        on_error: Optional[ErrorCallback] = None,
+    ) -> None:
+        self.cfg = cfg
+        self.interval = interval
+        self.on_change = on_change
+        self.on_error = on_error
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> Dict[str, Any]:
+        """reload the configuration once, returning the changed values"""
+        changes = self.cfg.reload()
+        if changes and self.on_change:
+            self.on_change(self.cfg, changes)
+        return changes
+
+    def _run(self) -> None:
+        """the body of the watcher thread"""
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                if self.on_error:
+                    self.on_error(self.cfg, err)
+                else:
+                    logger.exception("failed to reload configuration")
+
+    def start(self) -> "ConfigWatcher":
+        """start polling in a daemon thread"""
+        if self._thread is not None:
+            raise RuntimeError("watcher already started")
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="basecfg-watcher", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """stop polling and wait for the watcher thread to exit"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self) -> "ConfigWatcher":
+        if self._thread is None:
+            self.start()
+        return self
+
+    def __exit__(self, *_exc_info: Any) -> None:
+        self.stop()
+
+
+async def watch_async(
+    cfg: "BaseCfg",
+    interval: float = 5.0,
+    on_change: Optional[ChangeCallback] = None,
+    on_error: Optional[ErrorCallback] = None,
+) -> None:
+    """
+    the asyncio counterpart of ConfigWatcher: calls cfg.areload() every "interval"
+    seconds until cancelled, calling (or awaiting) on_change and on_error like
+    ConfigWatcher does
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            changes = await cfg.areload()
+            if changes and on_change:
+                result: Any = on_change(cfg, changes)
+                if inspect.isawaitable(result):
+                    await result
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            if on_error:
+                result = on_error(cfg, err)
+                if inspect.isawaitable(result):
+                    await result
+            else:
+                logger.exception("failed to reload configuration")
@@ -94,13 +94,15 @@ def test_logcfg_redact(config, json_full_good, caplog):
     ]
 
 
-def test_logcfg_autoredact(config, json_full_good, caplog):
+def test_logcfg_autoredact(config, json_full_good, caplog, monkeypatch):
     """
     test auto-redaction of field names which contain one of the values in
     _autoredact_tokens
     """
     # pylint: disable=protected-access
-    config._autoredact_tokens = config._autoredact_tokens + ("favorite",)
+    monkeypatch.setattr(
+        config, "_autoredact_tokens", config._autoredact_tokens + ("favorite",)
+    )
     conf = config(json_full_good)
     assert conf is not None
 
@@ -116,3 +118,43 @@ def test_logcfg_autoredact(config, json_full_good, caplog):
         ("root", logging.INFO, "  temps: [1.2, 1.3, 1.4]"),
         ("root", logging.INFO, "  favorite_color: --AUTO-REDACTED--"),
     ]
+
+
+def test_logcfg_structured(config, json_full_good, caplog, monkeypatch):
+    """test logging the configuration as a single structured record"""
+    # pylint: disable=protected-access
+    monkeypatch.setattr(
+        config, "_autoredact_tokens", config._autoredact_tokens + ("favorite",)
+    )
+    conf = config(json_full_good)
+    conf._options["temps"] = conf._options["temps"]._replace(redact=True)
+
+    logger = logging.getLogger("root")
+    logger.setLevel("DEBUG")
+    conf.logcfg(logger, structured=True)
+    assert caplog.record_tuples == [
+        ("root", logging.INFO, "running configuration:"),
+    ]
+    assert caplog.records[0].config == {
+        "verbose": True,
+        "batch_size": 65535,
+        "input_files": ["a.txt", "b.txt", "c.txt"],
+        "yn": [True, False, True],
+        "temps": "--REDACTED--",
+        "favorite_color": "--AUTO-REDACTED--",
+    }
+
+
+def test_logcfg_redaction_plan(config, monkeypatch):
+    """verify that the redaction decisions are computed once per token list"""
+    # pylint: disable=protected-access
+    tokens = tuple(config._autoredact_tokens)
+    plan = config._schema.redaction_plan(tokens)
+    assert config._schema.redaction_plan(tokens) is plan
+    assert not plan
+
+    monkeypatch.setattr(config, "_autoredact_tokens", ("color", "TEMPS"))
+    conf = config()
+    assert conf._redaction_plan(True) == {"favorite_color": "--AUTO-REDACTED--"}
+    assert not conf._redaction_plan(False)
+    assert conf._looks_sensitive("Favorite_Color")
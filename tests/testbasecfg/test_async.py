@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+""" tests for asyncio configuration loading and reloading """
+# pylint: disable=protected-access
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+
+def test_aload_matches_init(
+    config, json_full_good, envfile_partial_good, secrets_test_files, temp_envvars
+):
+    """verify that aload applies the sources like the constructor does"""
+    temp_envvars()
+    os.environ["TEMPS"] = "9.5"
+    kwargs = {
+        "json_config_path": json_full_good,
+        "envfile_path": envfile_partial_good,
+        "secrets_dir": secrets_test_files["good"],
+        "cli_args": ["--batch-size", "7"],
+    }
+    expected = config(**kwargs)
+    conf = asyncio.run(config.aload(**kwargs))
+    assert isinstance(conf, config)
+    assert conf.freeze() == expected.freeze()
+    assert conf._layers == expected._layers
+    assert conf._fingerprints == expected._fingerprints
+    assert conf.batch_size == 7
+
+
+def test_aload_threads(config, json_full_good, monkeypatch):
+    """verify that the files are read off the event loop thread"""
+    threads = []
+    read_json_config = config._read_json_config
+
+    def recording_read(*args):
+        threads.append(threading.current_thread())
+        return read_json_config(*args)
+
+    monkeypatch.setattr(config, "_read_json_config", staticmethod(recording_read))
+    conf = asyncio.run(config.aload(json_full_good, cli_args=[]))
+    assert conf.favorite_color == "green"
+    assert threads and threading.current_thread() not in threads
+
+
+def test_aload_error_order(config, bad_json_inputs, bad_envfile_inputs):
+    """verify that the error from the highest-precedence failing source wins"""
+    with pytest.raises(json.JSONDecodeError):
+        asyncio.run(
+            config.aload(
+                bad_json_inputs["bad_format"],
+                True,
+                bad_envfile_inputs["bad_format"],
+                True,
+                cli_args=[],
+            )
+        )
+
+
+def test_awatch(config, json_partial_good):
+    """verify that awatch applies changes from a background task"""
+    changes = []
+
+    async def on_change(_cfg, changed):
+        changes.append(changed)
+
+    async def run():
+        conf = await config.aload(json_partial_good, True, cli_args=[])
+        task = asyncio.create_task(conf.awatch(0.01, on_change))
+        stat = os.stat(json_partial_good)
+        json_partial_good.write_text(json.dumps({"batch_size": 3}))
+        os.utime(
+            json_partial_good, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000)
+        )
+        for _ in range(200):
+            if changes:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return conf
+
+    conf = asyncio.run(run())
+    assert conf.batch_size == 3
+    assert changes and changes[0]["batch_size"] == 3
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+""" tests for the resolved-config cache file """
+# pylint: disable=protected-access,too-few-public-methods
+import json
+import os
+import stat
+from typing import Optional
+
+import pytest
+
+from basecfg import BaseCfg, opt
+from basecfg.__main__ import main
+
+
+class SecretConfig(BaseCfg):
+    """a config with a sensitive option"""
+
+    user: str = opt(default="nobody", doc="the user name")
+    password: Optional[str] = opt(default=None, doc="the password")
+
+
+def no_json_parsing(monkeypatch, cfg_class):
+    """makes loading the json config file fail"""
+
+    def fail(*_args):
+        raise AssertionError("the json config should not be parsed")
+
+    monkeypatch.setattr(cfg_class, "_read_json_config", staticmethod(fail))
+
+
+def test_cache_roundtrip(config, json_full_good, tmp_path, monkeypatch):
+    """verify that a cached config is loaded without parsing the json config"""
+    cache_path = tmp_path / "cache.json"
+    conf = config.from_cache(cache_path, json_config_path=json_full_good, cli_args=[])
+    assert cache_path.is_file()
+    assert stat.S_IMODE(os.stat(cache_path).st_mode) == 0o600
+
+    no_json_parsing(monkeypatch, config)
+    cached = config.from_cache(cache_path, json_config_path=json_full_good, cli_args=[])
+    assert cached.freeze() == conf.freeze()
+    assert cached.yn == [True, False, True]
+
+
+def test_cache_invalidation(config, json_partial_good, tmp_path, monkeypatch):
+    """verify that changed sources or arguments cause the cache to be rebuilt"""
+    cache_path = tmp_path / "cache.json"
+    config.from_cache(cache_path, json_config_path=json_partial_good, cli_args=[])
+
+    conf = config.from_cache(
+        cache_path, json_config_path=json_partial_good, cli_args=["--verbose"]
+    )
+    assert conf.verbose is True
+
+    json_partial_good.write_text('{"batch_size": 12}')
+    conf = config.from_cache(
+        cache_path, json_config_path=json_partial_good, cli_args=["--verbose"]
+    )
+    assert conf.batch_size == 12
+
+    no_json_parsing(monkeypatch, config)
+    conf = config.from_cache(
+        cache_path, json_config_path=json_partial_good, cli_args=["--verbose"]
+    )
+    assert conf.batch_size == 12
+    assert conf.verbose is True
+
+
+def test_cache_live_envvars(config, json_partial_good, tmp_path, temp_envvars):
+    """verify that environment variables are read even when the cache is used"""
+    temp_envvars()
+    cache_path = tmp_path / "cache.json"
+    config.from_cache(cache_path, json_config_path=json_partial_good, cli_args=[])
+    os.environ["BATCH_SIZE"] = "99"
+    conf = config.from_cache(
+        cache_path, json_config_path=json_partial_good, cli_args=[]
+    )
+    assert conf.batch_size == 99
+    assert "envvars" not in json.loads(cache_path.read_text())["layers"]
+
+
+def test_cache_secrets(tmp_path):
+    """verify that sensitive values are only cached when explicitly allowed"""
+    cache_path = tmp_path / "cache.json"
+    json_path = tmp_path / "config.json"
+    json_path.write_text('{"user": "alice", "password": "hunter2"}')
+    conf = SecretConfig.from_cache(cache_path, json_config_path=json_path, cli_args=[])
+    assert conf.password == "hunter2"
+    assert not cache_path.exists()
+
+    SecretConfig.from_cache(
+        cache_path, json_config_path=json_path, cli_args=[], allow_secrets=True
+    )
+    assert "hunter2" in cache_path.read_text()
+
+
+def test_cache_build_command(tmp_path, capsys):
+    """test pre-building the cache with python -m basecfg"""
+    cache_path = tmp_path / "cache.json"
+    json_path = tmp_path / "config.json"
+    json_path.write_text('{"user": "alice", "password": "hunter2"}')
+    args = [
+        "build-cache",
+        f"{__name__}:SecretConfig",
+        "--cache-path",
+        str(cache_path),
+        "--json-config-path",
+        str(json_path),
+    ]
+    assert main(args) == 1
+    assert "can't be cached" in capsys.readouterr().err
+    assert main(args + ["--allow-secrets", "--", "--user", "bob"]) == 0
+    document = json.loads(cache_path.read_text())
+    assert document["layers"]["cli"] == {"user": "bob"}
+
+    conf = SecretConfig.from_cache(
+        cache_path,
+        json_config_path=json_path,
+        cli_args=["--user", "bob"],
+        allow_secrets=True,
+    )
+    assert conf.user == "bob"
+    assert conf.password == "hunter2"
+
+
+def test_cache_bad_class():
+    """verify that the build command rejects things which aren't config classes"""
+    with pytest.raises(TypeError):
+        main(["build-cache", "os:path", "--cache-path", "/nonexistent"])
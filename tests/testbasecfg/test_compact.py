@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+""" tests for compact (array-backed) numeric list options """
+# pylint: disable=too-few-public-methods,protected-access,unused-variable
+import json
+import os
+from array import array
+from typing import List, Optional
+
+import pytest
+
+from basecfg import BaseCfg, opt
+
+
+class CompactCfg(BaseCfg):
+    """a config with compact list options"""
+
+    ids: List[int] = opt([], "some ids", compact=True)
+    weights: List[float] = opt([1.0], "some weights", compact="f", sep=";")
+    ports: Optional[List[int]] = opt(None, "some ports", compact="H")
+
+
+def test_compact_defaults():
+    """verify that the defaults of compact options are arrays"""
+    assert CompactCfg.ids == array("q")
+    assert CompactCfg.weights == array("f", [1.0])
+    assert CompactCfg.ports is None
+
+
+def test_compact_text(temp_envvars):
+    """verify bulk parsing of text inputs, and the item by item fallback"""
+    temp_envvars()
+    os.environ["IDS"] = "1, 2,3"
+    os.environ["PORTS"] = "+80,0443"
+    conf = CompactCfg(cli_args=["--weights", "0.5;2"])
+    assert conf.ids == array("q", [1, 2, 3])
+    assert conf.weights == array("f", [0.5, 2.0])
+    assert conf.ports == array("H", [80, 443])
+
+    os.environ["PORTS"] = "70000"
+    with pytest.raises(ValueError):
+        CompactCfg(cli_args=[])
+    os.environ["PORTS"] = "1.5"
+    with pytest.raises(ValueError):
+        CompactCfg(cli_args=[])
+
+
+def test_compact_json(tmp_path):
+    """verify that json arrays are checked and converted in a single pass"""
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"ids": [4, 5], "weights": [1, 2.5]}))
+    conf = CompactCfg(json_config_path=str(path), cli_args=[])
+    assert conf.ids == array("q", [4, 5])
+    assert conf.weights == array("f", [1.0, 2.5])
+
+    for bad in ([1.5], ["1"], "1,2"):
+        path.write_text(json.dumps({"ids": bad}))
+        with pytest.raises(TypeError):
+            CompactCfg(json_config_path=str(path), cli_args=[])
+
+
+def test_compact_export():
+    """verify that compact values are exported and frozen like lists"""
+    conf = CompactCfg(cli_args=["--ids", "1,2", "--ports", "80"])
+    assert conf.to_args(skip_defaults=True) == ["--ids=1,2", "--ports=80"]
+    assert conf.to_env(skip_defaults=True) == "IDS=1,2\nPORTS=80\n"
+    assert json.loads(conf.to_json())["ids"] == [1, 2]
+    assert conf.freeze().ids == (1, 2)
+    assert CompactCfg(cli_args=conf.to_args()).to_dict() == conf.to_dict()
+
+
+def test_compact_invalid():
+    """verify that only numeric list options can be compact"""
+    with pytest.raises(TypeError):
+
+        class StrCfg(BaseCfg):
+            """compact strings"""
+
+            names: List[str] = opt([], "some names", compact=True)
+
+    with pytest.raises(TypeError):
+
+        class TypecodeCfg(BaseCfg):
+            """a float typecode for ints"""
+
+            ids: List[int] = opt([], "some ids", compact="d")
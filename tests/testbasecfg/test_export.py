@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+""" tests for exporting configurations """
+# pylint: disable=too-few-public-methods
+import json
+
+import pytest
+
+from basecfg import BaseCfg, opt
+
+
+def test_to_dict(config, json_full_good):
+    """verify exporting to a dict and json, with and without redaction"""
+    conf = config(json_full_good, cli_args=[])
+    exported = conf.to_dict()
+    assert list(exported) == list(conf)
+    assert exported == json.loads(json_full_good.read_text())
+    assert json.loads(conf.to_json()) == exported
+
+    # pylint: disable=protected-access
+    conf._options["temps"] = conf._options["temps"]._replace(redact=True)
+    assert conf.to_dict(redact=True)["temps"] == "--REDACTED--"
+    assert json.loads(conf.to_json(redact=True))["temps"] == "--REDACTED--"
+
+
+def test_to_env(config, json_full_good, tmp_path):
+    """verify that an exported envfile loads back into the same configuration"""
+    conf = config(json_full_good, cli_args=[])
+    text = conf.to_env()
+    assert "YN=true;false;true\n" in text
+    assert "TEMPS=1.2,1.3,1.4\n" in text
+    envfile_path = tmp_path / "exported.env"
+    envfile_path.write_text(text)
+    assert config(envfile_path=envfile_path, cli_args=[]).to_dict() == conf.to_dict()
+
+    assert config(cli_args=["--verbose"]).to_env(skip_defaults=True) == "VERBOSE=true\n"
+    assert config(cli_args=[]).to_env() == "VERBOSE=false\nFAVORITE_COLOR=blue\n"
+
+
+def test_to_args(config, json_full_good):
+    """verify that exported arguments parse back into the same configuration"""
+    conf = config(json_full_good, cli_args=[])
+    args = conf.to_args()
+    assert args[:2] == ["--verbose", "--batch-size=65535"]
+    assert args.count("--input-files=a.txt") == 1
+    assert config(cli_args=args).to_dict() == conf.to_dict()
+    assert config(cli_args=["--no-verbose"]).to_args(skip_defaults=True) == []
+
+
+def test_export_errors(config):
+    """verify that values which can't be written as text are rejected"""
+    conf = config(cli_args=["--input-files", " padded"])
+    with pytest.raises(ValueError):
+        conf.to_env()
+    assert "--input-files= padded" in conf.to_args()
+
+    conf = config(cli_args=["--input-files", "a,b"])
+    with pytest.raises(ValueError):
+        conf.to_env()
+
+    conf = config(cli_args=[])
+    conf.favorite_color = None
+    with pytest.raises(ValueError):
+        conf.to_args()
+
+
+def test_export_parser():
+    """verify that values a custom parser doesn't read back as they are raise"""
+
+    class ParsedCfg(BaseCfg):
+        """a config with options which have custom parsers"""
+
+        scaled: int = opt(1, "a scaled number", parser=lambda v: int(v) * 10)
+        name: str = opt("a", "a name", parser=lambda v: str(v).lower())
+
+    conf = ParsedCfg(cli_args=["--scaled", "3", "--name", "B"])
+    assert conf.scaled == 30
+    with pytest.raises(ValueError):
+        conf.to_env()
+    with pytest.raises(ValueError):
+        conf.to_args()
+
+    conf = ParsedCfg(cli_args=["--name", "B"])
+    assert conf.to_args(skip_defaults=True) == ["--name=b"]
+    assert ParsedCfg(cli_args=conf.to_args(skip_defaults=True)).name == "b"
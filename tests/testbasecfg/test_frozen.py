@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+""" tests for frozen configuration snapshots """
+# pylint: disable=too-few-public-methods
+import copy
+import pickle
+from typing import Dict
+
+import pytest
+
+from basecfg import BaseCfg, opt
+
+
+class DictCfg(BaseCfg):
+    """a config with a dict option"""
+
+    limits: Dict[str, int] = opt({}, "some limits")
+
+
+def test_freeze(config, json_full_good):
+    """verify the values and mapping behavior of a snapshot"""
+    frozen = config(json_full_good).freeze()
+    assert frozen.batch_size == 65535
+    assert frozen.input_files == ("a.txt", "b.txt", "c.txt")
+    assert frozen["favorite_color"] == "green"
+    assert list(frozen) == list(config())
+    assert len(frozen) == 6
+    assert not hasattr(frozen, "__dict__")
+    with pytest.raises(KeyError):
+        _ = frozen["blerg"]
+
+
+def test_freeze_immutable(config):
+    """verify that snapshots can't be modified"""
+    frozen = config().freeze()
+    with pytest.raises(AttributeError):
+        frozen.verbose = True
+    with pytest.raises(AttributeError):
+        del frozen.verbose
+    with pytest.raises(AttributeError):
+        frozen.blerg = 1
+
+
+def test_freeze_class_shared(config, json_full_good):
+    """verify that the snapshot class is generated once per config class"""
+    frozen_a = config().freeze()
+    frozen_b = config(json_full_good).freeze()
+    assert type(frozen_a) is type(frozen_b)
+    assert type(frozen_a).__name__ == "ConfigFrozen"
+
+
+def test_freeze_hash_copy(config, json_full_good):
+    """verify hashing, equality, copying and pickling"""
+    frozen = config(json_full_good).freeze()
+    same = config(json_full_good).freeze()
+    assert frozen == same
+    assert hash(frozen) == hash(same)
+    assert frozen != config().freeze()
+    assert len({frozen, same}) == 1
+    assert copy.copy(frozen) is frozen
+    assert copy.deepcopy(frozen) is frozen
+    assert pickle.loads(pickle.dumps(frozen)) == frozen
+
+    frozen = DictCfg(cli_args=["--limits", "a=1,b=2"]).freeze()
+    assert frozen.limits == {"a": 1, "b": 2}
+    assert hash(frozen) == hash(DictCfg(cli_args=["--limits", "b=2,a=1"]).freeze())
+    assert pickle.loads(pickle.dumps(frozen)) == frozen
+    with pytest.raises(TypeError):
+        frozen.limits["a"] = 3  # type: ignore[index]
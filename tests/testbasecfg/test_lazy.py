@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+""" tests for lazily parsed options """
+# pylint: disable=too-few-public-methods,protected-access
+import json
+import os
+from typing import List
+
+import pytest
+
+from basecfg import BaseCfg, opt
+
+PARSED: List[str] = []
+
+
+def parse_pattern(value: str) -> str:
+    """a stand-in for an expensive parser which records its inputs"""
+    PARSED.append(value)
+    return value.upper()
+
+
+class LazyCfg(BaseCfg):
+    """a config with a lazily parsed option"""
+
+    pattern: str = opt("none", "an expensive option", parser=parse_pattern, lazy=True)
+    mode: str = opt(
+        "a", "a lazy choice", choices=["A", "B"], parser=parse_pattern, lazy=True
+    )
+
+
+@pytest.fixture(name="parsed")
+def fixture_parsed():
+    """fixture which resets the recorded parser inputs"""
+    PARSED.clear()
+    yield PARSED
+    PARSED.clear()
+
+
+def test_lazy_winning_input(parsed, tmp_path, temp_envvars):
+    """verify that only the winning input is parsed, once, on first access"""
+    temp_envvars()
+    json_path = tmp_path / "config.json"
+    json_path.write_text(json.dumps({"pattern": "from json"}))
+    os.environ["PATTERN"] = "from env"
+    conf = LazyCfg(json_path, cli_args=[])
+    assert not parsed
+    assert conf.pattern == "FROM ENV"
+    assert conf.pattern == "FROM ENV"
+    assert parsed == ["from env"]
+    assert conf.source_of("pattern") == "envvars"
+
+    conf = LazyCfg(cli_args=["--pattern", "from cli"])
+    assert not parsed[1:]
+    assert conf.pattern == "FROM CLI"
+    assert conf.mode == "a"
+    assert parsed == ["from env", "from cli"]
+
+
+def test_lazy_validate(parsed):
+    """verify that invalid inputs raise on first use or on validate()"""
+    conf = LazyCfg(cli_args=["--mode", "c"])
+    with pytest.raises(ValueError):
+        conf.validate()
+    with pytest.raises(ValueError):
+        _ = conf.mode
+    conf = LazyCfg(cli_args=["--mode", "b"])
+    conf.validate()
+    assert "mode" in conf.__dict__
+    assert conf.mode == "B"
+    assert parsed == ["c", "c", "b"]
+
+
+def test_lazy_reload(parsed, tmp_path):
+    """verify that reloading re-parses only the lazy options already used"""
+    json_path = tmp_path / "config.json"
+    json_path.write_text(json.dumps({"pattern": "one", "mode": "a"}))
+    conf = LazyCfg(json_path, cli_args=[])
+    assert conf.pattern == "ONE"
+    stat = os.stat(json_path)
+    json_path.write_text(json.dumps({"pattern": "two", "mode": "b"}))
+    os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert conf.reload() == {"pattern": "TWO"}
+    assert parsed == ["one", "two"]
+    assert conf.mode == "B"
+
+
+class LazyArgsCfg(BaseCfg):
+    """a config with lazy bool and list options"""
+
+    flag: bool = opt(False, "a lazy flag", lazy=True)
+    hosts: List[str] = opt([], "some lazy hosts", lazy=True)
+    ports: List[int] = opt([], "some lazy ports", lazy=True, max_value=65535)
+
+
+def test_lazy_cli_actions():
+    """verify that lazy options keep their command-line actions"""
+    conf = LazyArgsCfg(cli_args=["--flag", "--hosts", "a", "--hosts", "b"])
+    assert conf.flag is True
+    assert conf.hosts == ["a", "b"]
+    assert LazyArgsCfg(cli_args=["--no-flag"]).flag is False
+
+    conf = LazyArgsCfg(cli_args=["--ports", "80", "--ports", "70000"])
+    assert "ports" not in conf.__dict__
+    with pytest.raises(ValueError):
+        _ = conf.ports
+    assert LazyArgsCfg(cli_args=["--ports", "80", "--ports", "443"]).ports == [80, 443]
+
+
+def test_lazy_cli_roundtrip():
+    """verify that to_args() output for lazy options parses back"""
+    conf = LazyArgsCfg(cli_args=["--flag", "--hosts", "a", "--hosts", "b"])
+    args = conf.to_args()
+    assert "--flag" in args
+    again = LazyArgsCfg(cli_args=args)
+    assert again.to_dict() == conf.to_dict()
+    assert again.source_of("hosts") == "cli"
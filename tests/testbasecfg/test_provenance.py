@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+""" tests for value provenance """
+import logging
+import os
+
+import pytest
+
+from basecfg.provenance import SOURCES, source_codes
+
+
+def test_source_of(
+    config, json_full_good, envfile_partial_good, secrets_test_files, temp_envvars
+):
+    """verify that each option reports the highest-precedence source which set it"""
+    temp_envvars()
+    os.environ["TEMPS"] = "9.5"
+    conf = config(
+        json_full_good,
+        envfile_path=envfile_partial_good,
+        secrets_dir=secrets_test_files["bad_value"].parent / "missing",
+        cli_args=["--batch-size", "7"],
+    )
+    assert conf.source_of("input_files") == "json"
+    assert conf.source_of("favorite_color") == "envfile"
+    assert conf.source_of("temps") == "envvars"
+    assert conf.source_of("batch_size") == "cli"
+    assert conf.source_detail("input_files") == str(json_full_good)
+    assert conf.source_detail("favorite_color") == str(envfile_partial_good)
+    assert conf.source_detail("temps") == "TEMPS"
+    assert conf.source_detail("batch_size") == "--batch-size"
+    with pytest.raises(KeyError):
+        conf.source_of("nope")
+
+    conf.batch_size = 8
+    assert conf.source_of("batch_size") == "assigned"
+    assert conf.source_detail("batch_size") is None
+    codes = source_codes(conf)
+    assert codes.itemsize == 1
+    assert [SOURCES[code] for code in codes] == [conf.source_of(key) for key in conf]
+
+
+def test_source_of_defaults_and_secrets(config, secrets_test_files):
+    """verify defaults and docker secrets provenance"""
+    conf = config(cli_args=[])
+    assert {conf.source_of(key) for key in conf} == {"default"}
+    assert conf.source_detail("verbose") is None
+
+    conf = config(secrets_dir=secrets_test_files["good"], cli_args=[])
+    assert conf.source_of("yn") == "secrets"
+    assert conf.source_detail("yn") == str(secrets_test_files["good"] / "yn")
+
+
+def test_logcfg_sources(config, json_partial_good, caplog):
+    """verify that logcfg can report the source of each value"""
+    conf = config(json_partial_good, cli_args=[])
+    with caplog.at_level(logging.INFO):
+        conf.logcfg(logging.getLogger("test"), sources=True)
+    assert "  batch_size: 65535 (from json)" in caplog.messages
+    assert "  verbose: False (from default)" in caplog.messages
+
+    caplog.clear()
+    with caplog.at_level(logging.INFO):
+        conf.logcfg(logging.getLogger("test"), structured=True, sources=True)
+    assert caplog.records[0].config_sources["favorite_color"] == "json"
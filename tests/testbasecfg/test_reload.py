@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+""" tests for reloading changed configuration sources """
+# pylint: disable=protected-access
+import json
+import os
+import threading
+
+import pytest
+
+
+def bump(path, content):
+    """rewrite the file at path and make sure its mtime moves forward"""
+    stat = os.stat(path)
+    path.write_text(content)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_reload_unchanged(config, json_partial_good, monkeypatch):
+    """verify that unchanged files aren't parsed again"""
+    conf = config(json_partial_good, True)
+
+    def fail(*_args):
+        raise AssertionError("unchanged json config should not be re-parsed")
+
+    monkeypatch.setattr(conf, "_parse_json_config", fail)
+    assert conf.reload() == {}
+
+
+def test_reload_json(config, json_partial_good):
+    """verify that a changed json config file is picked up"""
+    conf = config(json_partial_good, True)
+    assert conf.batch_size == 65535
+    bump(json_partial_good, json.dumps({"batch_size": 10, "verbose": True}))
+    changes = conf.reload()
+    assert changes == {"batch_size": 10, "verbose": True, "favorite_color": "blue"}
+    assert conf.batch_size == 10
+    assert conf.verbose is True
+    assert conf.favorite_color == "blue"
+
+
+def test_reload_precedence(config, json_partial_good, temp_envvars):
+    """verify that a reloaded source doesn't override a higher-precedence one"""
+    temp_envvars()
+    os.environ["BATCH_SIZE"] = "7"
+    conf = config(json_partial_good, True)
+    bump(json_partial_good, json.dumps({"batch_size": 10}))
+    assert conf.reload() == {"favorite_color": "blue"}
+    assert conf.batch_size == 7
+
+
+def test_reload_secrets(config, secrets_test_files, monkeypatch):
+    """verify that only rotated secrets are read again"""
+    secrets_dir = secrets_test_files["good"]
+    conf = config(secrets_dir=secrets_dir)
+    assert conf.batch_size == 65535
+
+    read_paths = []
+    read_secret = config._read_docker_secret
+
+    def recording_read(path, *args, **kwargs):
+        read_paths.append(path)
+        return read_secret(path, *args, **kwargs)
+
+    monkeypatch.setattr(config, "_read_docker_secret", staticmethod(recording_read))
+    bump(secrets_dir / "batch_size", "12")
+    os.unlink(secrets_dir / "temps")
+    assert conf.reload() == {"batch_size": 12, "temps": []}
+    assert read_paths == [str(secrets_dir / "batch_size")]
+
+
+def test_reload_error(config, envfile_partial_good):
+    """verify that a failed reload leaves the configuration unchanged"""
+    conf = config(envfile_path=envfile_partial_good)
+    bump(envfile_partial_good, "BATCH_SIZE=white\n")
+    with pytest.raises(ValueError):
+        conf.reload()
+    assert conf.batch_size == 65535
+    bump(envfile_partial_good, "BATCH_SIZE=3\n")
+    assert conf.reload() == {"batch_size": 3, "favorite_color": "blue"}
+
+
+def test_watcher(config, json_partial_good):
+    """verify that the watcher thread applies changes and reports them"""
+    conf = config(json_partial_good, True)
+    changed = threading.Event()
+    seen = []
+
+    def on_change(cfg, changes):
+        seen.append((cfg, changes))
+        changed.set()
+
+    with conf.watch(interval=0.01, on_change=on_change):
+        bump(
+            json_partial_good, json.dumps({"batch_size": 5, "favorite_color": "green"})
+        )
+        assert changed.wait(5)
+    assert seen == [(conf, {"batch_size": 5})]
+    assert conf.batch_size == 5
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+""" tests for the per-class compiled option schema """
+# pylint: disable=protected-access,too-few-public-methods
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import pytest
+
+from basecfg import BaseCfg, opt
+
+
+def test_schema_shared(config):
+    """verify that the schema is compiled once and shared by all instances"""
+    conf_a = config()
+    conf_b = config()
+    assert conf_a._schema is conf_b._schema is config._schema
+    compiled = config._schema.options["batch_size"]
+    assert compiled.base_type == "int"
+    assert compiled.env_names == ("BATCH_SIZE", "batch_size")
+    assert compiled.cli_flag == "--batch-size"
+    assert config._schema.options["yn"].base_type == "List[bool]"
+
+
+def test_schema_instance_options_copy(config):
+    """verify that modifying one instance's _options doesn't affect other instances"""
+    conf_a = config()
+    conf_a._options["verbose"] = conf_a._options["verbose"]._replace(redact=True)
+    conf_b = config()
+    assert conf_b._options["verbose"].redact is False
+    assert config._schema.metadata["verbose"].redact is False
+
+
+def test_schema_inheritance():
+    """verify that subclasses extend the options of their parent class"""
+
+    class ParentCfg(BaseCfg):
+        """a parent config"""
+
+        host: str = opt(default="localhost", doc="the host")
+        port: Optional[int] = opt(default=None, doc="the port")
+
+    class ChildCfg(ParentCfg):
+        """a child config"""
+
+        tags: List[str] = opt(default=[], doc="some tags")
+
+    assert ParentCfg._schema.names == ("host", "port")
+    assert ChildCfg._schema.names == ("host", "port", "tags")
+    conf = ChildCfg(cli_args=["--port", "80", "--tags", "a"])
+    assert conf.host == "localhost"
+    assert conf.port == 80
+    assert conf.tags == ["a"]
+
+
+def test_schema_coercers(config):
+    """verify the per-option coercers compiled into the schema"""
+    options = config._schema.options
+    assert options["verbose"].coerce_text("yes") is True
+    assert options["batch_size"].coerce_text("12") == 12
+    assert options["yn"].coerce_text("y;n") == [True, False]
+    assert options["temps"].coerce_json([1, "2.5"]) == [1.0, 2.5]
+    assert options["batch_size"].coerce_json(7) == 7
+    assert options["favorite_color"].coerce_json("GREEN") == "green"
+    # choices are checked by the validation pass, not by the coercers
+    assert options["favorite_color"].coerce_text("White") == "white"
+    assert options["favorite_color"].check("white")
+    assert not options["favorite_color"].check("green")
+    with pytest.raises(TypeError):
+        options["batch_size"].coerce_json("white")
+
+
+def test_schema_declarations():
+    """verify that opt() declarations are paired with annotations by name"""
+
+    class DeclaredCfg(BaseCfg):
+        """a config"""
+
+        host: str = opt(default="localhost", doc="the host")
+        port: int = opt(default=80, doc="the port")
+
+    assert DeclaredCfg.host == "localhost"
+    assert DeclaredCfg._schema.metadata["port"].option_type is int
+
+    with pytest.raises(TypeError, match="port"):
+
+        class UndeclaredCfg(BaseCfg):  # pylint: disable=unused-variable
+            """a config with an annotation but no opt()"""
+
+            host: str = opt(default="localhost", doc="the host")
+            port: int = 80
+
+    with pytest.raises(TypeError, match="port"):
+
+        class UnannotatedCfg(BaseCfg):  # pylint: disable=unused-variable
+            """a config with an opt() but no annotation"""
+
+            host: str = opt(default="localhost", doc="the host")
+            port = opt(default=80, doc="the port")
+
+
+def test_schema_concurrent():
+    """verify that classes can be defined and instantiated from many threads"""
+    barrier = threading.Barrier(8)
+
+    def build(tenant: int):
+        barrier.wait()
+
+        class TenantCfg(BaseCfg):
+            """a per-tenant config"""
+
+            name: str = opt(default=f"tenant{tenant}", doc="the tenant name")
+            size: int = opt(default=tenant, doc="the tenant size")
+            tags: List[str] = opt(default=[str(tenant)], doc="the tenant tags")
+
+        return TenantCfg, [TenantCfg(cli_args=[]).freeze() for _ in range(20)]
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(build, range(8)))
+    for tenant, (cfg_class, snapshots) in enumerate(results):
+        assert cfg_class._schema.names == ("name", "size", "tags")
+        assert snapshots[0].name == f"tenant{tenant}"
+        assert snapshots[0].tags == (str(tenant),)
+        assert len({type(snapshot) for snapshot in snapshots}) == 1
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+""" tests for nested configuration sections """
+# pylint: disable=too-few-public-methods,protected-access,no-member
+import json
+import logging
+import os
+from typing import List
+
+import pytest
+
+from basecfg import BaseCfg, opt, section
+
+
+class PoolCfg(BaseCfg):
+    """connection pool settings"""
+
+    size: int = opt(4, "the number of connections")
+
+
+class DbCfg(BaseCfg):
+    """database settings"""
+
+    host: str = opt("localhost", "the database host")
+    port: int = opt(5432, "the database port")
+    replicas: List[str] = opt([], "the read replicas")
+    password: str = opt("", "the database password")
+    pool: PoolCfg = section(PoolCfg, "connection pool settings")
+
+
+class AppCfg(BaseCfg):
+    """an app with a database section"""
+
+    verbose: bool = opt(False, "whether to log verbosely")
+    db: DbCfg = section(DbCfg, "database settings")
+
+
+def test_section_sources(tmp_path, temp_envvars):
+    """verify that every source can set the options of (nested) sections"""
+    temp_envvars()
+    json_path = tmp_path / "config.json"
+    json_path.write_text(json.dumps({"db": {"host": "db1", "pool": {"size": 8}}}))
+    envfile_path = tmp_path / ".env"
+    envfile_path.write_text("DB__REPLICAS=r1,r2\n")
+    secrets_dir = tmp_path / "secrets"
+    secrets_dir.mkdir()
+    (secrets_dir / "db__password").write_text("hunter2\n")
+    os.environ["DB__PORT"] = "6432"
+
+    conf = AppCfg(
+        json_path,
+        envfile_path=envfile_path,
+        secrets_dir=secrets_dir,
+        cli_args=["--verbose", "--db-pool-size", "16"],
+    )
+    assert conf.verbose is True
+    assert isinstance(conf.db, DbCfg)
+    assert conf.db.host == "db1"
+    assert conf.db.port == 6432
+    assert conf.db.replicas == ["r1", "r2"]
+    assert conf.db.password == "hunter2"
+    assert conf.db.pool.size == 16
+    assert conf.__dict__["db"] is conf.db
+    assert conf.db.source_of("port") == "envvars"
+    assert conf.db.pool.source_of("size") == "cli"
+
+    conf = AppCfg(cli_args=[])
+    assert conf.db.host == "localhost"
+    assert conf.db.pool.size == 4
+
+
+def test_section_lazy(temp_envvars):
+    """verify that sections are only coerced when they are first accessed"""
+    temp_envvars()
+    os.environ["DB__PORT"] = "not a number"
+    conf = AppCfg(cli_args=[])
+    assert conf._layers["envvars"] == {"db": {"port": "not a number"}}
+    assert "db" not in conf.__dict__
+    with pytest.raises(ValueError):
+        _ = conf.db
+
+
+def test_section_errors():
+    """verify that sections can't be given as single values"""
+    conf = AppCfg(cli_args=[])
+    with pytest.raises(TypeError):
+        conf._coerce_dict({"db": "x"})
+    with pytest.raises(TypeError):
+        conf._coerce_json({"db": "x"})
+
+    with pytest.raises(TypeError):
+
+        class _Clash(BaseCfg):
+            db_host: str = opt("", "clashes with db.host's flag")
+            db: DbCfg = section(DbCfg)
+
+
+def test_section_export():
+    """verify that sections are frozen and exported as nested values"""
+    conf = AppCfg(cli_args=["--db-host", "db2", "--db-replicas", "a"])
+    assert conf.to_dict()["db"]["host"] == "db2"
+    assert conf.to_dict()["db"]["pool"] == {"size": 4}
+    assert conf.to_dict(redact=True)["db"]["password"] == "--AUTO-REDACTED--"
+    assert conf.freeze().db.pool.size == 4
+    assert conf.freeze() == AppCfg(cli_args=conf.to_args()).freeze()
+    assert "DB__HOST=db2\n" in conf.to_env()
+    assert "--db-pool-size=4" in conf.to_args()
+    with conf.share() as publisher:
+        with AppCfg.attach_shared(publisher.name) as reader:
+            assert reader.snapshot() == conf.freeze()
+
+
+def test_section_reload(tmp_path):
+    """verify that reloading updates built sections in place"""
+    json_path = tmp_path / "config.json"
+    json_path.write_text(json.dumps({"db": {"host": "db1"}}))
+    conf = AppCfg(json_path, cli_args=[])
+    database = conf.db
+    stat = os.stat(json_path)
+    json_path.write_text(json.dumps({"db": {"host": "db3"}}))
+    os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert conf.reload() == {"db": database}
+    assert conf.db is database
+    assert database.host == "db3"
+
+
+def test_section_logcfg(caplog):
+    """verify that sections are logged with their options indented"""
+    conf = AppCfg(cli_args=["--db-password", "secret"])
+    with caplog.at_level(logging.INFO):
+        conf.logcfg(logging.getLogger("test"))
+    assert "  db:" in caplog.messages
+    assert "    host: 'localhost'" in caplog.messages
+    assert "    password: --AUTO-REDACTED--" in caplog.messages
+    assert "      size: 4" in caplog.messages
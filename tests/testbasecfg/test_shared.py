@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+""" tests for sharing configurations between processes """
+import multiprocessing
+
+import pytest
+
+from basecfg import BaseCfg, opt
+
+
+class OtherConfig(BaseCfg):
+    """a config with a different schema"""
+
+    verbose: int = opt(default=0, doc="how verbose to be")
+
+
+def read_shared(cfg_class, name, queue):
+    """reads the shared configuration in a child process"""
+    with cfg_class.attach_shared(name) as reader:
+        snapshot = reader.snapshot()
+        queue.put((reader.generation, snapshot.batch_size, snapshot.input_files))
+
+
+def test_share(config, json_full_good):
+    """verify that a published configuration can be read by another process"""
+    conf = config(json_full_good, cli_args=[])
+    with conf.share() as publisher:
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        child = context.Process(
+            target=read_shared, args=(config, publisher.name, queue)
+        )
+        child.start()
+        result = queue.get(timeout=10)
+        child.join(10)
+        assert child.exitcode == 0
+        assert result == (2, 65535, ("a.txt", "b.txt", "c.txt"))
+
+        with config.attach_shared(publisher.name) as reader:
+            assert reader.snapshot() == conf.freeze()
+
+
+def test_share_republish(config, json_full_good):
+    """verify that readers notice republished configurations"""
+    conf = config(json_full_good, cli_args=[])
+    with conf.share() as publisher, config.attach_shared(publisher.name) as reader:
+        first = reader.snapshot()
+        assert reader.snapshot() is first
+        assert not reader.changed
+
+        conf.batch_size = 1
+        assert publisher.publish(conf) == 4
+        assert reader.changed
+        assert reader.generation == 4
+        assert reader.snapshot().batch_size == 1
+        assert not reader.changed
+
+        conf.input_files = ["x" * 100] * 100
+        with pytest.raises(ValueError):
+            publisher.publish(conf)
+        assert reader.snapshot().batch_size == 1
+
+
+def test_share_errors(config):
+    """verify that mismatched schemas and unshareable values are rejected"""
+    conf = config(cli_args=[])
+    with conf.share(size=8192) as publisher:
+        with OtherConfig.attach_shared(publisher.name) as reader:
+            with pytest.raises(TypeError):
+                reader.snapshot()
+
+    conf.batch_size = object()
+    with pytest.raises(TypeError):
+        conf.share()
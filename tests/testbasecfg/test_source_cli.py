@@ -102,3 +102,27 @@ def test_args_bad_value(config, capsys):
         "(choose from 'blue', 'green', 'orange')"
     )
     assert expected_content in captured.err
+
+
+def test_args_parser_cached(config):
+    """verify that the argument parser is built once and reused"""
+    # pylint: disable=protected-access
+    conf_a = config(cli_args=["--batch-size", "1"], prog="cached")
+    conf_b = config(cli_args=["--batch-size", "2"], prog="cached")
+    assert conf_a._arg_parser() is conf_b._arg_parser()
+    assert conf_a.batch_size == 1
+    assert conf_b.batch_size == 2
+
+
+def test_args_empty_fast_path(config, monkeypatch):
+    """verify that argparse isn't used at all when there are no arguments"""
+
+    def fail():
+        raise AssertionError("the argument parser should not be built")
+
+    monkeypatch.setattr(config, "_arg_parser", fail)
+    monkeypatch.setattr("sys.argv", ["prog"])
+    conf = config()
+    assert conf.batch_size is None
+    conf = config(cli_args=[])
+    assert conf.batch_size is None
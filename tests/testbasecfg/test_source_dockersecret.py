@@ -1,8 +1,20 @@
 #!/usr/bin/env python3
 """ tests for loading values from docker secrets """
-# pylint: disable=duplicate-code
+# pylint: disable=duplicate-code,protected-access,too-few-public-methods,no-member
+import mmap
+from typing import Optional
+
 import pytest
 
+from basecfg import BaseCfg, opt
+
+
+class BinaryCfg(BaseCfg):
+    """a config with binary secrets"""
+
+    tls_key: Optional[bytes] = opt(None, "a private key")
+    ca_bundle: Optional[memoryview] = opt(None, "a ca bundle")
+
 
 def test_load_dockersecrets_good(config, secrets_test_files):
     """test loading a conforming value from a docker secret"""
@@ -30,3 +42,71 @@ def test_load_dockersecrets_bad_value(config, secrets_test_files):
     with pytest.raises(ValueError):
         conf = config(secrets_dir=secrets_test_files["bad_value"])
         assert conf.batch_size != "white"
+
+
+def test_load_dockersecrets_undeclared(config, tmp_path, monkeypatch):
+    """verify that secrets which don't match an option are never read"""
+    (tmp_path / "batch_size").write_text("42")
+    (tmp_path / "ca_bundle").write_text("-----BEGIN CERTIFICATE-----")
+    (tmp_path / "favorite_color").mkdir()
+    read_paths = []
+    read_secret = config._read_docker_secret
+
+    def recording_read(path, *args, **kwargs):
+        read_paths.append(path)
+        return read_secret(path, *args, **kwargs)
+
+    monkeypatch.setattr(config, "_read_docker_secret", staticmethod(recording_read))
+    conf = config(secrets_dir=str(tmp_path))
+    assert conf.batch_size == 42
+    assert conf.favorite_color == "blue"
+    assert read_paths == [str(tmp_path / "batch_size")]
+
+
+def test_load_dockersecrets_concurrent(config, secrets_test_files, monkeypatch):
+    """test reading secrets on the thread pool"""
+    monkeypatch.setattr("basecfg.dockersecrets.SECRETS_POOL_THRESHOLD", 2)
+    conf = config(secrets_dir=secrets_test_files["good"])
+    assert conf.batch_size == 65535
+    assert conf.input_files == ["a.txt", "b.txt", "c.txt"]
+    assert conf.yn == [True, False, True]
+    assert conf.favorite_color == "green"
+
+
+def test_load_dockersecrets_binary(tmp_path, monkeypatch, temp_envvars):
+    """verify that binary secrets are read as they are, on first access"""
+    temp_envvars()
+    monkeypatch.setattr("basecfg.dockersecrets.SECRETS_MMAP_THRESHOLD", 1024)
+    (tmp_path / "tls_key").write_bytes(b" \x00key\n")
+    (tmp_path / "ca_bundle").write_bytes(b"-" * 4096)
+    conf = BinaryCfg(cli_args=[], secrets_dir=str(tmp_path))
+    assert "tls_key" not in conf.__dict__
+    assert conf.tls_key == b" \x00key\n"
+    assert isinstance(conf.ca_bundle.obj, mmap.mmap)
+    assert conf.ca_bundle == b"-" * 4096
+    assert conf.ca_bundle.readonly
+    assert conf.source_of("tls_key") == "secrets"
+
+    (tmp_path / "tls_key").write_bytes(b"rotated")
+    assert conf.reload() == {"tls_key": b"rotated"}
+
+
+def test_load_dockersecrets_binary_unused(tmp_path, monkeypatch):
+    """verify that binary secrets which are never used are never read"""
+    read_paths = []
+    monkeypatch.setitem(BinaryCfg._schema.binary, "tls_key", read_paths.append)
+    (tmp_path / "tls_key").write_bytes(b"key")
+    conf = BinaryCfg(cli_args=["--ca-bundle", "text"], secrets_dir=str(tmp_path))
+    assert conf.ca_bundle == b"text"
+    assert not read_paths
+    assert conf.tls_key is None
+    assert read_paths == [str(tmp_path / "tls_key")]
+
+
+def test_load_dockersecrets_binary_stats(tmp_path):
+    """verify that binary secrets aren't counted as read by the load stats"""
+    (tmp_path / "ca_bundle").write_bytes(b"-" * 4096)
+    conf = BinaryCfg(cli_args=[], secrets_dir=str(tmp_path), load_stats=True)
+    assert conf.load_stats["secrets"].files_read == 0
+    assert conf.load_stats["secrets"].bytes_read == 0
+    assert conf.load_stats["secrets"].keys_applied == 1
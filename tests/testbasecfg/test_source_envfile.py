@@ -3,6 +3,8 @@
 # pylint: disable=duplicate-code
 import pytest
 
+import basecfg.envfile
+
 
 def test_envfile_good(config, envfile_full_good):
     """test loading a conforming value from a docker secret"""
@@ -54,3 +56,42 @@ def test_envfile_bad_value(config, bad_envfile_inputs):
     with pytest.raises(ValueError):
         conf = config(envfile_path=envfile_path, envfile_required=True)
         assert conf.favorite_color != "white"
+
+
+def test_envfile_layered(config, envfile_full_good, tmp_path):
+    """verify that a list of envfiles is merged in order, later files winning"""
+    override = tmp_path / "override.env"
+    override.write_text("# host overrides\nBATCH_SIZE=12\n\nfavorite_color = orange\n")
+    missing = tmp_path / "missing.env"
+    conf = config(envfile_path=[envfile_full_good, override, missing])
+    assert conf.batch_size == 12
+    assert conf.favorite_color == "orange"
+    assert conf.input_files == ["a.txt", "b.txt", "c.txt"]
+
+    with pytest.raises(FileNotFoundError):
+        config(envfile_path=[envfile_full_good, missing], envfile_required=True)
+
+
+def test_envfile_memoized(config, tmp_path, monkeypatch):
+    """verify that unchanged envfiles aren't parsed again"""
+    envfile_path = tmp_path / "app.env"
+    envfile_path.write_text("BATCH_SIZE=1\n")
+    assert config(envfile_path=envfile_path).batch_size == 1
+
+    def fail(*_args):
+        raise AssertionError("the envfile should not be parsed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(basecfg.envfile, "parse_envfile", fail)
+        assert config(envfile_path=envfile_path).batch_size == 1
+
+    envfile_path.write_text("BATCH_SIZE=22\n")
+    assert config(envfile_path=envfile_path).batch_size == 22
+
+
+def test_envfile_streaming():
+    """verify that envfiles are parsed from any iterable of lines"""
+    lines = (line for line in ["# comment\n", "  \n", "A=1\n", "a = 2=3\n"])
+    assert basecfg.envfile.parse_envfile(lines) == {"a": "2=3"}
+    with pytest.raises(ValueError, match='file:"x.env" line:1'):
+        basecfg.envfile.parse_envfile(["A=1", "oops"], "x.env")
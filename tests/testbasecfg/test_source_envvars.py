@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """ test configuration via environment variable """
+# pylint: disable=too-few-public-methods
 import os
+from typing import Optional
 
 import pytest
 
+from basecfg import BaseCfg, opt
+
 
 def test_envvar_types(config, temp_envvars):
     """tests envvars of various types"""
@@ -39,3 +43,46 @@ def test_envvar_bad_value(config, temp_envvars):
     os.environ["FAVORITE_COLOR"] = "white"
     with pytest.raises(ValueError):
         _ = config()
+
+
+class PrefixedConfig(BaseCfg):
+    """a config which namespaces its environment variables"""
+
+    _env_prefix = "MYAPP_"
+
+    batch_size: Optional[int] = opt(
+        default=None,
+        doc="how big chunks should be",
+        env_aliases=("LEGACY_BATCH",),
+    )
+    host: str = opt(default="localhost", doc="the host to connect to")
+
+
+def test_envvar_prefix(temp_envvars):
+    """test envvars namespaced with the class's _env_prefix"""
+    temp_envvars()
+    os.environ["BATCH_SIZE"] = "1"  # not namespaced, so ignored
+    os.environ["HOST"] = "ignored.example.com"
+    os.environ["MYAPP_BATCH_SIZE"] = "2"
+    os.environ["MYAPP_host"] = "db.example.com"
+    conf = PrefixedConfig()
+    assert conf.batch_size == 2
+    assert conf.host == "db.example.com"
+
+
+def test_envvar_alias(temp_envvars):
+    """test that aliases are accepted but rank below the primary names"""
+    temp_envvars()
+    os.environ["LEGACY_BATCH"] = "3"
+    assert PrefixedConfig().batch_size == 3
+    os.environ["MYAPP_BATCH_SIZE"] = "4"
+    assert PrefixedConfig().batch_size == 4
+
+
+def test_envvar_small_environment(config, temp_envvars):
+    """test resolution when the environment is smaller than the option index"""
+    temp_envvars()
+    os.environ = {"batch_size": "5", "BATCH_SIZE": "6", "TEMPS": "1.5"}
+    conf = config()
+    assert conf.batch_size == 6
+    assert conf.temps == [1.5]
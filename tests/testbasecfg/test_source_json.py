@@ -4,6 +4,8 @@ import json
 
 import pytest
 
+import basecfg.jsonconfig
+
 
 def test_json_config_full(config, json_full_good):
     """verify that the json config parsing works as expected"""
@@ -67,3 +69,49 @@ def test_json_bad_value(config, bad_json_inputs):
     with pytest.raises(ValueError):
         conf = config(json_filename, True)
         assert conf.favorite_color != "white"
+
+
+@pytest.mark.parametrize("decoder", ["json", "auto", basecfg.jsonconfig.stdlib_decoder])
+def test_json_declared_only(config, json_full_good, monkeypatch, decoder):
+    """verify that key-filtered decoding gives the same configuration"""
+    monkeypatch.setattr(config, "_json_decoder", decoder)
+    expected = config(json_full_good, True).freeze()
+    monkeypatch.setattr(config, "_json_declared_only", True)
+    assert config(json_full_good, True).freeze() == expected
+
+
+def test_json_declared_only_skips(config, tmp_path, monkeypatch, bad_json_inputs):
+    """verify that only declared keys are decoded"""
+    monkeypatch.setattr(config, "_json_declared_only", True)
+    shared = tmp_path / "shared.json"
+    shared.write_text(
+        '{"other_service": {"hosts": [{"name": "a\\"}", "port": [1, {"x": 2}]}]},'
+        ' "batch_size": 1, "batch_\\u0073ize": 2}'
+    )
+    seen = []
+    monkeypatch.setattr(
+        config, "_json_decoder", lambda data: seen.append(data) or json.loads(data)
+    )
+    conf = config(shared, True)
+    assert conf.batch_size == 2
+    # the scanner's values are used, rather than decoding them again
+    assert not seen
+
+    with pytest.raises(json.JSONDecodeError):
+        config(bad_json_inputs["bad_format"], True)
+    with pytest.raises(ValueError):
+        basecfg.jsonconfig.decode_keys("[1, 2]", {"batch_size"})
+    assert not basecfg.jsonconfig.decode_keys(" { } ", {"batch_size"})
+    for extra in ('{"a": 1} trailing', '{"a": 1}}', "{} {}"):
+        with pytest.raises(json.JSONDecodeError, match="Extra data"):
+            basecfg.jsonconfig.decode_keys(extra, {"a"})
+    assert basecfg.jsonconfig.decode_keys('{"a": 1}\n', {"a"}) == {"a": 1}
+
+
+def test_json_decoder_names():
+    """test selecting json decoders by name"""
+    stdlib = basecfg.jsonconfig.stdlib_decoder
+    assert basecfg.jsonconfig.get_decoder("json") is stdlib
+    assert basecfg.jsonconfig.get_decoder("auto")('{"a": [1]}') == {"a": [1]}
+    with pytest.raises(ValueError):
+        basecfg.jsonconfig.get_decoder("yaml")
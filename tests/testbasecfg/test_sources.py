@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+""" tests for additional (remote) configuration sources """
+# pylint: disable=protected-access
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from basecfg.sources import CachedSource, HttpKVSource, Source, source_order
+
+
+class KVHandler(BaseHTTPRequestHandler):
+    """a stand-in key-value service which records the requests it gets"""
+
+    protocol_version = "HTTP/1.1"
+    server: Any
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """returns the requested keys of the server's store as a json object"""
+        keys = parse_qs(urlsplit(self.path).query)["keys"][0].split(",")
+        self.server.requests.append((self.client_address, keys))
+        time.sleep(self.server.delay)
+        store = self.server.store
+        body = json.dumps({key: store[key] for key in keys if key in store}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture(name="kv_server")
+def fixture_kv_server():
+    """fixture which runs a local key-value service in a background thread"""
+    server: Any = ThreadingHTTPServer(("127.0.0.1", 0), KVHandler)
+    server.store = {}
+    server.requests = []
+    server.delay = 0.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/v1/config"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class DictSource(Source):
+    """a source which reads from a dict"""
+
+    def __init__(self, name: str, after: str, values: Dict[str, str]) -> None:
+        self.name = name
+        self.after = after
+        self.values = values
+        self.reads: List[List[str]] = []
+
+    def read(self, keys):
+        self.reads.append(sorted(keys))
+        return {key: val for key, val in self.values.items() if key in keys}
+
+
+def test_source_order():
+    """verify where additional sources are inserted in the precedence chain"""
+    order = source_order(
+        [
+            DictSource("a", "envfile", {}),
+            DictSource("b", "envfile", {}),
+            DictSource("c", "defaults", {}),
+            DictSource("d", "a", {}),
+        ]
+    )
+    assert order == ("c", "json", "envfile", "a", "b", "d", "envvars", "secrets", "cli")
+    with pytest.raises(ValueError):
+        source_order([DictSource("json", "defaults", {})])
+    with pytest.raises(ValueError):
+        source_order([DictSource("x", "nope", {})])
+
+
+def test_source_abstract():
+    """verify that sources without read() can't be instantiated"""
+
+    class NoReadSource(Source):  # pylint: disable=abstract-method
+        """a source which forgot to implement read()"""
+
+        name = "noread"
+
+    with pytest.raises(TypeError):
+        NoReadSource()  # pylint: disable=abstract-class-instantiated
+
+
+def test_source_precedence(config, json_full_good, temp_envvars):
+    """verify that additional sources take their place in the precedence chain"""
+    temp_envvars()
+    os.environ["BATCH_SIZE"] = "5"
+    low = DictSource("low", "defaults", {"batch_size": "1", "verbose": "false"})
+    high = DictSource("high", "json", {"favorite_color": "orange", "batch_size": "2"})
+    conf = config(json_full_good, cli_args=[], sources=[high, low])
+    assert conf.batch_size == 5
+    assert conf.verbose is True
+    assert conf.favorite_color == "orange"
+    assert conf.source_of("favorite_color") == "high"
+    assert high.reads == [sorted(config._schema.leaves)]
+
+    high.values["favorite_color"] = "blue"
+    assert conf.reload() == {"favorite_color": "blue"}
+
+
+def test_http_kv_source(config, kv_server):
+    """verify that all keys are fetched in one request over a pooled connection"""
+    kv_server.store.update({"batch_size": "42", "input_files": "x,y"})
+    source = HttpKVSource(kv_server.url, name="kv")
+    conf = config(cli_args=["--verbose"], sources=[source])
+    assert conf.batch_size == 42
+    assert conf.input_files == ["x", "y"]
+    assert conf.verbose is True
+    assert conf.source_detail("batch_size") == kv_server.url
+    assert len(kv_server.requests) == 1
+    assert sorted(kv_server.requests[0][1]) == sorted(config._schema.leaves)
+
+    kv_server.store["batch_size"] = "43"
+    assert conf.reload() == {"batch_size": 43}
+    assert len(kv_server.requests) == 2
+    assert kv_server.requests[0][0] == kv_server.requests[1][0]
+    source.close()
+
+
+def test_http_kv_source_timeout(kv_server):
+    """verify that a timed out request doesn't break later reads"""
+    kv_server.store["batch_size"] = "42"
+    source = HttpKVSource(kv_server.url, timeout=0.2)
+    assert source.read(["batch_size"]) == {"batch_size": "42"}
+    kv_server.delay = 1.0
+    with pytest.raises(TimeoutError):
+        source.read(["batch_size"])
+    kv_server.delay = 0.0
+    assert source.read(["batch_size"]) == {"batch_size": "42"}
+    source.close()
+
+
+def test_cached_source(config, kv_server):
+    """verify ttl caching with stale-while-revalidate"""
+    now = [0.0]
+    kv_server.store["batch_size"] = "1"
+    source = CachedSource(
+        HttpKVSource(kv_server.url), ttl=10, stale_ttl=20, clock=lambda: now[0]
+    )
+    conf = config(cli_args=[], sources=[source])
+    assert conf.batch_size == 1
+
+    kv_server.store["batch_size"] = "2"
+    now[0] = 5.0
+    assert conf.reload() == {}
+    assert len(kv_server.requests) == 1
+
+    # stale: the cached value is returned while it is refreshed in the background
+    now[0] = 15.0
+    assert conf.reload() == {}
+    for _ in range(200):
+        if source._read_at == 15.0:
+            break
+        time.sleep(0.01)
+    assert len(kv_server.requests) == 2
+    assert conf.reload() == {"batch_size": 2}
+
+    # expired: the read waits for the source
+    kv_server.store["batch_size"] = "3"
+    now[0] = 100.0
+    assert conf.reload() == {"batch_size": 3}
+    assert len(kv_server.requests) == 3
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+""" tests for per-step load statistics """
+import os
+
+
+def test_stats_disabled(config):
+    """verify that no stats are collected by default"""
+    conf = config()
+    assert conf.load_stats is None
+
+
+def test_stats_steps(config, json_partial_good, envfile_partial_good, tmp_path):
+    """verify the recorded steps and their counts"""
+    json_partial_good.write_text('{"batch_size": 1, "unknown": 2}')
+    (tmp_path / "secrets").mkdir()
+    (tmp_path / "secrets" / "verbose").write_text("yes")
+    conf = config(
+        json_partial_good,
+        envfile_path=envfile_partial_good,
+        secrets_dir=tmp_path / "secrets",
+        load_stats=True,
+    )
+    stats = conf.load_stats
+    assert [step.step for step in stats.steps] == [
+        "defaults",
+        "json",
+        "envfile",
+        "envvars",
+        "secrets",
+        "cli",
+    ]
+    assert stats["defaults"].keys_applied == 6
+    assert stats["json"].files_read == 1
+    assert stats["json"].bytes_read == os.path.getsize(json_partial_good)
+    assert stats["json"].keys_applied == 1
+    assert stats["json"].keys_skipped == 1
+    assert stats["envfile"].keys_applied == 2
+    assert stats["secrets"].files_read == 1
+    assert stats["secrets"].bytes_read == 3
+    assert stats["cli"].keys_applied == 0
+    assert stats.total_seconds >= 0
+    assert stats.as_dict()["steps"][1]["keys_skipped"] == 1
+
+
+def test_stats_hook(config):
+    """verify that the stats hook is called (and implies load_stats)"""
+    seen = []
+    conf = config(cli_args=["--verbose"], stats_hook=seen.append)
+    assert seen == [conf.load_stats]
+    assert conf.load_stats["cli"].keys_applied == 1
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+""" tests for the type coercer registry """
+# pylint: disable=too-few-public-methods,protected-access
+import datetime
+import enum
+import json
+import os
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+from basecfg import BaseCfg, TypeCoercers, opt, register_type
+from basecfg.coercers import format_duration, lookup, parse_duration
+
+
+class Color(enum.Enum):
+    """a color"""
+
+    RED = 1
+    BLUE = 2
+
+
+class TypedCfg(BaseCfg):
+    """a config with options of registered types"""
+
+    path: Path = opt(Path("/tmp"), "a path")
+    paths: List[Path] = opt([], "some paths")
+    color: Color = opt(Color.RED, "a color", choices=[Color.RED, Color.BLUE])
+    price: Decimal = opt(Decimal("1"), "a price")
+    when: Optional[datetime.datetime] = opt(None, "a time")
+    timeout: datetime.timedelta = opt(datetime.timedelta(seconds=5), "a timeout")
+    limits: Dict[str, int] = opt({}, "some limits")
+
+
+def test_types_text(temp_envvars):
+    """verify that text inputs are coerced by the registered coercers"""
+    temp_envvars()
+    os.environ.update(
+        {
+            "PATHS": "a,b",
+            "COLOR": "BLUE",
+            "PRICE": "0.10",
+            "WHEN": "2024-01-02T03:04:05Z",
+            "TIMEOUT": "1h30m",
+            "LIMITS": "cpu=2, mem=512",
+        }
+    )
+    conf = TypedCfg(cli_args=["--path", "/srv", "--paths", "c", "--color", "1"])
+    assert conf.path == Path("/srv")
+    assert conf.paths == [Path("c")]
+    assert conf.color is Color.RED
+    assert conf.price == Decimal("0.10")
+    assert conf.when == datetime.datetime(
+        2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc
+    )
+    assert conf.timeout == datetime.timedelta(hours=1, minutes=30)
+    assert conf.limits == {"cpu": 2, "mem": 512}
+
+    assert TypedCfg(cli_args=conf.to_args()).to_dict() == conf.to_dict()
+    with pytest.raises(SystemExit):
+        TypedCfg(cli_args=["--color", "GREEN"])
+
+
+def test_types_json(tmp_path):
+    """verify that json values are coerced by the registered coercers"""
+    path = tmp_path / "config.json"
+    path.write_text(
+        json.dumps(
+            {
+                "paths": ["a", "b"],
+                "color": 2,
+                "price": 0.1,
+                "timeout": 2.5,
+                "limits": {"cpu": 4},
+            }
+        )
+    )
+    conf = TypedCfg(json_config_path=str(path), cli_args=[])
+    assert conf.paths == [Path("a"), Path("b")]
+    assert conf.color is Color.BLUE
+    assert conf.price == Decimal("0.1")
+    assert conf.timeout == datetime.timedelta(seconds=2.5)
+    assert conf.limits == {"cpu": 4}
+
+    path.write_text(json.dumps({"limits": {"cpu": "many"}}))
+    with pytest.raises(TypeError):
+        TypedCfg(json_config_path=str(path), cli_args=[])
+
+
+def test_types_to_json(tmp_path, temp_envvars):
+    """verify that values of every registered type are exported as json"""
+    temp_envvars()
+    os.environ.pop("PATH", None)
+
+    class ExportCfg(TypedCfg):
+        """a config with more registered types"""
+
+        day: datetime.date = opt(datetime.date(2024, 1, 2), "a day")
+        at: datetime.time = opt(datetime.time(3, 4, 5), "a time of day")
+        prices: Dict[str, Decimal] = opt({"a": Decimal("0.10")}, "some prices")
+        blob: bytes = opt(b"abc", "some bytes")
+        view: memoryview = opt(memoryview(b"xyz"), "a view")
+
+    conf = ExportCfg(cli_args=["--when", "2024-01-02T03:04:05Z", "--paths", "a"])
+    exported = json.loads(conf.to_json())
+    assert exported["path"] == "/tmp"
+    assert exported["paths"] == ["a"]
+    assert exported["color"] == "RED"
+    assert exported["price"] == "1"
+    assert exported["when"] == "2024-01-02T03:04:05+00:00"
+    assert exported["timeout"] == "5s"
+    assert exported["day"] == "2024-01-02"
+    assert exported["at"] == "03:04:05"
+    assert exported["prices"] == {"a": "0.10"}
+    assert exported["blob"] == "abc"
+    assert exported["view"] == "xyz"
+
+    path = tmp_path / "config.json"
+    path.write_text(conf.to_json())
+    again = ExportCfg(json_config_path=str(path), cli_args=[])
+    assert again.to_json() == conf.to_json()
+    assert again.prices == {"a": Decimal("0.10")}
+
+
+def test_types_resolved_once():
+    """verify that coercers are looked up when the class is defined"""
+    compiled = TypedCfg._schema.options["price"]
+    assert compiled.parse_item is lookup(Decimal).parse
+    assert TypedCfg._schema.options["paths"].base_type == "List[Path]"
+
+
+def test_register_type():
+    """verify that users can register coercers for their own types"""
+
+    class Port(int):
+        """a port number"""
+
+    def parse_port(value: str) -> Port:
+        port = Port(value)
+        if not 0 < port < 65536:
+            raise ValueError(f"invalid port {port}")
+        return port
+
+    register_type(Port, parse_port)
+    assert lookup(Port) == TypeCoercers(parse_port, lookup(Port).from_json, str)
+
+    class PortCfg(BaseCfg):
+        """a config with an option of a registered type"""
+
+        port: Port = opt(Port(80), "a port")
+        ports: Dict[str, Port] = opt({}, "some ports")
+
+    conf = PortCfg(cli_args=["--port", "8080", "--ports", "http=80"])
+    assert conf.port == 8080
+    assert conf.ports == {"http": 80}
+    with pytest.raises(SystemExit):
+        PortCfg(cli_args=["--port", "0"])
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("90", datetime.timedelta(seconds=90)),
+        ("1.5", datetime.timedelta(seconds=1.5)),
+        ("2d 3h", datetime.timedelta(days=2, hours=3)),
+        ("500ms", datetime.timedelta(milliseconds=500)),
+        ("1w", datetime.timedelta(weeks=1)),
+        ("01:30:00", datetime.timedelta(hours=1, minutes=30)),
+        ("-5m", datetime.timedelta(minutes=-5)),
+    ],
+)
+def test_durations(text, expected):
+    """verify parsing durations and that formatting them reads back exactly"""
+    assert parse_duration(text) == expected
+    assert parse_duration(format_duration(expected)) == expected
+
+
+def test_duration_invalid():
+    """verify that invalid durations raise ValueError"""
+    with pytest.raises(ValueError):
+        parse_duration("5 parsecs")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+""" tests for the validation pass: required options, choices and constraints """
+# pylint: disable=too-few-public-methods,protected-access
+import json
+import os
+from typing import List, Optional
+
+import pytest
+
+from basecfg import BaseCfg, ValidationError, opt, section
+
+
+class DbCfg(BaseCfg):
+    """a section with a required option"""
+
+    host: Optional[str] = opt(None, "the database host", required=True)
+
+
+class CheckedCfg(BaseCfg):
+    """a config with checked options"""
+
+    name: Optional[str] = opt(None, "a name", required=True, pattern=r"[a-z]+")
+    workers: int = opt(1, "the worker count", min_value=1, max_value=64)
+    tags: List[str] = opt([], "some tags", choices=["a", "b", "c"], max_length=2)
+    ports: List[int] = opt([], "some ports", min_value=1, max_value=65535)
+    token: str = opt("", "a token", redact=True, min_length=8)
+    db: DbCfg = section(DbCfg, "the database")
+
+
+def test_validation_all_reported(tmp_path):
+    """verify that every violation is reported together"""
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"tags": ["a", "d"], "ports": [80, 70000]}))
+    with pytest.raises(ValidationError) as excinfo:
+        CheckedCfg(
+            json_config_path=str(path),
+            cli_args=["--workers", "0", "--token", "hunter2"],
+        )
+    errors = excinfo.value.errors
+    assert errors == [
+        "name: is required but wasn't set by any source",
+        "db.host: is required but wasn't set by any source",
+        "workers: value 0 is less than 1",
+        "tags: value \"d\" not in specified option choices (['a', 'b', 'c'])",
+        "ports: value 70000 is greater than 65535",
+        "token: length 7 is less than 8",
+    ]
+    assert "hunter2" not in str(excinfo.value)
+    assert isinstance(excinfo.value, ValueError)
+
+
+def test_validation_valid(temp_envvars):
+    """verify that valid values (and unchecked defaults) pass"""
+    temp_envvars()
+    os.environ["TAGS"] = "a,b,c"
+    conf = CheckedCfg(cli_args=["--name", "app", "--db-host", "db", "--tags", "b"])
+    assert conf.name == "app"
+    assert conf.db.host == "db"  # pylint: disable=no-member
+    with pytest.raises(ValidationError):
+        CheckedCfg(cli_args=["--name", "App1", "--db-host", "db"])
+    with pytest.raises(ValidationError):
+        CheckedCfg(cli_args=["--name", "app", "--db-host", "db"])
+
+
+def test_validation_reload(tmp_path):
+    """verify that reloading an invalid configuration changes nothing"""
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"name": "app", "db": {"host": "db"}, "workers": 2}))
+    conf = CheckedCfg(json_config_path=str(path), cli_args=[])
+    assert conf.workers == 2
+
+    path.write_text(json.dumps({"db": {"host": "db"}, "workers": 99}))
+    with pytest.raises(ValidationError) as excinfo:
+        conf.reload()
+    assert len(excinfo.value.errors) == 2
+    assert conf.workers == 2
+    # the invalid file is read again (and rejected again) on the next reload
+    with pytest.raises(ValidationError):
+        conf.reload()
+    path.write_text(json.dumps({"name": "app", "db": {"host": "db"}, "workers": 3}))
+    assert conf.reload() == {"workers": 3}
+
+
+def test_validation_lazy():
+    """verify that lazy options are checked when they are resolved"""
+
+    class LazyCheckedCfg(BaseCfg):
+        """a config with a checked lazy option"""
+
+        level: int = opt(0, "a level", lazy=True, max_value=3)
+        limit: int = opt(0, "a limit", lazy=True, max_value=3)
+
+    conf = LazyCheckedCfg(cli_args=["--level", "5", "--limit", "9"])
+    with pytest.raises(ValidationError):
+        _ = conf.level
+    with pytest.raises(ValidationError) as excinfo:
+        conf.validate()
+    assert len(excinfo.value.errors) == 2
+
+
+class ColorCfg(BaseCfg):
+    """a section with a checked option"""
+
+    color: str = opt("red", "a color", choices=["red", "blue"])
+
+
+class ReloadCfg(BaseCfg):
+    """a config with a checked section and a checked lazy option"""
+
+    aa: int = opt(1, "a number")
+    mode: str = opt("a", "a lazy mode", choices=["a", "b"], lazy=True)
+    db: ColorCfg = section(ColorCfg, "the database")
+    zz: int = opt(1, "another number")
+
+
+def test_validation_reload_section(temp_envvars):
+    """verify that an invalid built section leaves the whole reload unapplied"""
+    temp_envvars()
+    conf = ReloadCfg(cli_args=[])
+    assert conf.db.color == "red"  # pylint: disable=no-member
+    os.environ.update({"DB__COLOR": "green", "ZZ": "5"})
+    with pytest.raises(ValidationError):
+        conf.reload()
+    assert conf.zz == 1
+    assert not conf._layers.get("envvars")
+    os.environ["DB__COLOR"] = "blue"
+    assert conf.reload() == {"db": conf.db, "zz": 5}
+    assert conf.db.color == "blue"  # pylint: disable=no-member
+
+
+def test_validation_reload_lazy(temp_envvars):
+    """verify that an invalid used lazy option leaves the whole reload unapplied"""
+    temp_envvars()
+    conf = ReloadCfg(cli_args=[])
+    assert conf.mode == "a"
+    os.environ.update({"MODE": "zzz", "AA": "7"})
+    with pytest.raises(ValidationError):
+        conf.reload()
+    assert conf.aa == 1
+    assert conf.mode == "a"
+    assert not conf._layers.get("envvars")
+    os.environ["MODE"] = "b"
+    assert conf.reload() == {"aa": 7, "mode": "b"}